@@ -0,0 +1,175 @@
+# Benchmark crawl end-to-end: chạy spider dulichviet thật (settings của project,
+# middleware, pipeline ghi DB tạm) với site giả lập benchmarks.fake_site chạy ở process riêng.
+#
+#   python -m benchmarks.bench_crawl [--scale 4] [--latency 0.05] [--error-rate 0.01]
+#                                    [--no-pipeline] [-s CONCURRENT_REQUESTS=32 ...]
+#
+# Báo cáo: requests/giây, items/giây, thời điểm parse xong trang danh sách cuối cùng,
+# thời gian xử lý callback p50 / p99 (parse, parse_tour_detail), download latency
+# p50 / p99, RSS đỉnh của process crawl.
+# Các tùy chọn --scale / --per-page / --latency / ... giống fake_site.
+
+import argparse
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_site import add_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_site(args):
+    """Chạy fake_site ở process con, trả về (process, base_url)"""
+    command = [
+        sys.executable, '-m', 'benchmarks.fake_site', '--port', '0',
+        '--scale', str(args.scale), '--per-page', str(args.per_page),
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--error-rate', str(args.error_rate),
+    ]
+    if args.html_dir:
+        command += ['--html-dir', args.html_dir]
+    if args.seed is not None:
+        command += ['--seed', str(args.seed)]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url.startswith('http'):
+        process.kill()
+        raise RuntimeError('fake_site không khởi động được')
+    return process, base_url
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def bench_spider_class():
+    from tour_scraper.spiders.dulichviet import DuLichVietSpider
+
+    class BenchSpider(DuLichVietSpider):
+        """DuLichVietSpider, đo thời gian từng callback (đồng bộ) và download latency"""
+        name = 'dulichviet_bench'
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.callback_times = []
+            self.download_latencies = []
+            self.listings_done = None
+
+        def _timed(self, callback, response):
+            start = time.perf_counter()
+            results = list(callback(response))
+            self.callback_times.append(time.perf_counter() - start)
+            latency = response.meta.get('download_latency')
+            if latency is not None:
+                self.download_latencies.append(latency)
+            return results
+
+        def parse(self, response):
+            results = self._timed(super().parse, response)
+            self.listings_done = time.perf_counter()
+            return results
+
+        def parse_tour_detail(self, response):
+            return self._timed(super().parse_tour_detail, response)
+
+    return BenchSpider
+
+
+def run_crawl(base_url, directory, overrides, pipeline=True):
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'tour_scraper.settings')
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    settings.setdict({
+        'LOG_LEVEL': 'WARNING',
+        'TELNETCONSOLE_ENABLED': False,
+        'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'tours.db')}",
+        'CONDITIONAL_STORE': os.path.join(directory, 'fingerprints.db'),
+        'HTTP_ARCHIVE_MODE': None,
+        # Site giả lập có thể nhiều trang danh sách hơn DEPTH_LIMIT của spider
+        'DEPTH_LIMIT': 0,
+    }, priority='cmdline')
+    # Feed export vẫn chạy (là một phần chi phí crawl) nhưng ghi vào thư mục tạm
+    settings.set('FEEDS', {
+        os.path.join(directory, os.path.basename(uri)): options
+        for uri, options in settings.getdict('FEEDS').items()
+    }, priority='cmdline')
+    if not pipeline:
+        settings.set('ITEM_PIPELINES', {}, priority='cmdline')
+    for override in overrides:
+        name, _, value = override.partition('=')
+        settings.set(name, value, priority='cmdline')
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(bench_spider_class())
+    times = {}
+
+    def opened(spider):
+        times['start'] = time.perf_counter()
+
+    def closed(spider):
+        times['end'] = time.perf_counter()
+
+    crawler.signals.connect(opened, signal=signals.spider_opened)
+    crawler.signals.connect(closed, signal=signals.spider_closed)
+    process.crawl(crawler, base_url=base_url)
+    process.start()
+    return crawler, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end crawl benchmark với site giả lập')
+    add_arguments(parser)
+    parser.add_argument('--no-pipeline', action='store_true', help='không ghi DB (ITEM_PIPELINES = {})')
+    parser.add_argument('-s', dest='overrides', action='append', default=[], metavar='NAME=VALUE',
+                        help='ghi đè setting Scrapy, lặp lại được')
+    args = parser.parse_args()
+
+    site, base_url = start_site(args)
+    directory = tempfile.mkdtemp(prefix='bench_crawl_')
+    try:
+        crawler, times = run_crawl(base_url, directory, args.overrides, pipeline=not args.no_pipeline)
+    finally:
+        site.terminate()
+        site.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    elapsed = times['end'] - times['start']
+    stats = crawler.stats.get_stats()
+    spider = crawler.spider
+    requests = stats.get('downloader/request_count', 0)
+    items = stats.get('item_scraped_count', 0)
+    # ru_maxrss: KiB trên Linux, byte trên macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss /= 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+    print(f"Site: scale {args.scale}, {args.per_page}/trang, latency {args.latency}±{args.jitter}s, "
+          f"lỗi {args.error_rate:.1%}; pipeline {'tắt' if args.no_pipeline else 'bật'}\n")
+    print(f"  thời gian         {elapsed:9.2f} s")
+    print(f"  requests          {requests:9}   ({requests / elapsed:.1f}/s)")
+    print(f"  items             {items:9}   ({items / elapsed:.1f}/s)")
+    if spider.listings_done is not None:
+        print(f"  danh sách xong    {spider.listings_done - times['start']:9.2f} s")
+    print(f"  503 / retry       {stats.get('downloader/response_status_count/503', 0):9}   "
+          f"({stats.get('retry/count', 0)} retry)")
+    print(f"  callback ms       p50 {statistics.median(spider.callback_times or [0]) * 1000:7.2f}   "
+          f"p99 {percentile(spider.callback_times, 0.99) * 1000:7.2f}")
+    print(f"  download ms       p50 {statistics.median(spider.download_latencies or [0]) * 1000:7.2f}   "
+          f"p99 {percentile(spider.download_latencies, 0.99) * 1000:7.2f}")
+    print(f"  RSS đỉnh          {peak_rss:9.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+# So sánh các định dạng xuất tour: thời gian ghi, kích thước file, thời gian đọc lại.
+#
+#   python -m benchmarks.bench_export [--scale 20] [--keep DIR]
+#
+# Dữ liệu: các bản ghi trong tours_*.json, nhân lên --scale lần (đổi URL cho khác nhau).
+# Đọc lại: xlsx bằng openpyxl read-only, csv bằng csv.reader, jsonl bằng json.loads,
+# parquet bằng pyarrow.parquet.read_table (giữ nguyên list / lich_trinh lồng nhau).
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.fixtures import load_records
+from tour_scraper.export_db import write_csv, write_jsonl
+from tour_scraper.export_excel import write_tours
+from tour_scraper.export_parquet import write_parquet
+from tour_scraper.regions import REGIONS
+
+
+def scaled_records(scale):
+    records = []
+    for i in range(scale):
+        for region, record in load_records():
+            record = dict(record, mien=REGIONS[region]['mien'])
+            if i:
+                record['url'] = f"{record['url']}?copy={i}"
+            records.append(record)
+    return records
+
+
+def load_xlsx(path):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    rows = sum(1 for _ in wb.active.iter_rows(values_only=True)) - 1
+    wb.close()
+    return rows
+
+
+def load_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def load_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for line in f if json.loads(line))
+
+
+def load_parquet(path):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path).num_rows
+
+
+FORMATS = [
+    ('xlsx', write_tours, load_xlsx),
+    ('csv', write_csv, load_csv),
+    ('jsonl', write_jsonl, load_jsonl),
+    ('parquet', write_parquet, load_parquet),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export format benchmark')
+    parser.add_argument('--scale', type=int, default=20, help='nhân corpus lên bao nhiêu lần')
+    parser.add_argument('--keep', metavar='DIR', help='giữ các file đã xuất trong thư mục này')
+    args = parser.parse_args()
+
+    records = scaled_records(args.scale)
+    directory = args.keep or tempfile.mkdtemp(prefix='bench_export_')
+    os.makedirs(directory, exist_ok=True)
+    print(f"Corpus: {len(records)} tours → {directory}\n")
+    print(f"  {'format':<8} {'write s':>8} {'size MB':>8} {'load s':>8} {'rows':>7}")
+
+    try:
+        for name, write, load in FORMATS:
+            path = os.path.join(directory, f'tours.{name}')
+
+            start = time.perf_counter()
+            write(iter(records), path)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = load(path)
+            load_time = time.perf_counter() - start
+
+            size = os.path.getsize(path) / (1024 * 1024)
+            print(f"  {name:<8} {write_time:8.2f} {size:8.2f} {load_time:8.2f} {rows:>7}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
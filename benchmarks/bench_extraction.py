@@ -0,0 +1,115 @@
+# So sánh tốc độ parse_tour_detail trước / sau khi biên dịch sẵn XPath + regex.
+#
+#   python -m benchmarks.bench_extraction [--repeat 5]
+#
+# Chạy cả hai implementation trên cùng các trang fixture (dựng từ tours_*.json),
+# kiểm tra kết quả giống hệt nhau rồi in số trang/giây. Chạy ba bộ trang: khối
+# "Trải nghiệm" trong div.attr (Strategy 1), ngoài div.attr (Strategy 2) và ngoài
+# div.attr với tiêu đề khác, trang không có chữ "Trải nghiệm" nào (Strategy 3).
+
+import argparse
+import logging
+import re
+import timeit
+from collections import Counter
+
+from benchmarks.fixtures import tour_responses
+from benchmarks.legacy_spider import DuLichVietMienBacSpider as LegacySpider
+from tour_scraper import extraction
+from tour_scraper.spiders.dulichviet import DuLichVietSpider
+
+
+def legacy_normalize(text):
+    text = text.lower()
+    text = re.sub(r'[áàảãạăắằẳẵặâấầẩẫậ]', 'a', text)
+    text = re.sub(r'[éèẻẽẹêếềểễệ]', 'e', text)
+    text = re.sub(r'[íìỉĩị]', 'i', text)
+    text = re.sub(r'[óòỏõọôốồổỗộơớờởỡợ]', 'o', text)
+    text = re.sub(r'[úùủũụưứừửữự]', 'u', text)
+    text = re.sub(r'[ýỳỷỹỵ]', 'y', text)
+    text = re.sub(r'đ', 'd', text)
+    return text
+
+
+def run_pages(callback, responses):
+    items = []
+    for response in responses:
+        items.extend(callback(response))
+    return items
+
+
+def compare_items(legacy_items, new_items):
+    mismatches = []
+    for old, new in zip(legacy_items, new_items):
+        old, new = dict(old), dict(new)
+        new.pop('mien', None)
+        if old != new:
+            fields = sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+            mismatches.append((old.get('url'), fields))
+    if len(legacy_items) != len(new_items):
+        mismatches.append(('<count>', [f"{len(legacy_items)} != {len(new_items)}"]))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Log INFO của spider sẽ lấn át thời gian parse → tắt khi đo
+    logging.disable(logging.INFO)
+
+    legacy = LegacySpider()
+    # Bản cũ gọi clean_text(...).strip() và crash khi clean_text trả về None
+    legacy_clean_text = legacy.clean_text
+    legacy.clean_text = lambda text: legacy_clean_text(text) or ''
+    spider = DuLichVietSpider()
+
+    mismatches = []
+    layouts = [
+        ('trải nghiệm trong div.attr', True, 'Trải nghiệm'),
+        ('trải nghiệm ngoài div.attr', False, 'Trải nghiệm'),
+        ('"Điểm nổi bật" ngoài div.attr', False, 'Điểm nổi bật'),
+    ]
+    for label, in_attr, heading in layouts:
+        responses = [
+            response for _, _, response in tour_responses(trai_nghiem_in_attr=in_attr, trai_nghiem_heading=heading)
+        ]
+        legacy_items = run_pages(legacy.parse_tour_detail, responses)
+        new_items = run_pages(spider.parse_tour_detail, responses)
+        layout_mismatches = compare_items(legacy_items, new_items)
+        mismatches.extend(layout_mismatches)
+        strategies = Counter(extraction.extract_trai_nghiem(response)[1] for response in responses)
+
+        print(f"\n[{label}]")
+        print("Strategy trải nghiệm: " + ', '.join(
+            f"{'none' if key is None else key}: {count}" for key, count in sorted(strategies.items(), key=lambda kv: str(kv[0]))
+        ))
+        for url, fields in layout_mismatches:
+            print(f"MISMATCH {url}: {', '.join(fields)}")
+        print(f"Kết quả giống nhau: {len(legacy_items) - len(layout_mismatches)}/{len(legacy_items)} tours")
+
+        print(f"parse_tour_detail trên {len(responses)} trang (best of {args.repeat}):")
+        legacy_time = min(timeit.repeat(lambda: run_pages(legacy.parse_tour_detail, responses), number=1, repeat=args.repeat))
+        new_time = min(timeit.repeat(lambda: run_pages(spider.parse_tour_detail, responses), number=1, repeat=args.repeat))
+        print(f"  legacy    : {len(responses) / legacy_time:8.1f} trang/s")
+        print(f"  compiled  : {len(responses) / new_time:8.1f} trang/s  (x{legacy_time / new_time:.2f})")
+
+    # Micro-benchmark các helper: được gọi cho từng dòng dịch vụ / ghi chú / hoạt động
+    samples = []
+    for item in legacy_items:
+        for field in ('dich_vu_bao_gom', 'dich_vu_khong_bao_gom', 'ghi_chu', 'trai_nghiem'):
+            samples.extend(item.get(field) or [])
+    print(f"\nHelpers trên {len(samples)} chuỗi:")
+    t_old = min(timeit.repeat(lambda: [legacy_normalize(t) for t in samples], number=1, repeat=args.repeat))
+    t_new = min(timeit.repeat(lambda: [extraction.normalize(t) for t in samples], number=1, repeat=args.repeat))
+    print(f"  normalize : {t_old * 1000:8.2f} ms -> {t_new * 1000:8.2f} ms  (x{t_old / t_new:.2f})")
+    t_old = min(timeit.repeat(lambda: [legacy_clean_text(t) for t in samples], number=1, repeat=args.repeat))
+    t_new = min(timeit.repeat(lambda: [extraction.clean_text(t) for t in samples], number=1, repeat=args.repeat))
+    print(f"  clean_text: {t_old * 1000:8.2f} ms -> {t_new * 1000:8.2f} ms  (x{t_old / t_new:.2f})")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+# Benchmark parser offline: replay các trang danh sách + chi tiết tour qua callback
+# của spider bằng HtmlResponse, không cần mạng.
+#
+#   python -m benchmarks.bench_parser                      # dựng trang từ tours_*.json
+#   python -m benchmarks.bench_parser --html-dir pages/    # trang HTML đã lưu (manifest.json)
+#   python -m benchmarks.bench_parser --dump pages/        # ghi corpus fixture ra thư mục
+#   python -m benchmarks.bench_parser --save-baseline      # lưu kết quả làm mốc so sánh
+#
+# Báo cáo: số trang/giây, thời gian từng trường (ms/trang), bộ nhớ cấp phát,
+# tỉ lệ khớp với dữ liệu trong tours_*.json; so với baseline và trả về mã lỗi 1
+# nếu chậm hơn / sai hơn quá ngưỡng --tolerance.
+# Tỉ lệ khớp tuyệt đối phụ thuộc cách dựng fixture (JSON được crawl bằng phiên bản
+# spider cũ hơn); điều cần theo dõi là nó không giảm giữa các lần đổi code.
+
+import argparse
+import json
+import logging
+import os
+import time
+import timeit
+import tracemalloc
+
+from benchmarks.fixtures import load_corpus, load_records, page_response, save_corpus
+from tour_scraper import extraction
+from tour_scraper.spiders.dulichviet import DuLichVietSpider
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parser_baseline.json')
+
+ORACLE_FIELDS = [
+    'title', 'tour_name', 'ma_tour', 'thoi_gian', 'khoi_hanh', 'van_chuyen', 'xuat_phat', 'gia_tu',
+    'trai_nghiem', 'lich_trinh', 'dich_vu_bao_gom', 'dich_vu_khong_bao_gom', 'ghi_chu',
+]
+
+# Các bước trích xuất của parse_tour_detail, đo riêng từng bước trên selector đã parse sẵn
+FIELD_STAGES = [
+    ('title', lambda r: extraction.extract_title(r)),
+    ('tour_name', lambda r: extraction.extract_tour_name(r.url)),
+    ('ma_tour', lambda r: extraction.extract_ma_tour(r)),
+    ('thoi_gian', lambda r: extraction.extract_thoi_gian(r)),
+    ('khoi_hanh', lambda r: extraction.extract_khoi_hanh(r)),
+    ('van_chuyen', lambda r: extraction.extract_van_chuyen(r)),
+    ('xuat_phat', lambda r: extraction.extract_xuat_phat(r)),
+    ('gia_tu', lambda r: extraction.extract_gia_tu(r)),
+    ('trai_nghiem', lambda r: extraction.extract_trai_nghiem(r)),
+    ('lich_trinh', lambda r: extraction.extract_lich_trinh(r)),
+    ('dich_vu', lambda r: extraction.extract_dich_vu(r)),
+    ('ghi_chu', lambda r: extraction.extract_ghi_chu(r)),
+]
+
+
+def run_callbacks(spider, pages):
+    """Chạy callback tương ứng cho mỗi trang, trả về (items, requests)"""
+    items, requests = [], []
+    for page in pages:
+        response = page_response(page)
+        callback = spider.parse if page['kind'] == 'listing' else spider.parse_tour_detail
+        for result in callback(response):
+            if isinstance(result, dict) or hasattr(result, 'fields'):
+                items.append(result)
+            else:
+                requests.append(result)
+    return items, requests
+
+
+def measure_throughput(pages, repeat):
+    best = min(timeit.repeat(lambda: run_callbacks(DuLichVietSpider(), pages), number=1, repeat=repeat))
+    return len(pages) / best if pages else 0.0
+
+
+def measure_fields(pages, repeat):
+    """ms/trang cho từng bước, cộng thêm bước dựng cây HTML"""
+    responses = [page_response(page) for page in pages]
+
+    start = time.perf_counter()
+    for response in responses:
+        response.selector
+    timings = {'html_parse': (time.perf_counter() - start) * 1000 / len(responses)}
+
+    for name, stage in FIELD_STAGES:
+        best = min(timeit.repeat(lambda: [stage(r) for r in responses], number=1, repeat=repeat))
+        timings[name] = best * 1000 / len(responses)
+    return timings
+
+
+def measure_allocations(pages):
+    """Bộ nhớ đỉnh (KB) khi parse từng trang chi tiết"""
+    spider = DuLichVietSpider()
+    peaks = []
+    tracemalloc.start()
+    try:
+        for page in pages:
+            response = page_response(page)
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            list(spider.parse_tour_detail(response))
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - base) / 1024)
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_kb_mean': sum(peaks) / len(peaks) if peaks else 0.0,
+        'peak_kb_max': max(peaks) if peaks else 0.0,
+    }
+
+
+def measure_oracle(items):
+    """Tỉ lệ trường khớp với bản ghi cùng URL trong tours_*.json"""
+    records = {record['url']: record for _, record in load_records()}
+    matched = {field: 0 for field in ORACLE_FIELDS}
+    total = 0
+    for item in items:
+        record = records.get(item.get('url'))
+        if record is None:
+            continue
+        total += 1
+        for field in ORACLE_FIELDS:
+            if item.get(field) == record.get(field):
+                matched[field] += 1
+    return {field: (count / total if total else 0.0) for field, count in matched.items()}, total
+
+
+def compare(current, baseline, tolerance):
+    """Danh sách dòng báo cáo và các chỉ số bị tụt so với baseline"""
+    lines, regressions = [], []
+
+    def check(label, now, before, higher_is_better, noise=0.0):
+        if before in (None, 0):
+            return
+        change = (now - before) / before
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        # Chênh lệch dưới ~0.1 ms/trang là dao động giữa các lần chạy, không tính là tụt
+        worse = worse and abs(now - before) > noise
+        flag = '  << REGRESSION' if worse else ''
+        lines.append(f"  {label:<28} {before:10.3f} -> {now:10.3f}  ({change:+.1%}){flag}")
+        if worse:
+            regressions.append(label)
+
+    check('tour pages/s', current['tour_pages_per_sec'], baseline.get('tour_pages_per_sec'), True)
+    check('listing pages/s', current['listing_pages_per_sec'], baseline.get('listing_pages_per_sec'), True)
+    for name, value in current['fields_ms'].items():
+        check(f'{name} (ms/page)', value, baseline.get('fields_ms', {}).get(name), False, noise=0.1)
+    check('peak KB/page (mean)', current['allocations']['peak_kb_mean'],
+          baseline.get('allocations', {}).get('peak_kb_mean'), False)
+
+    # Độ chính xác không được phép giảm, bất kể tolerance
+    for field, rate in current['oracle'].items():
+        before = baseline.get('oracle', {}).get(field)
+        if before is not None and rate < before:
+            lines.append(f"  oracle {field:<21} {before:10.1%} -> {rate:10.1%}  << REGRESSION")
+            regressions.append(f'oracle {field}')
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline parser benchmark')
+    parser.add_argument('--html-dir', help='thư mục trang HTML đã lưu (có manifest.json)')
+    parser.add_argument('--dump', metavar='DIR', help='ghi corpus fixture ra thư mục rồi thoát')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='mức chậm hơn cho phép (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    if args.dump:
+        manifest = save_corpus(args.dump)
+        print(f"✓ Đã ghi {len(manifest)} trang vào {args.dump}")
+        return 0
+
+    # Log INFO của spider sẽ lấn át thời gian parse → tắt khi đo
+    logging.disable(logging.INFO)
+
+    pages = load_corpus(args.html_dir)
+    tour_pages = [p for p in pages if p['kind'] == 'tour']
+    listing_pages = [p for p in pages if p['kind'] == 'listing']
+    print(f"Corpus: {len(tour_pages)} trang tour, {len(listing_pages)} trang danh sách")
+
+    items, _ = run_callbacks(DuLichVietSpider(), tour_pages)
+    _, requests = run_callbacks(DuLichVietSpider(), listing_pages)
+    oracle, oracle_total = measure_oracle(items)
+
+    current = {
+        'tour_pages_per_sec': measure_throughput(tour_pages, args.repeat),
+        'listing_pages_per_sec': measure_throughput(listing_pages, args.repeat),
+        'fields_ms': measure_fields(tour_pages, args.repeat),
+        'allocations': measure_allocations(tour_pages),
+        'oracle': oracle,
+    }
+
+    print(f"\nThroughput:")
+    print(f"  parse_tour_detail : {current['tour_pages_per_sec']:8.1f} trang/s ({len(items)} items)")
+    print(f"  parse (listing)   : {current['listing_pages_per_sec']:8.1f} trang/s ({len(requests)} requests)")
+
+    print(f"\nThời gian từng trường (ms/trang):")
+    for name, value in sorted(current['fields_ms'].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<12} {value:8.3f}")
+
+    print(f"\nBộ nhớ khi parse một trang tour:")
+    print(f"  peak trung bình {current['allocations']['peak_kb_mean']:.1f} KB, "
+          f"lớn nhất {current['allocations']['peak_kb_max']:.1f} KB")
+
+    print(f"\nKhớp với tours_*.json ({oracle_total} tours):")
+    for field, rate in oracle.items():
+        print(f"  {field:<22} {rate:6.1%}")
+
+    status = 0
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Đã lưu baseline vào {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressions = compare(current, baseline, args.tolerance)
+        print(f"\nSo với baseline {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print('\n'.join(lines))
+        if regressions:
+            print(f"\n✗ {len(regressions)} chỉ số tụt: {', '.join(regressions)}")
+            status = 1
+    else:
+        print(f"\n(Chưa có baseline, chạy với --save-baseline để tạo {args.baseline})")
+
+    return status
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# Micro-benchmark phân loại miền: bản cũ (any() trên forbidden / good_keywords của
+# từng miền, find từng từ khóa) và bản biên dịch regions.RE_SCOPE (không / có memo).
+#
+#   python -m benchmarks.bench_regions [--repeat 50]
+#
+# Dữ liệu: URL tour trong tours_*.json, trang danh sách của các miền (có phân trang)
+# và các trang danh sách địa danh trong forbidden. Kết quả classify_region được so sánh
+# với mọi thứ tự của regions và mọi fallback trước khi đo.
+
+import argparse
+import itertools
+import timeit
+
+from benchmarks.fixtures import load_records
+from tour_scraper import regions
+from tour_scraper.regions import REGIONS
+
+
+def legacy_is_in_scope(region, url):
+    """is_in_scope trước khi có RE_SCOPE"""
+    url_lower = url.lower()
+    scope = REGIONS[region]
+
+    if any(bad in url_lower for bad in scope["forbidden"]):
+        return False
+    if any(kw in url_lower for kw in scope["good_keywords"]):
+        return True
+    if scope["start_url"][len("https://"):] in url_lower:
+        return True
+    if '/du-lich-' in url_lower:
+        return True
+    return False
+
+
+def legacy_classify_region(url, region_list, fallback=None):
+    """classify_region trước khi có RE_SCOPE"""
+    url_lower = url.lower()
+
+    best = None
+    best_pos = None
+    accepted = []
+    for region in region_list:
+        if not legacy_is_in_scope(region, url_lower):
+            continue
+        accepted.append(region)
+        for kw in REGIONS[region]["good_keywords"]:
+            pos = url_lower.find(kw)
+            if pos != -1 and (best_pos is None or pos < best_pos):
+                best, best_pos = region, pos
+
+    if best is not None:
+        return best
+    if fallback in accepted:
+        return fallback
+    return accepted[0] if accepted else None
+
+
+def compiled_classify_region(url, region_list, fallback=None):
+    """classify_region, xóa memo trước mỗi lần gọi"""
+    regions._scope.cache_clear()
+    return regions.classify_region(url, region_list, fallback)
+
+
+def sample_urls():
+    urls = {record['url'] for _, record in load_records()}
+    for scope in REGIONS.values():
+        urls.add(scope['start_url'])
+        urls.update(f"{scope['start_url']}?page={page}" for page in range(2, 6))
+        urls.update(f"https://dulichviet.com.vn{bad}" for bad in scope['forbidden'])
+    urls.update(['https://dulichviet.com.vn/', 'https://dulichviet.com.vn/tin-tuc/cam-nang'])
+    return sorted(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Region classifier micro-benchmark')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    urls = sample_urls()
+    orders = [list(order) for size in range(1, len(REGIONS) + 1) for order in itertools.permutations(REGIONS, size)]
+    mismatches = [
+        (url, order, fallback)
+        for url in urls
+        for order in orders
+        for fallback in [None, *REGIONS]
+        if legacy_classify_region(url, order, fallback) != regions.classify_region(url, order, fallback)
+    ]
+    mismatches += [
+        (url, region) for url in urls for region in REGIONS
+        if legacy_is_in_scope(region, url) != regions.is_in_scope(region, url)
+    ]
+    for mismatch in mismatches[:20]:
+        print(f"MISMATCH {mismatch}")
+    print(f"{len(urls)} URL x {len(orders)} thứ tự regions x {len(REGIONS) + 1} fallback: "
+          f"{'giống bản cũ' if not mismatches else f'{len(mismatches)} khác'}\n")
+
+    # Như spider: mỗi tour được phân loại ở parse rồi ở parse_tour_detail
+    region_list = list(REGIONS)
+    implementations = [
+        ('cũ (any + find)', legacy_classify_region),
+        ('RE_SCOPE', compiled_classify_region),
+        ('RE_SCOPE + memo', regions.classify_region),
+    ]
+    print(f"  {'':<18} {'µs/URL':>8} {'x':>6}")
+    baseline = None
+    for name, function in implementations:
+        regions._scope.cache_clear()
+        seconds = timeit.timeit(
+            lambda: [function(url, region_list, 'mienbac') for url in urls for _ in range(2)],
+            number=args.repeat,
+        ) / args.repeat / len(urls)
+        baseline = baseline or seconds
+        print(f"  {name:<18} {seconds * 1e6:8.2f} {baseline / seconds:6.1f}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
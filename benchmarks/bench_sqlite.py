@@ -0,0 +1,129 @@
+# So sánh profile SQLite: mặc định (rollback journal, synchronous=FULL) và
+# models.SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap_size, cache_size).
+#
+#   python -m benchmarks.bench_sqlite [--scale 10] [--batch-size 100] [--duration 5]
+#
+# insert:      ghi các tour trong tours_*.json (nhân --scale lần) như pipeline:
+#              upsert theo lô + bảng con, commit mỗi lô → tours/giây
+# concurrent:  trong --duration giây, một thread ghi lại các tour (nội dung đổi) theo lô
+#              trong khi một thread khác đọc từng trang 200 tour như export_db
+#              → độ trễ đọc p50 / p99 / max và tốc độ ghi khi có người đọc
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from benchmarks.fixtures import load_records
+from tour_scraper.export_db import build_query
+from tour_scraper.models import SQLITE_PRAGMAS, Base, Tour, build_upsert, get_engine, replace_children
+from tour_scraper.pipelines import item_to_row
+from tour_scraper.regions import REGIONS
+
+PROFILES = [
+    ('default', {}),
+    ('tuned', SQLITE_PRAGMAS),
+]
+
+
+def scaled_rows(scale):
+    # Một tour có thể nằm trong nhiều file miền → mỗi URL chỉ giữ một dòng (như pipeline)
+    rows = {}
+    for i in range(scale):
+        for region, record in load_records():
+            row = item_to_row(dict(record, mien=REGIONS[region]['mien']))
+            row['url'] = f"{row['url']}?copy={i}"
+            rows[row['url']] = row
+    return list(rows.values())
+
+
+def write_batches(engine, rows, batch_size):
+    """Ghi rows như TourScraperPipeline._upsert, mỗi lô một transaction"""
+    with Session(engine) as session:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            session.execute(build_upsert('sqlite', batch))
+            replace_children(session, batch)
+            session.commit()
+
+
+def read_page(engine, after_id, size=200):
+    stmt = build_query(Tour.__table__).where(Tour.id > after_id).limit(size)
+    with engine.connect() as conn:
+        return conn.execute(stmt).all()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_profile(name, pragmas, rows, batch_size, duration):
+    directory = tempfile.mkdtemp(prefix='bench_sqlite_')
+    try:
+        engine = get_engine(f"sqlite:///{os.path.join(directory, 'tours.db')}", sqlite_pragmas=pragmas)
+        Base.metadata.create_all(engine)
+
+        start = time.perf_counter()
+        write_batches(engine, rows, batch_size)
+        insert_rate = len(rows) / (time.perf_counter() - start)
+
+        with engine.connect() as conn:
+            max_id = conn.scalar(select(Tour.id).order_by(Tour.id.desc()).limit(1))
+
+        stop = threading.Event()
+        written = 0
+
+        def writer():
+            nonlocal written
+            version = 0
+            while not stop.is_set():
+                version += 1
+                batch = [dict(row, gia_tu=f"{version}") for row in random.sample(rows, batch_size)]
+                write_batches(engine, batch, batch_size)
+                written += len(batch)
+
+        thread = threading.Thread(target=writer)
+        latencies = []
+        thread.start()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            read_page(engine, random.randint(0, max_id))
+            latencies.append(time.perf_counter() - start)
+        stop.set()
+        thread.join()
+        engine.dispose()
+
+        print(f"  {name:<8} {insert_rate:9.0f} {written / duration:11.0f} {len(latencies):7} "
+              f"{statistics.median(latencies) * 1000:7.1f} {percentile(latencies, 0.99) * 1000:7.1f} "
+              f"{max(latencies) * 1000:7.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite profile benchmark')
+    parser.add_argument('--scale', type=int, default=10, help='nhân corpus lên bao nhiêu lần')
+    parser.add_argument('--batch-size', type=int, default=100, help='số tour mỗi transaction (DB_BATCH_SIZE)')
+    parser.add_argument('--duration', type=float, default=5.0, help='số giây đo đọc / ghi đồng thời')
+    args = parser.parse_args()
+
+    rows = scaled_rows(args.scale)
+    print(f"Corpus: {len(rows)} tours, lô {args.batch_size}, đọc/ghi đồng thời {args.duration:g}s\n")
+    print(f"  {'profile':<8} {'insert/s':>9} {'ghi+đọc/s':>11} {'reads':>7} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    for name, pragmas in PROFILES:
+        run_profile(name, pragmas, rows, args.batch_size, args.duration)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+# Đo chi phí khởi động: thời gian import module của tour_scraper và `scrapy list`,
+# mỗi lần trong một process Python mới (không có cache import), chạy trong thư mục tạm.
+#
+#   python -m benchmarks.bench_startup [--runs 7]
+#
+# Mỗi mục đo hai lần: "eager" dựng lại cách cũ (import models tạo engine và chạy
+# create_all ngay lúc import, spider import models ở đầu module) bằng cách chạy thêm
+# EAGER_IMPORT trong cùng process; "lazy" là cây hiện tại. Cột "tours.db" cho biết lệnh
+# có tạo file database như tác dụng phụ hay không.
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import {module}; {eager}"
+    "print(time.perf_counter() - start)"
+)
+
+# Tác dụng phụ của models lúc import trước khi engine được tạo khi cần
+EAGER_IMPORT = (
+    "from tour_scraper import models; "
+    "models.Base.metadata.create_all(models.create_engine(models.DATABASE_URL)); "
+)
+
+SCRAPY_LIST = "from scrapy.cmdline import execute; execute(['scrapy', 'list'])"
+
+MODULES = [
+    'tour_scraper.models',
+    'tour_scraper.pipelines',
+    'tour_scraper.spiders.dulichviet',
+]
+
+
+def environment():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env['SCRAPY_SETTINGS_MODULE'] = 'tour_scraper.settings'
+    return env
+
+
+def time_import(module, cwd, env, eager=False):
+    """Thời gian import đo bên trong process con (không tính khởi động interpreter)"""
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET.format(module=module, eager=EAGER_IMPORT if eager else '')],
+        cwd=cwd, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.split()[-1])
+
+
+def time_command(args, cwd, env):
+    """Thời gian chạy cả lệnh (gồm khởi động interpreter)"""
+    start = time.perf_counter()
+    subprocess.run(args, cwd=cwd, env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def measure(run, runs):
+    """(median giây, có tạo tours.db không), mỗi lần chạy trong một thư mục tạm mới"""
+    times = []
+    created = False
+    for _ in range(runs):
+        directory = tempfile.mkdtemp(prefix='bench_startup_')
+        try:
+            times.append(run(directory))
+            created = created or os.path.exists(os.path.join(directory, 'tours.db'))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return statistics.median(times), created
+
+
+def compare(name, eager, lazy, runs):
+    eager_time, eager_created = measure(eager, runs)
+    lazy_time, lazy_created = measure(lazy, runs)
+    created = f"{'có' if eager_created else 'không'} -> {'có' if lazy_created else 'không'}"
+    print(f"  {name:<40} {eager_time * 1000:9.1f} {lazy_time * 1000:9.1f} "
+          f"{eager_time / lazy_time:6.2f} {created:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--runs', type=int, default=7, help='số lần đo mỗi mục')
+    args = parser.parse_args()
+
+    env = environment()
+    print(f"{args.runs} lần / mục, mỗi lần một process mới; median ms\n")
+    print(f"  {'':<40} {'eager':>9} {'lazy':>9} {'x':>6} {'tours.db':>14}")
+
+    for module in MODULES:
+        compare(
+            f"import {module}",
+            lambda cwd, module=module: time_import(module, cwd, env, eager=True),
+            lambda cwd, module=module: time_import(module, cwd, env),
+            args.runs,
+        )
+    compare(
+        'scrapy list',
+        lambda cwd: time_command([sys.executable, '-c', EAGER_IMPORT + SCRAPY_LIST], cwd, env),
+        lambda cwd: time_command([sys.executable, '-m', 'scrapy', 'list'], cwd, env),
+        args.runs,
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
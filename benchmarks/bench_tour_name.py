@@ -0,0 +1,75 @@
+# Micro-benchmark extract_tour_name: bản gốc (dựng lại 3 dict mỗi lần gọi, find từng slug
+# rồi sort), vòng lặp trên dict dựng sẵn, và automaton RE_LOCATION (không / có memo).
+#
+#   python -m benchmarks.bench_tour_name [--repeat 200]
+#
+# Dữ liệu: URL + title các tour trong tours_*.json, thêm các URL không có slug địa danh
+# (bản gốc trả về "Tour Việt Nam", bản mới tìm tiếp trong title).
+
+import argparse
+import timeit
+
+from benchmarks.fixtures import load_records
+from benchmarks.legacy_spider import extract_tour_name as legacy_extract_tour_name
+from tour_scraper import extraction
+
+
+def loop_extract_tour_name(url, title=None):
+    """Cách tìm trước khi có RE_LOCATION: find từng slug của ALL_LOCATIONS"""
+    url_lower = url.lower()
+    found = []
+    for key, name in extraction.ALL_LOCATIONS.items():
+        pos = url_lower.find(key)
+        if pos != -1:
+            found.append((name, pos))
+    if found:
+        found.sort(key=lambda x: x[1])
+        return found[0][0]
+    return "Tour Việt Nam"
+
+
+def automaton_extract_tour_name(url, title=None):
+    """extract_tour_name không qua memo"""
+    return extraction.extract_tour_name.__wrapped__(url, title)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='extract_tour_name micro-benchmark')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [(record['url'], record.get('title')) for _, record in load_records()]
+    no_slug = [(f"https://dulichviet.com.vn/du-lich-trong-nuoc/tour-{i}", title) for i, (_, title) in enumerate(cases)]
+
+    # URL có slug: mọi cách cho cùng kết quả
+    mismatches = [
+        url for url, title in cases
+        if len({legacy_extract_tour_name(url, title), loop_extract_tour_name(url, title),
+                extraction.extract_tour_name(url, title)}) != 1
+    ]
+    from_title = sum(extraction.extract_tour_name(url, title) != "Tour Việt Nam" for url, title in no_slug)
+    print(f"{len(cases)} URL có slug: {len(cases) - len(mismatches)}/{len(cases)} giống bản gốc")
+    print(f"{len(no_slug)} URL không có slug: {from_title} lấy được địa danh từ title "
+          f"(bản gốc: 'Tour Việt Nam')\n")
+
+    implementations = [
+        ('gốc (legacy_spider)', legacy_extract_tour_name),
+        ('vòng lặp dict sẵn', loop_extract_tour_name),
+        ('automaton', automaton_extract_tour_name),
+        ('automaton + memo', extraction.extract_tour_name),
+    ]
+    print(f"  {'':<22} {'µs/URL':>8} {'x':>6}")
+    baseline = None
+    for name, function in implementations:
+        extraction.extract_tour_name.cache_clear()
+        seconds = timeit.timeit(
+            lambda: [function(url, title) for url, title in cases], number=args.repeat
+        ) / args.repeat / len(cases)
+        baseline = baseline or seconds
+        print(f"  {name:<22} {seconds * 1e6:8.2f} {baseline / seconds:6.1f}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
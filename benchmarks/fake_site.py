@@ -0,0 +1,152 @@
+# Site dulichviet giả lập chạy cục bộ, để benchmark crawl end-to-end không cần mạng.
+#
+#   python -m benchmarks.fake_site [--port 8000] [--scale 1] [--per-page 12]
+#                                  [--latency 0.05] [--jitter 0.02] [--error-rate 0.01]
+#                                  [--html-dir pages/]
+#   scrapy crawl dulichviet -a base_url=http://127.0.0.1:8000
+#
+# Trang danh sách (ô mda-box-item, link số trang + rel="next") và trang chi tiết tour
+# (flag2 / flag3 / flag4) dựng từ tours_*.json bằng benchmarks.fixtures, nhân lên
+# --scale lần (đổi slug URL cho khác nhau); hoặc lấy nguyên từ corpus HTML đã lưu
+# (--html-dir, xem bench_parser --dump; khi đó bỏ qua --scale / --per-page).
+# Mỗi response chờ latency ± jitter giây; tỉ lệ --error-rate request nhận 503.
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from benchmarks.fixtures import load_corpus, load_records, render_listing_page, render_tour_page
+from tour_scraper.regions import REGIONS
+
+
+def _key(url):
+    """URL (tuyệt đối hoặc path) → path?query dùng làm key trang"""
+    parts = urlsplit(url)
+    return parts.path + (f'?{parts.query}' if parts.query else '')
+
+
+def build_site(scale=1, per_page=12, html_dir=None):
+    """{path?query: HTML bytes} của mọi trang danh sách và trang tour"""
+    if html_dir:
+        return {_key(page['url']): page['body'] for page in load_corpus(html_dir)}
+
+    by_region = {}
+    for i in range(scale):
+        for region, record in load_records():
+            if i:
+                record = dict(record, url=f"{record['url']}-{i}")
+            by_region.setdefault(region, []).append(record)
+
+    pages = {}
+    for region, records in by_region.items():
+        base_url = urlsplit(REGIONS[region]['start_url']).path
+        total_pages = max(1, -(-len(records) // per_page))
+        for page in range(1, total_pages + 1):
+            chunk = records[(page - 1) * per_page:page * per_page]
+            url = base_url if page == 1 else f'{base_url}?page={page}'
+            pages[url] = render_listing_page(chunk, page, total_pages, base_url).encode('utf-8')
+            for record in chunk:
+                pages[_key(record['url'])] = render_tour_page(record).encode('utf-8')
+    return pages
+
+
+class FakeSite:
+    """Dữ liệu + cấu hình của server; đếm số request / lỗi đã trả"""
+
+    def __init__(self, pages, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with site.lock:
+                    site.requests += 1
+                    delay = max(0.0, site.latency + site.random.uniform(-site.jitter, site.jitter))
+                    failed = site.random.random() < site.error_rate
+                    if failed:
+                        site.errors += 1
+                if delay:
+                    time.sleep(delay)
+
+                body = site.pages.get(_key(self.path))
+                if failed:
+                    self._send(503, b'Service Unavailable', 'text/plain')
+                elif body is None:
+                    self._send(404, b'Not Found', 'text/plain')
+                else:
+                    self._send(200, body, 'text/html; charset=utf-8')
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Tạo server (port 0 → port trống bất kỳ); gọi serve_forever() để chạy"""
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        return server
+
+
+def add_arguments(parser):
+    parser.add_argument('--scale', type=int, default=1, help='nhân số tour lên bao nhiêu lần')
+    parser.add_argument('--per-page', type=int, default=12, help='số tour mỗi trang danh sách')
+    parser.add_argument('--latency', type=float, default=0.0, help='thời gian chờ mỗi response (giây)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='latency ± jitter giây')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='tỉ lệ request nhận 503 (0..1)')
+    parser.add_argument('--html-dir', help='corpus HTML đã lưu (manifest.json) thay vì dựng từ JSON')
+    parser.add_argument('--seed', type=int, help='seed cho latency / lỗi ngẫu nhiên')
+
+
+def site_from_args(args):
+    pages = build_site(scale=args.scale, per_page=args.per_page, html_dir=args.html_dir)
+    return FakeSite(pages, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Site dulichviet giả lập cho benchmark crawl')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help='0 → port trống bất kỳ')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    site = site_from_args(args)
+    server = site.serve(args.host, args.port)
+    host, port = server.server_address[:2]
+    # Dòng đầu tiên là URL (bench_crawl đọc để biết port)
+    print(f"http://{host}:{port}", flush=True)
+    print(f"✓ {len(site.pages)} trang, latency {args.latency}±{args.jitter}s, "
+          f"lỗi {args.error_rate:.1%}  (Ctrl+C để dừng)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n{site.requests} requests, {site.errors} lỗi 503")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
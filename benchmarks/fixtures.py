@@ -0,0 +1,288 @@
+# Dựng trang HTML tour dulichviet từ dữ liệu JSON đã crawl (tours_*.json),
+# để benchmark / kiểm tra parser mà không cần mạng.
+
+import json
+import os
+import re
+from html import escape
+
+from scrapy.http import HtmlResponse, Request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORPORA = {
+    "mienbac": os.path.join(ROOT, "tours_mienbac.json"),
+    "miennam": os.path.join(ROOT, "tours_miennam.json"),
+    "mientrung": os.path.join(ROOT, "tours_mientrung.json"),
+}
+
+# Menu điều hướng giống site thật: trang tour luôn có một khối lớn link/text không liên quan
+NAV_DESTINATIONS = [
+    "Hà Nội", "Hạ Long", "Sapa", "Ninh Bình", "Hà Giang", "Đà Nẵng", "Hội An", "Huế",
+    "Nha Trang", "Đà Lạt", "Quy Nhơn", "Phú Quốc", "Côn Đảo", "Cần Thơ", "Miền Tây", "Vũng Tàu",
+]
+
+_DAY_PREFIX = re.compile(r'^(NGÀY\s+\d+)\s*:\s*', re.IGNORECASE)
+
+
+def load_records(regions=None):
+    """Đọc các bản ghi tour trong corpus JSON, kèm key miền"""
+    records = []
+    for region, path in CORPORA.items():
+        if regions and region not in regions:
+            continue
+        with open(path, encoding="utf-8") as f:
+            for record in json.load(f):
+                records.append((region, record))
+    return records
+
+
+def _nav_html():
+    items = []
+    for name in NAV_DESTINATIONS:
+        slug = name.lower().replace(" ", "-")
+        items.append(f'<li><a href="/du-lich-{escape(slug)}">Du lịch {escape(name)}</a></li>')
+    return '<div class="header"><ul class="menu">' + ''.join(items) * 4 + '</ul></div>'
+
+
+NAV_HTML = _nav_html()
+
+
+def _footer_html(slogan):
+    return '<div class="footer">' + f'<p>Công ty Du Lịch Việt - Hotline 1900 1177 - {slogan}.</p>' * 20 + '</div>'
+
+
+FOOTER_HTML = _footer_html('Trải nghiệm dịch vụ du lịch chất lượng')
+# Footer không có chữ "Trải nghiệm", cho trang đổi tiêu đề khối trải nghiệm
+PLAIN_FOOTER_HTML = _footer_html('Dịch vụ du lịch chất lượng')
+
+
+def _info_row(label, value):
+    if not value:
+        return ''
+    return f'<div class="item"><div class="at">{escape(label)}</div><div class="as">{escape(value)}</div></div>'
+
+
+def _trai_nghiem_html(items, heading):
+    if not items:
+        return ''
+    lines = ''.join(f'✔️ {escape(x)}<br>' for x in items)
+    return f'<p>{escape(heading)}:<br>{lines}</p>'
+
+
+def _activity_html(activity):
+    lines = activity.split('\n')
+    if all(line.startswith('• ') for line in lines):
+        return '<ul>' + ''.join(f'<li>{escape(line[2:])}</li>' for line in lines) + '</ul>'
+    return '<p>' + '<br>'.join(escape(line) for line in lines) + '</p>'
+
+
+def _lich_trinh_html(days):
+    if not days:
+        return ''
+    out = ['<div id="flag2">']
+    for day in days:
+        title = _DAY_PREFIX.sub(r'\1 | ', day.get('ngay') or '')
+        activities = ''.join(_activity_html(a) for a in day.get('hoat_dong') or [] if a)
+        out.append(
+            '<div class="day active">'
+            f'<div class="titDay"><h2>{escape(title)}</h2></div>'
+            f'<div class="contDay"><div class="the-content desc">{activities}</div></div>'
+            '</div>'
+        )
+    out.append('</div>')
+    return ''.join(out)
+
+
+def _dich_vu_html(bao_gom, khong_bao_gom):
+    if not bao_gom and not khong_bao_gom:
+        return ''
+    out = ['<div id="flag3"><div class="the-content desc">']
+    if bao_gom:
+        out.append('<p><strong>Giá tour bao gồm:</strong></p><ul>')
+        out.extend(f'<li>{escape(x)}</li>' for x in bao_gom)
+        out.append('</ul>')
+    if khong_bao_gom:
+        out.append('<p><strong>Giá tour không bao gồm:</strong></p><ul>')
+        out.extend(f'<li>{escape(x)}</li>' for x in khong_bao_gom)
+        out.append('</ul>')
+    out.append('</div></div>')
+    return ''.join(out)
+
+
+def _ghi_chu_html(notes):
+    if not notes:
+        return ''
+    out = ['<div id="flag4"><div class="the-content desc">']
+    for note in notes:
+        if note.startswith('__') and note.endswith('__'):
+            out.append(f'<p><strong><u>{escape(note[2:-2])}</u></strong></p>')
+        elif note.startswith('* '):
+            out.append(f'<ul><li>{escape(note[2:])}</li></ul>')
+        else:
+            out.append(f'<p>{escape(note)}</p>')
+    out.append('</div></div>')
+    return ''.join(out)
+
+
+def render_tour_page(record, trai_nghiem_in_attr=True, trai_nghiem_heading='Trải nghiệm'):
+    """
+    HTML trang chi tiết tour theo đúng cấu trúc mà parse_tour_detail đọc.
+    trai_nghiem_in_attr=False đặt khối "Trải nghiệm" ngoài div.attr (như một số trang thật)
+    → Strategy 1 không thấy, phải dùng strategy fallback. Đổi thêm trai_nghiem_heading
+    (vd. "Điểm nổi bật") thì trang không có chữ "Trải nghiệm" nào, kể cả footer → Strategy 3.
+    """
+    title = record.get('title') or ''
+    trai_nghiem = _trai_nghiem_html(record.get('trai_nghiem'), trai_nghiem_heading)
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        f'<title>{escape(title)} | Du Lịch Việt</title></head><body>'
+        + NAV_HTML
+        + '<div class="wrap">'
+        f'<div class="name">{escape(title)}</div>'
+        '<div class="boxPrice">'
+        f'<span>Giá từ</span><b>{escape(record.get("gia_tu") or "")}</b>'
+        '<div class="attr">'
+        + _info_row('Mã tour', record.get('ma_tour'))
+        + _info_row('Thời gian', record.get('thoi_gian'))
+        + _info_row('Khởi hành', record.get('khoi_hanh'))
+        + _info_row('Vận Chuyển', record.get('van_chuyen'))
+        + _info_row('Xuất phát', record.get('xuat_phat'))
+        + (trai_nghiem if trai_nghiem_in_attr else '')
+        + '</div></div>'
+        + ('' if trai_nghiem_in_attr else f'<div class="content">{trai_nghiem}</div>')
+        + _lich_trinh_html(record.get('lich_trinh'))
+        + _dich_vu_html(record.get('dich_vu_bao_gom'), record.get('dich_vu_khong_bao_gom'))
+        + _ghi_chu_html(record.get('ghi_chu'))
+        + '</div>'
+        + (FOOTER_HTML if trai_nghiem_heading == 'Trải nghiệm' else PLAIN_FOOTER_HTML)
+        + '</body></html>'
+    )
+
+
+def render_listing_page(records, page, total_pages, base_url):
+    """Trang danh sách tour: các ô mda-box-item + link số trang và rel=next (ul.pagination)"""
+    boxes = []
+    for record in records:
+        path = record['url'].replace('https://dulichviet.com.vn', '')
+        image = record.get('hinh_anh_chinh') or ''
+        boxes.append(
+            '<div class="col-md-4"><div class="mda-box-item">'
+            f'<a href="{escape(path)}"><img data-src="{escape(image)}" src="data:image/gif;base64,R0lGOD"></a>'
+            f'<div class="mda-box-name"><a href="{escape(path)}">{escape(record.get("title") or "")}</a></div>'
+            f'<div class="mda-box-price">{escape(record.get("gia_tu") or "")}</div>'
+            '</div></div>'
+        )
+
+    pages = []
+    for number in range(1, total_pages + 1):
+        href = base_url if number == 1 else f'{base_url}?page={number}'
+        pages.append(f'<li><a href="{escape(href)}">{number}</a></li>')
+    if page < total_pages:
+        pages.append(f'<li><a rel="next" href="{escape(base_url)}?page={page + 1}">Sau</a></li>')
+
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Du lịch</title></head><body>'
+        + NAV_HTML
+        + '<div class="wrap"><div class="row">' + ''.join(boxes) + '</div>'
+        + '<ul class="pagination">' + ''.join(pages) + '</ul></div>'
+        + FOOTER_HTML
+        + '</body></html>'
+    )
+
+
+def listing_pages(per_page=12, regions=None):
+    """(miền, url, html) cho các trang danh sách của từng miền, chia trang như site thật"""
+    from tour_scraper.regions import REGIONS
+
+    by_region = {}
+    for region, record in load_records(regions):
+        by_region.setdefault(region, []).append(record)
+
+    for region, records in by_region.items():
+        base_url = REGIONS[region]['start_url']
+        total_pages = max(1, -(-len(records) // per_page))
+        for page in range(1, total_pages + 1):
+            chunk = records[(page - 1) * per_page:page * per_page]
+            url = base_url if page == 1 else f'{base_url}?page={page}'
+            yield region, url, render_listing_page(chunk, page, total_pages, base_url)
+
+
+def make_response(url, html, meta=None):
+    request = Request(url, meta=meta or {})
+    return HtmlResponse(url=url, body=html.encode('utf-8'), encoding='utf-8', request=request)
+
+
+def tour_responses(regions=None, trai_nghiem_in_attr=True, trai_nghiem_heading='Trải nghiệm'):
+    """(miền, bản ghi JSON gốc, HtmlResponse) cho từng tour trong corpus"""
+    for region, record in load_records(regions):
+        meta = {'hinh_anh_chinh': record.get('hinh_anh_chinh'), 'region': region}
+        html = render_tour_page(record, trai_nghiem_in_attr, trai_nghiem_heading)
+        yield region, record, make_response(record['url'], html, meta)
+
+
+# ============================================================
+# Corpus trang HTML lưu trên đĩa
+# ============================================================
+# Thư mục gồm manifest.json: [{"kind": "tour"|"listing", "url": ..., "region": ..., "file": ...}]
+# và các file HTML. Có thể thay bằng trang thật tải từ dulichviet.com.vn.
+
+def save_corpus(directory, per_page=12):
+    """Ghi các trang fixture dựng từ JSON ra thư mục để dùng lại / thay bằng trang thật"""
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+
+    for idx, (region, url, html) in enumerate(listing_pages(per_page)):
+        name = f'listing_{region}_{idx:03d}.html'
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+        manifest.append({'kind': 'listing', 'url': url, 'region': region, 'file': name})
+
+    for idx, (region, record) in enumerate(load_records()):
+        name = f'tour_{region}_{idx:03d}.html'
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(render_tour_page(record))
+        manifest.append({
+            'kind': 'tour', 'url': record['url'], 'region': region, 'file': name,
+            'hinh_anh_chinh': record.get('hinh_anh_chinh'),
+        })
+
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_corpus(directory=None, per_page=12):
+    """
+    Danh sách trang {'kind', 'url', 'region', 'body', 'meta'}.
+    Không có directory thì dựng từ tours_*.json.
+    """
+    pages = []
+    if directory:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        for entry in manifest:
+            with open(os.path.join(directory, entry['file']), 'rb') as f:
+                body = f.read()
+            meta = {'region': entry.get('region')}
+            if entry['kind'] == 'tour':
+                meta['hinh_anh_chinh'] = entry.get('hinh_anh_chinh')
+            pages.append({'kind': entry['kind'], 'url': entry['url'], 'region': entry.get('region'),
+                          'body': body, 'meta': meta})
+        return pages
+
+    for region, url, html in listing_pages(per_page):
+        pages.append({'kind': 'listing', 'url': url, 'region': region,
+                      'body': html.encode('utf-8'), 'meta': {'region': region}})
+    for region, record in load_records():
+        pages.append({'kind': 'tour', 'url': record['url'], 'region': region,
+                      'body': render_tour_page(record).encode('utf-8'),
+                      'meta': {'hinh_anh_chinh': record.get('hinh_anh_chinh'), 'region': region}})
+    return pages
+
+
+def page_response(page):
+    """HtmlResponse mới cho một trang trong corpus (selector chưa được cache)"""
+    request = Request(page['url'], meta=dict(page['meta']))
+    return HtmlResponse(url=page['url'], body=page['body'], encoding='utf-8', request=request)
+
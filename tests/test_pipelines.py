@@ -0,0 +1,40 @@
+import logging
+
+from scrapy.http import HtmlResponse, Request
+from sqlalchemy import select
+
+from benchmarks.fixtures import load_records, render_tour_page
+from tour_scraper.models import Tour, get_engine
+from tour_scraper.pipelines import TourScraperPipeline
+from tour_scraper.spiders import test as test_spider
+
+
+def tour_response(record):
+    return HtmlResponse(
+        record['url'],
+        body=render_tour_page(record).encode('utf-8'),
+        encoding='utf-8',
+        request=Request(record['url']),
+    )
+
+
+def test_test_spider_item_goes_through_pipeline(tmp_path):
+    """Item của spider test có đủ cột bắt buộc: không bị DropItem (feed export vẫn nhận) và được ghi DB"""
+    region, record = next((region, record) for region, record in load_records() if region == 'miennam')
+    spider = test_spider.DuLichVietSpider()
+    spider.logger.setLevel(logging.WARNING)
+    [item] = list(spider.parse_tour_detail(tour_response(record)))
+    assert item['mien'] == 'Miền Nam'
+
+    database_url = f"sqlite:///{tmp_path / 'tours.db'}"
+    pipeline = TourScraperPipeline(database_url=database_url, batch_size=1)
+    pipeline.open_spider(spider)
+    try:
+        assert pipeline.process_item(item, spider) is item
+    finally:
+        pipeline.flush(spider)
+        pipeline.session.close()
+
+    with get_engine(database_url).connect() as conn:
+        row = conn.execute(select(Tour.url, Tour.mien).where(Tour.url == record['url'])).one()
+    assert row.mien == 'Miền Nam'
@@ -0,0 +1,198 @@
+# Lưu response HTTP của một lần crawl thật để chạy lại spider hoàn toàn offline
+# (HttpArchiveMiddleware, HTTP_ARCHIVE_MODE = "record" / "replay").
+#
+# Một file SQLite gồm hai bảng:
+#   responses(fingerprint, method, url, status, headers, body_hash, recorded_at)
+#   bodies(body_hash, codec, size, data)   nội dung đã nén, đánh địa chỉ theo hash
+# nên các response có nội dung giống nhau chỉ lưu body một lần.
+# Nén bằng zstd nếu có (compression.zstd trên Python 3.14+, hoặc package zstandard),
+# không thì zlib; codec lưu theo từng body nên archive ghi bằng codec nào cũng đọc được.
+#
+#   python -m tour_scraper.archive http_archive.db     # thống kê archive
+
+import argparse
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+
+from .fingerprints import body_hash
+
+
+def _zstd_codec():
+    """(compress, decompress) của zstd, hoặc None nếu không có thư viện"""
+    try:
+        from compression import zstd
+        return zstd.compress, zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+
+CODECS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "raw": (bytes, bytes),
+}
+_zstd = _zstd_codec()
+if _zstd is not None:
+    CODECS["zstd"] = _zstd
+
+DEFAULT_CODEC = "zstd" if "zstd" in CODECS else "zlib"
+
+
+def encode_headers(headers):
+    """Scrapy Headers → JSON {tên: [giá trị, ...]} (giữ header lặp lại như Set-Cookie)"""
+    return json.dumps({
+        name.decode("latin-1"): [value.decode("latin-1") for value in values]
+        for name, values in headers.items()
+    })
+
+
+def decode_headers(text):
+    return {name: [value.encode("latin-1") for value in values] for name, values in json.loads(text).items()}
+
+
+class HttpArchive:
+    """
+    Index (fingerprint → metadata response) được đọc hết vào dict khi mở, body chỉ được
+    đọc và giải nén khi cần. Response mới được ghi theo lô (mỗi flush_every response và khi đóng).
+    """
+
+    def __init__(self, path, codec=None, flush_every=100):
+        codec = codec or DEFAULT_CODEC
+        if codec not in CODECS:
+            raise ValueError(f"Unknown archive codec {codec!r} (available: {', '.join(CODECS)})")
+        self.path = path
+        self.codec = codec
+        self.flush_every = max(1, flush_every)
+        self.conn = None
+        self.index = {}
+        self.body_hashes = set()
+        self.dirty = {}
+        self.dirty_bodies = {}
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " method TEXT,"
+            " url TEXT,"
+            " status INTEGER,"
+            " headers TEXT,"
+            " body_hash TEXT,"
+            " recorded_at TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS bodies ("
+            " body_hash TEXT PRIMARY KEY,"
+            " codec TEXT,"
+            " size INTEGER,"
+            " data BLOB)"
+        )
+        rows = self.conn.execute("SELECT fingerprint, url, status, headers, body_hash FROM responses")
+        for fingerprint, url, status, headers, hash_ in rows:
+            self.index[fingerprint] = (url, status, headers, hash_)
+        self.body_hashes.update(hash_ for (hash_,) in self.conn.execute("SELECT body_hash FROM bodies"))
+        return self
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.index
+
+    def get(self, fingerprint):
+        """dict(url, status, headers, body) của response đã lưu, hoặc None"""
+        entry = self.index.get(fingerprint)
+        if entry is None:
+            return None
+        url, status, headers, hash_ = entry
+        return {
+            "url": url,
+            "status": status,
+            "headers": decode_headers(headers),
+            "body": self._body(hash_),
+        }
+
+    def _body(self, hash_):
+        pending = self.dirty_bodies.get(hash_)
+        if pending is not None:
+            return pending[2]
+        codec, data = self.conn.execute(
+            "SELECT codec, data FROM bodies WHERE body_hash = ?", (hash_,)
+        ).fetchone()
+        return CODECS[codec][1](data)
+
+    def put(self, fingerprint, method, url, status, headers, body):
+        """headers: Scrapy Headers; body: bytes"""
+        hash_ = body_hash(body)
+        if hash_ not in self.body_hashes:
+            self.body_hashes.add(hash_)
+            self.dirty_bodies[hash_] = (self.codec, len(body), body)
+
+        headers = encode_headers(headers)
+        self.index[fingerprint] = (url, status, headers, hash_)
+        self.dirty[fingerprint] = (method, url, status, headers, hash_, datetime.now().isoformat(timespec="seconds"))
+        if len(self.dirty) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.conn is None or not (self.dirty or self.dirty_bodies):
+            return
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO bodies (body_hash, codec, size, data) VALUES (?, ?, ?, ?)",
+            [
+                (hash_, codec, size, CODECS[codec][0](body))
+                for hash_, (codec, size, body) in self.dirty_bodies.items()
+            ],
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO responses"
+            " (fingerprint, method, url, status, headers, body_hash, recorded_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(fingerprint, *record) for fingerprint, record in self.dirty.items()],
+        )
+        self.conn.commit()
+        self.dirty.clear()
+        self.dirty_bodies.clear()
+
+    def stats(self):
+        """Số response, số body, tổng kích thước gốc / đã nén (byte)"""
+        bodies, size, stored = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM bodies"
+        ).fetchone()
+        return {"responses": len(self.index), "bodies": bodies, "size": size, "stored": stored}
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.close()
+        self.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Thống kê HTTP archive')
+    parser.add_argument('path', nargs='?', default='http_archive.db')
+    args = parser.parse_args()
+
+    archive = HttpArchive(args.path).open()
+    try:
+        stats = archive.stats()
+        codecs = archive.conn.execute("SELECT codec, COUNT(*) FROM bodies GROUP BY codec").fetchall()
+    finally:
+        archive.close()
+
+    ratio = stats['size'] / stats['stored'] if stats['stored'] else 0
+    print(f"✓ {stats['responses']} responses, {stats['bodies']} bodies "
+          f"({', '.join(f'{codec}: {count}' for codec, count in codecs) or 'trống'})")
+    print(f"  {stats['size'] / 1024 / 1024:.2f} MB → {stats['stored'] / 1024 / 1024:.2f} MB (x{ratio:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# Xuất tour trực tiếp từ database (bảng tours) ra Excel / CSV / JSONL / Parquet.
+# Đọc bằng cursor streaming (yield_per) chỉ các cột cần xuất, không load ORM object,
+# nên xuất một phần dữ liệu không cần đọc lại các file tours_*.json.
+#
+#   python -m tour_scraper.export_db tours_mienbac.xlsx --region mienbac
+#   python -m tour_scraper.export_db tours.csv --since 2025-11-01 --until 2025-12-01
+#   python -m tour_scraper.export_db changed.jsonl --changed-since 2025-11-20
+#   python -m tour_scraper.export_db tours.parquet --db postgresql://...
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .export_excel import COLUMNS, tour_to_row, write_tours
+from .models import decode_json
+from .regions import REGIONS
+
+# Cột được xuất (theo thứ tự)
+EXPORT_FIELDS = [
+    'url', 'mien', 'hinh_anh_chinh', 'tour_name', 'title', 'ma_tour',
+    'thoi_gian', 'khoi_hanh', 'van_chuyen', 'xuat_phat', 'gia_tu',
+    'trai_nghiem', 'diem_nhan_hanh_trinh', 'lich_trinh',
+    'dich_vu_bao_gom', 'dich_vu_khong_bao_gom', 'ghi_chu',
+    'created_at', 'updated_at', 'last_seen_at',
+]
+
+# Cột JSON (list / list of dicts)
+JSON_FIELDS = {
+    'trai_nghiem', 'diem_nhan_hanh_trinh', 'lich_trinh',
+    'dich_vu_bao_gom', 'dich_vu_khong_bao_gom', 'ghi_chu',
+}
+
+FORMATS = ('xlsx', 'csv', 'jsonl', 'parquet')
+
+
+def region_name(region):
+    """'mienbac' → 'Miền Bắc'; tên miền đầy đủ giữ nguyên"""
+    if region in REGIONS:
+        return REGIONS[region]['mien']
+    return region
+
+
+def build_query(table, regions=None, since=None, until=None, changed_since=None):
+    """
+    SELECT các cột EXPORT_FIELDS của bảng tours, lọc theo:
+      regions        danh sách miền (key trong REGIONS hoặc tên miền)
+      since / until  created_at trong [since, until)
+      changed_since  nội dung đổi (updated_at, hoặc created_at nếu chưa đổi lần nào) từ thời điểm này
+    """
+    columns = [table.c[name] for name in EXPORT_FIELDS]
+    stmt = select(*columns).order_by(table.c.id)
+
+    if regions:
+        stmt = stmt.where(table.c.mien.in_([region_name(r) for r in regions]))
+    if since is not None:
+        stmt = stmt.where(table.c.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(table.c.created_at < until)
+    if changed_since is not None:
+        stmt = stmt.where(func.coalesce(table.c.updated_at, table.c.created_at) >= changed_since)
+    return stmt
+
+
+def row_to_record(row):
+    """Một dòng kết quả → dict cùng dạng bản ghi trong tours_*.json"""
+    record = dict(row)
+    for name in JSON_FIELDS:
+        if name in record:
+            record[name] = decode_json(record[name])
+    return record
+
+
+def iter_db_tours(session, stmt, batch_size=500):
+    """Duyệt từng tour, mỗi lần chỉ lấy batch_size dòng từ cursor"""
+    result = session.execute(stmt.execution_options(yield_per=batch_size))
+    for row in result.mappings():
+        yield row_to_record(row)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_excel(records, path, batch_size=500):
+    return write_tours(records, path)
+
+
+def write_csv(records, path, batch_size=500):
+    """Cùng cột và cách trình bày như file Excel; utf-8-sig để Excel đọc đúng tiếng Việt"""
+    count = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(tour_to_row(record))
+            count += 1
+    return count
+
+
+def write_jsonl(records, path, batch_size=500):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=_json_default))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def write_parquet(records, path, batch_size=500):
+    """Cột list / lich_trinh giữ dạng lồng nhau, xem export_parquet"""
+    from .export_parquet import write_parquet as write
+
+    return write(records, path, batch_size=batch_size)
+
+
+WRITERS = {
+    'xlsx': write_excel,
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet,
+}
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext in WRITERS:
+        return ext
+    raise ValueError(f"Không nhận ra định dạng của {path} (hỗ trợ: {', '.join(FORMATS)})")
+
+
+def export_tours(output, fmt=None, regions=None, since=None, until=None, changed_since=None,
+                 database_url=None, batch_size=500):
+    """
+    Xuất các tour thỏa điều kiện lọc ra file output, trả về số tour.
+    Bảng tours chưa được migrate (VD tours.db cũ) → SchemaError.
+    """
+    from .migrations import check_tables
+    from .models import DATABASE_URL, Tour, get_engine
+
+    fmt = fmt or detect_format(output)
+    engine = get_engine(database_url or DATABASE_URL)
+    check_tables(engine, [Tour.__table__])
+    stmt = build_query(Tour.__table__, regions=regions, since=since, until=until, changed_since=changed_since)
+
+    with Session(engine) as session:
+        records = iter_db_tours(session, stmt, batch_size=batch_size)
+        return WRITERS[fmt](records, output, batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Xuất tour từ database ra Excel / CSV / JSONL / Parquet')
+    parser.add_argument('output', help='file kết quả (.xlsx, .csv, .jsonl, .parquet)')
+    parser.add_argument('--format', choices=FORMATS, help='mặc định theo đuôi file')
+    parser.add_argument('--region', action='append', dest='regions',
+                        help=f"lọc theo miền ({', '.join(REGIONS)}), lặp lại để chọn nhiều miền")
+    parser.add_argument('--since', type=datetime.fromisoformat, help='created_at >= SINCE (ISO, VD 2025-11-01)')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='created_at < UNTIL')
+    parser.add_argument('--changed-since', type=datetime.fromisoformat,
+                        help='tour có nội dung thay đổi (hoặc mới) từ thời điểm này')
+    parser.add_argument('--db', dest='database_url', help='database URL, mặc định models.DATABASE_URL')
+    parser.add_argument('--batch-size', type=int, default=500, help='số dòng mỗi lần lấy từ cursor')
+    args = parser.parse_args()
+
+    from .migrations import SchemaError
+
+    try:
+        count = export_tours(
+            args.output,
+            fmt=args.format,
+            regions=args.regions,
+            since=args.since,
+            until=args.until,
+            changed_since=args.changed_since,
+            database_url=args.database_url,
+            batch_size=args.batch_size,
+        )
+    except SchemaError as exc:
+        raise SystemExit(str(exc))
+    print(f"✓ Đã xuất {count} tours ra file {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,148 +1,257 @@
 # export_excel.py
+import argparse
 import json
-import pandas as pd
 from datetime import datetime
 
+# Thứ tự cột và độ rộng cột trong file Excel
+COLUMNS = [
+    'URL', 'Hình ảnh', 'Tour', 'Tên Tour', 'Mã Tour',
+    'Thời gian', 'Khởi hành', 'Vận chuyển', 'Xuất phát', 'Giá từ',
+    'Trải nghiệm', 'Điểm nhấn hành trình',
+    'Lịch trình',
+    'Dịch vụ bao gồm',
+    'Dịch vụ không bao gồm',
+    'Ghi chú'
+]
+
+COLUMN_WIDTHS = {
+    'URL': 60,
+    'Hình ảnh': 60,
+    'Tour': 20,
+    'Tên Tour': 60,
+    'Mã Tour': 15,
+    'Thời gian': 15,
+    'Khởi hành': 25,
+    'Vận chuyển': 25,
+    'Xuất phát': 20,
+    'Giá từ': 15,
+    'Trải nghiệm': 50,
+    'Điểm nhấn hành trình': 50,
+    'Lịch trình': 80,
+    'Dịch vụ bao gồm': 50,
+    'Dịch vụ không bao gồm': 50,
+    'Ghi chú': 50
+}
+
+
+def flatten_list(items, prefix='- '):
+    """Làm phẳng list thành các dòng '- item'"""
+    if not items:
+        return ''
+    if isinstance(items, list):
+        return '\n'.join([f"{prefix}{item}" for item in items])
+    return str(items)
+
+
+def format_lich_trinh(days):
+    """Format lịch trình - KHÔNG dùng \n làm separator"""
+    lich_trinh_text = ''
+    if days:
+        for day_idx, day in enumerate(days, 1):
+            # Thêm separator giữa các ngày
+            if day_idx > 1:
+                lich_trinh_text += '\n' + '='*60 + '\n'
+
+            # Thêm tiêu đề ngày
+            lich_trinh_text += day.get('ngay', f'NGÀY {day_idx}') + '\n'
+            lich_trinh_text += '='*60 + '\n'
+
+            # Thêm các hoạt động - mỗi activity đã là một string hoàn chỉnh
+            for activity in day.get('hoat_dong', []):
+                # Activity đã có format: "Sáng:\n* item1\n* item2"
+                # Chúng ta chỉ cần thêm vào và xuống dòng
+                lich_trinh_text += activity + '\n\n'
+    return lich_trinh_text.strip()
+
+
+def tour_to_row(tour):
+    """Một tour (dict từ JSON) → dict {tên cột Excel: giá trị}"""
+    return {
+        'URL': tour.get('url'),
+        'Hình ảnh': tour.get('hinh_anh_chinh'),
+        'Tour': tour.get('tour_name'),
+        'Tên Tour': tour.get('title'),
+        'Mã Tour': tour.get('ma_tour'),
+        'Thời gian': tour.get('thoi_gian'),
+        'Khởi hành': tour.get('khoi_hanh'),
+        'Vận chuyển': tour.get('van_chuyen'),
+        'Xuất phát': tour.get('xuat_phat'),
+        'Giá từ': tour.get('gia_tu'),
+        'Trải nghiệm': flatten_list(tour.get('trai_nghiem')),
+        'Điểm nhấn hành trình': flatten_list(tour.get('diem_nhan_hanh_trinh')),
+        'Lịch trình': format_lich_trinh(tour.get('lich_trinh')),
+        'Dịch vụ bao gồm': flatten_list(tour.get('dich_vu_bao_gom')),
+        'Dịch vụ không bao gồm': flatten_list(tour.get('dich_vu_khong_bao_gom')),
+        'Ghi chú': flatten_list(tour.get('ghi_chu')),
+    }
+
+
 def export_to_excel(json_file='tours_data.json', excel_file='tours_data.xlsx'):
     """Chuyển đổi JSON sang Excel với format đẹp"""
     
     with open(json_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
-    processed_data = []
-    for tour in data:
-        # Format lịch trình - KHÔNG dùng \n làm separator
-        lich_trinh_text = ''
-        if tour.get('lich_trinh'):
-            for day_idx, day in enumerate(tour['lich_trinh'], 1):
-                # Thêm separator giữa các ngày
-                if day_idx > 1:
-                    lich_trinh_text += '\n' + '='*60 + '\n'
-                
-                # Thêm tiêu đề ngày
-                lich_trinh_text += day.get('ngay', f'NGÀY {day_idx}') + '\n'
-                lich_trinh_text += '='*60 + '\n'
-                
-                # Thêm các hoạt động - mỗi activity đã là một string hoàn chỉnh
-                for activity in day.get('hoat_dong', []):
-                    # Activity đã có format: "Sáng:\n* item1\n* item2"
-                    # Chúng ta chỉ cần thêm vào và xuống dòng
-                    lich_trinh_text += activity + '\n\n'
-        
-        # Làm phẳng các list khác
-        def flatten_list(items, prefix='- '):
-            if not items:
-                return ''
-            if isinstance(items, list):
-                return '\n'.join([f"{prefix}{item}" for item in items])
-            return str(items)
-        
-        processed_tour = {
-            'URL': tour.get('url'),
-            'Hình ảnh': tour.get('hinh_anh_chinh'),
-            'Tour': tour.get('tour_name'), 
-            'Tên Tour': tour.get('title'),
-            'Mã Tour': tour.get('ma_tour'),
-            'Thời gian': tour.get('thoi_gian'),
-            'Khởi hành': tour.get('khoi_hanh'),
-            'Vận chuyển': tour.get('van_chuyen'),
-            'Xuất phát': tour.get('xuat_phat'),
-            'Giá từ': tour.get('gia_tu'),
-            'Trải nghiệm': flatten_list(tour.get('trai_nghiem')),
-            'Điểm nhấn hành trình': flatten_list(tour.get('diem_nhan_hanh_trinh')),
-            'Lịch trình': lich_trinh_text.strip(),
-            'Dịch vụ bao gồm': flatten_list(tour.get('dich_vu_bao_gom')),
-            'Dịch vụ không bao gồm': flatten_list(tour.get('dich_vu_khong_bao_gom')),
-            'Ghi chú': flatten_list(tour.get('ghi_chu')),
-        }
-        processed_data.append(processed_tour)
+    count = write_tours(data, excel_file)
     
-    df = pd.DataFrame(processed_data)
-    
-    columns_order = [
-       'URL', 'Hình ảnh', 'Tour', 'Tên Tour', 'Mã Tour', 
-        'Thời gian', 'Khởi hành', 'Vận chuyển', 'Xuất phát', 'Giá từ',
-        'Trải nghiệm', 'Điểm nhấn hành trình',
-        'Lịch trình',
-        'Dịch vụ bao gồm',
-        'Dịch vụ không bao gồm',
-        'Ghi chú'
-    ]
-    
-    columns_order = [col for col in columns_order if col in df.columns]
-    df = df[columns_order]
-    
-    with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Tours')
-        
-        worksheet = writer.sheets['Tours']
-        
-        # Set column widths - tùy chỉnh width cho từng cột
-        column_widths = {
-            'URL': 60,
-            'Hình ảnh': 60,
-            'Tour': 20,
-            'Tên Tour': 60,
-            'Mã Tour': 15,
-            'Thời gian': 15,
-            'Khởi hành': 25,
-            'Vận chuyển': 25,
-            'Xuất phát': 20,
-            'Giá từ': 15,
-            'Trải nghiệm': 50,
-            'Điểm nhấn hành trình': 50,
-            'Lịch trình': 80,
-            'Dịch vụ bao gồm': 50,
-            'Dịch vụ không bao gồm': 50,
-            'Ghi chú': 50
-        }
-        
-        for idx, col in enumerate(df.columns):
-            # Lấy width tùy chỉnh hoặc tính toán tự động
-            if col in column_widths:
-                width = column_widths[col]
-            else:
-                max_length = max(
-                    df[col].astype(str).apply(len).max(),
-                    len(col)
-                )
-                width = min(max_length + 2, 80)
-            
-            # Tính column letter
-            if idx < 26:
-                col_letter = chr(65 + idx)
-            else:
-                col_letter = chr(65 + idx // 26 - 1) + chr(65 + idx % 26)
-            
-            worksheet.column_dimensions[col_letter].width = width
-        
-        # Enable text wrap cho tất cả cells và style cho header
-        from openpyxl.styles import Alignment, Font, PatternFill
-        
-        # Style cho header row
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        
-        for cell in worksheet[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(wrap_text=True, vertical='top', horizontal='center')
-        
-        # Style cho data cells
-        for row in worksheet.iter_rows(min_row=2):
-            for cell in row:
-                cell.alignment = Alignment(wrap_text=True, vertical='top')
-        
-        # Freeze header row
-        worksheet.freeze_panes = 'A2'
-    
-    print(f"✓ Đã xuất {len(processed_data)} tours ra file {excel_file}")
-    print(f"✓ Các trường dữ liệu: {', '.join(columns_order)}")
+    print(f"✓ Đã xuất {count} tours ra file {excel_file}")
+    print(f"✓ Các trường dữ liệu: {', '.join(COLUMNS)}")
     print(f"✓ File Excel đã được format với:")
     print(f"  - Header row màu xanh navy, chữ trắng, in đậm")
     print(f"  - Freeze header row")
     print(f"  - Wrap text tất cả cells")
     print(f"  - Column widths được tối ưu")
 
+
+# ============================================================
+# Chế độ streaming cho corpus lớn
+# ============================================================
+# Đọc từng tour (JSON Lines, hoặc mảng JSON đọc dần từng phần tử) và ghi thẳng
+# từng dòng vào workbook write-only (write_tours): không giữ list tour, nên bộ
+# nhớ đỉnh không tăng theo số tour.
+
+def iter_tours(json_file, chunk_size=1 << 16):
+    """
+    Duyệt lần lượt các tour trong file JSON Lines (mỗi dòng một object)
+    hoặc file mảng JSON ([{...}, {...}]) mà không load cả file vào bộ nhớ.
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        start = _skip_whitespace(buffer, 0)
+        if start < len(buffer) and buffer[start] == '[':
+            yield from _iter_json_array(f, buffer, start + 1, chunk_size)
+            return
+
+        # JSON Lines: mỗi dòng một object
+        f.seek(0)
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _skip_whitespace(buffer, pos):
+    while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+def _iter_json_array(f, buffer, pos, chunk_size):
+    """Đọc dần từng phần tử của mảng JSON bằng JSONDecoder.raw_decode"""
+    decoder = json.JSONDecoder()
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos < len(buffer) and buffer[pos] == ',':
+            pos = _skip_whitespace(buffer, pos + 1)
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Phần tử chưa đọc hết → đọc thêm và thử lại
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield value
+        pos = end
+        if pos >= len(buffer) // 2:
+            # Bỏ phần đã parse để buffer không lớn dần
+            buffer, pos = buffer[pos:], 0
+
+
+def _styled_cells(ws, style):
+    """Một WriteOnlyCell đã gắn named style cho mỗi cột, dùng lại cho mọi dòng"""
+    from openpyxl.cell import WriteOnlyCell
+
+    cells = []
+    for _ in COLUMNS:
+        cell = WriteOnlyCell(ws)
+        cell.style = style
+        cells.append(cell)
+    return cells
+
+
+def write_tours(tours, excel_file):
+    """
+    Ghi các tour vào sheet 'Tours' của workbook write-only, trả về số tour.
+
+    Style được khai báo một lần dưới dạng named style (tour_header, tour_cell);
+    mỗi cột dùng lại một cell đã gắn style, chỉ đổi giá trị theo từng dòng,
+    nên không còn bước duyệt lại toàn bộ cell để gán Alignment sau khi ghi.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+    from openpyxl.styles.borders import DEFAULT_BORDER
+    from openpyxl.styles.fonts import DEFAULT_FONT
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Tours')
+
+    wb.add_named_style(NamedStyle(
+        name='tour_header',
+        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        font=Font(bold=True, color="FFFFFF", size=11),
+        border=DEFAULT_BORDER,
+        alignment=Alignment(wrap_text=True, vertical='top', horizontal='center'),
+    ))
+    wb.add_named_style(NamedStyle(
+        name='tour_cell',
+        font=DEFAULT_FONT,
+        border=DEFAULT_BORDER,
+        alignment=Alignment(wrap_text=True, vertical='top'),
+    ))
+
+    # Chế độ write-only: độ rộng cột và freeze phải đặt trước khi ghi dòng đầu tiên
+    for idx, col in enumerate(COLUMNS, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = COLUMN_WIDTHS[col]
+    ws.freeze_panes = 'A2'
+
+    header = _styled_cells(ws, 'tour_header')
+    for cell, col in zip(header, COLUMNS):
+        cell.value = col
+    ws.append(header)
+
+    # Mỗi cell được ghi ra ngay trong append, nên có thể gán giá trị mới cho dòng sau
+    cells = _styled_cells(ws, 'tour_cell')
+    count = 0
+    for tour in tours:
+        row = tour_to_row(tour)
+        for cell, col in zip(cells, COLUMNS):
+            value = row[col]
+            cell.value = value if value != '' else None
+        ws.append(cells)
+        count += 1
+
+    wb.save(excel_file)
+    return count
+
+
+def export_to_excel_streaming(json_file='tours_data.jsonl', excel_file='tours_data.xlsx'):
+    """Như export_to_excel nhưng đọc từng tour, dùng cho file JSON lớn"""
+    count = write_tours(iter_tours(json_file), excel_file)
+    print(f"✓ Đã xuất {count} tours ra file {excel_file} (streaming)")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Xuất tour từ JSON ra Excel')
+    parser.add_argument('json_file', nargs='?', default='tours_data.json')
+    parser.add_argument('excel_file', nargs='?', default='tours_data.xlsx')
+    parser.add_argument('--stream', action='store_true',
+                        help='đọc / ghi từng tour (JSON Lines hoặc mảng JSON) cho file lớn')
+    args = parser.parse_args()
+
+    if args.stream:
+        export_to_excel_streaming(args.json_file, args.excel_file)
+    else:
+        export_to_excel(args.json_file, args.excel_file)
+
+
 if __name__ == '__main__':
-    export_to_excel()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+# Xuất tour ra Parquet (Arrow) dạng cột, giữ nguyên cấu trúc lồng nhau:
+# lich_trinh là list<struct<ngay, hoat_dong: list<string>>>, các trường list
+# (trai_nghiem, dich_vu_bao_gom, ghi_chu, ...) là list<string> thay vì chuỗi đã làm phẳng.
+# Cột lặp lại nhiều (mien, tour_name, van_chuyen, xuat_phat) dùng dictionary encoding.
+#
+#   python -m tour_scraper.export_parquet tours_mienbac.json tours_mienbac.parquet
+#   python -m tour_scraper.export_parquet tours.jsonl tours.parquet
+#
+# Đọc lại: pyarrow.parquet.read_table('tours.parquet') hoặc pandas.read_parquet(...)
+
+import argparse
+
+from .export_excel import iter_tours
+from .items import TourItem
+
+# Trường list<string>
+LIST_FIELDS = {
+    'trai_nghiem', 'diem_nhan_hanh_trinh',
+    'dich_vu_bao_gom', 'dich_vu_khong_bao_gom', 'ghi_chu',
+}
+
+# Trường có ít giá trị khác nhau → dictionary<int32, string>
+DICTIONARY_FIELDS = {'mien', 'tour_name', 'van_chuyen', 'xuat_phat'}
+
+# Cột thời gian có khi xuất từ database (export_db)
+DATETIME_FIELDS = ['created_at', 'updated_at', 'last_seen_at']
+
+
+def tour_schema(names=()):
+    """
+    Arrow schema gồm mọi field của TourItem (url, mien, ...) theo thứ tự khai báo,
+    thêm các cột DATETIME_FIELDS có trong names.
+    """
+    import pyarrow as pa
+
+    string_list = pa.list_(pa.string())
+    lich_trinh = pa.list_(pa.struct([
+        ('ngay', pa.string()),
+        ('hoat_dong', string_list),
+    ]))
+
+    fields = []
+    for name in TourItem.fields:
+        if name == 'lich_trinh':
+            type_ = lich_trinh
+        elif name in LIST_FIELDS:
+            type_ = string_list
+        elif name in DICTIONARY_FIELDS:
+            type_ = pa.dictionary(pa.int32(), pa.string())
+        else:
+            type_ = pa.string()
+        fields.append(pa.field(name, type_))
+
+    for name in DATETIME_FIELDS:
+        if name in names:
+            fields.append(pa.field(name, pa.timestamp('us')))
+    return pa.schema(fields)
+
+
+def _as_list(value):
+    """Chuỗi đơn lẻ (dữ liệu cũ) → list một phần tử, để khớp kiểu list<string>"""
+    if value is None or isinstance(value, list):
+        return value
+    return [str(value)]
+
+
+def _as_days(days):
+    if not days:
+        return days
+    return [
+        {'ngay': day.get('ngay'), 'hoat_dong': _as_list(day.get('hoat_dong'))}
+        for day in days
+    ]
+
+
+def _columns(records, schema):
+    """List các bản ghi → dict {tên cột: list giá trị} theo schema"""
+    columns = {name: [] for name in schema.names}
+    for record in records:
+        for name, values in columns.items():
+            value = record.get(name)
+            if name == 'lich_trinh':
+                value = _as_days(value)
+            elif name in LIST_FIELDS:
+                value = _as_list(value)
+            values.append(value)
+    return columns
+
+
+def write_parquet(records, path, batch_size=1000, compression='zstd'):
+    """
+    Ghi các tour (dict như trong tours_*.json) ra file Parquet, mỗi batch_size
+    tour một row group; trả về số tour. Cột thời gian có nếu tour đầu tiên có.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    count = 0
+    batch = []
+
+    def flush():
+        nonlocal writer, schema
+        if schema is None:
+            schema = tour_schema(batch[0].keys())
+            writer = pq.ParquetWriter(path, schema, compression=compression)
+        writer.write_table(pa.Table.from_pydict(_columns(batch, schema), schema=schema))
+        batch.clear()
+
+    try:
+        for record in records:
+            batch.append(record)
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        elif writer is None:
+            # Không có tour nào: vẫn ghi file rỗng với schema đầy đủ
+            pq.write_table(tour_schema().empty_table(), path, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Xuất tour từ JSON / JSON Lines ra Parquet')
+    parser.add_argument('json_file')
+    parser.add_argument('parquet_file')
+    parser.add_argument('--batch-size', type=int, default=1000, help='số tour mỗi row group')
+    parser.add_argument('--compression', default='zstd')
+    args = parser.parse_args()
+
+    count = write_parquet(iter_tours(args.json_file), args.parquet_file,
+                          batch_size=args.batch_size, compression=args.compression)
+    print(f"✓ Đã xuất {count} tours ra file {args.parquet_file}")
+
+
+if __name__ == '__main__':
+    main()
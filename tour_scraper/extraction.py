@@ -0,0 +1,741 @@
+# Lớp trích xuất dữ liệu tour dùng chung cho các spider dulichviet.
+# Mọi XPath (lxml.etree.XPath) và regex đều được biên dịch một lần khi import,
+# thay vì parse lại chuỗi XPath / tra cache của re cho từng trang.
+
+import logging
+import re
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import lru_cache
+
+from lxml import etree
+
+from .text import normalize
+from .trie import trie_pattern
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# XPath biên dịch sẵn
+# ============================================================
+
+class XPath:
+    """XPath biên dịch sẵn, dùng được với Response, Selector, SelectorList hoặc phần tử lxml"""
+
+    def __init__(self, expr):
+        self.expr = expr
+        self._xpath = etree.XPath(expr, smart_strings=False)
+
+    def __call__(self, node):
+        """Trả về list kết quả thô: phần tử lxml hoặc chuỗi"""
+        results = []
+        for root in _roots(node):
+            result = self._xpath(root)
+            if isinstance(result, list):
+                results.extend(result)
+            else:
+                results.append(result)
+        return results
+
+    def getall(self, node):
+        return [to_string(r) for r in self(node)]
+
+    def get(self, node, default=None):
+        for root in _roots(node):
+            result = self._xpath(root)
+            if isinstance(result, list):
+                if result:
+                    return to_string(result[0])
+            else:
+                return to_string(result)
+        return default
+
+    def __repr__(self):
+        return f"XPath({self.expr!r})"
+
+
+def _roots(node):
+    if isinstance(node, list):
+        # SelectorList hoặc list phần tử lxml
+        return [getattr(n, "root", n) for n in node]
+    if hasattr(node, "selector"):
+        # Response
+        return [node.selector.root]
+    return [getattr(node, "root", node)]
+
+
+def to_string(result):
+    """Chuỗi giữ nguyên, phần tử thì serialize HTML giống Selector.get()"""
+    if isinstance(result, str):
+        return result
+    return etree.tostring(result, method="html", encoding="unicode", with_tail=False)
+
+
+XP_TEXT = XPath('.//text()')
+
+XP_TITLE = XPath('//div[@class="name"]/text()')
+XP_TITLE_H1 = XPath('//h1/text()')
+XP_TITLE_TAG = XPath('//title/text()')
+
+XP_MA_TOUR = XPath('//div[@class="at" and contains(text(), "Mã tour")]/following-sibling::div[@class="as"]/text()')
+XP_THOI_GIAN = XPath('//div[@class="at" and contains(text(), "Thời gian")]/following-sibling::div[@class="as"]/text()')
+XP_KHOI_HANH = XPath('//div[@class="at" and contains(text(), "Khởi hành")]/following-sibling::div[@class="as"]//text()')
+XP_VAN_CHUYEN = XPath('//div[@class="at" and contains(text(), "Vận Chuyển")]/following-sibling::div[@class="as"]//text()')
+XP_XUAT_PHAT = XPath('//div[@class="at" and contains(text(), "Xuất phát")]/following-sibling::div[@class="as"]//text()')
+
+XP_GIA_TU = XPath('//span[contains(text(), "Giá từ")]/following-sibling::*/text()')
+XP_GIA_TU_FOLLOWING = XPath('//*[contains(text(), "Giá từ")]/following::text()[normalize-space()][1]')
+XP_GIA_TU_RED = XPath('//div[@class="red" and @id="giactt"]/text()')
+
+XP_TRAI_NGHIEM_ATTR = XPath('//div[contains(@class, "attr") or contains(@class, "boxPrice")]//p[contains(., "Trải nghiệm") or contains(., "trải nghiệm")]')
+XP_FLAG2 = XPath('//div[@id="flag2"]')
+XP_DAY_SECTIONS = XPath('.//div[@class="day active"] | .//div[contains(@class, "day active")]')
+XP_DAY_TITLE = XPath('.//div[@class="titDay"]//h2//text()')
+XP_DAY_CONTENT = XPath('.//div[@class="contDay"]//div[@class="the-content desc"]')
+XP_P_DIV_UL = XPath('.//*[self::p or self::div or self::ul]')
+XP_LI = XPath('.//li')
+
+XP_FLAG3 = XPath('//div[@id="flag3"]')
+XP_FLAG3_TEXT = XPath('.//div[contains(@class, "the-content") or contains(@class, "desc")]//text()')
+
+XP_FLAG4 = XPath('//div[@id="flag4"]')
+XP_CONTENT_DIV = XPath('.//div[contains(@class, "the-content") or contains(@class, "desc")]')
+XP_P_UL = XPath('.//*[self::p or self::ul]')
+XP_STRONG_U = XPath('.//strong//u')
+XP_U_STRONG = XPath('.//u//strong')
+
+
+# ============================================================
+# Regex biên dịch sẵn
+# ============================================================
+
+RE_ENTITY = re.compile(r'&[a-z]+;')
+RE_WHITESPACE = re.compile(r'\s+')
+RE_BR = re.compile(r'<br\s*/?>')
+RE_TAG = re.compile(r'<[^>]+>')
+RE_DAY_NUMBER = re.compile(r'NGÀY\s+(\d+)', re.IGNORECASE)
+RE_DAY_PREFIX = re.compile(r'NGÀY\s+\d+\s*\|?\s*', re.IGNORECASE)
+RE_TIME_SECTION = re.compile(r'^(Sáng|Trưa|Chiều|Tối|Buổi|\d{2}h\d{2})\s*:', re.IGNORECASE)
+RE_TIME_MARKER = re.compile(r'^(Sáng|Trưa|Chiều|Tối|Buổi|\d{2}h\d{2})', re.IGNORECASE)
+RE_SERVICE_SPLIT = re.compile(r'(?<=[\.\?!;])\s+|\n+|- |\• |\* |;')
+RE_CHECKMARK_ITEMS = [
+    re.compile(r'[✔☑]️\s*([^✔☑<\n]{10,150})'),
+    re.compile(r'[✔☑]️?\s*([^✔☑<\n]{10,150})'),
+]
+
+CHECKMARKS = ['✔️', '☑️']
+
+BAO_GOM_PATTERNS = [
+    'gia tour bao gom', 'dich vu bao gom', 'bao gom',
+    'gia tour bao gom:', 'dich vu bao gom:', 'bao gom:'
+]
+KHONG_BAO_GOM_PATTERNS = [
+    'khong bao gom', 'kh ong bao gom', 'khong bao gom:',
+    'kh ong bao gom:', 'khong bao gom'
+]
+BAO_GOM_STOP_PATTERNS = KHONG_BAO_GOM_PATTERNS + ['ghi chu', 'luu y']
+KHONG_BAO_GOM_STOP_PATTERNS = ['ghi chu', 'luu y', 'quy dinh', 'dieu kien', 'gia ve danh cho tre em', 'cac quy dinh', 'thu tuc']
+
+_ENTITY_REPLACEMENTS = [
+    ('&nbsp;', ' '),
+    ('\xa0', ' '),
+    ('&ndash;', '–'),
+    ('&mdash;', '—'),
+    ('&ldquo;', '"'),
+    ('&rdquo;', '"'),
+    ('&hellip;', '...'),
+]
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def clean_text(text):
+    """Clean text - remove HTML entities, extra spaces"""
+    if not text:
+        return None
+
+    # Remove HTML entities
+    for entity, replacement in _ENTITY_REPLACEMENTS:
+        text = text.replace(entity, replacement)
+    text = RE_ENTITY.sub('', text)
+
+    # Remove extra whitespace
+    text = RE_WHITESPACE.sub(' ', text)
+    text = text.strip()
+    text = text.strip(':').strip()
+
+    return text if text else None
+
+
+def _join_stripped(texts):
+    return ' '.join([t.strip() for t in texts if t.strip()])
+
+
+def _join_cleaned(texts):
+    return ' '.join([c for c in map(clean_text, texts) if c])
+
+
+# ============================================================
+# Trích xuất từng trường
+# ============================================================
+
+def extract_title(doc):
+    """Trả về (tên tour, strategy): 1 = div.name, 2 = h1, 3 = thẻ title"""
+    for strategy, xpath in enumerate((XP_TITLE, XP_TITLE_H1, XP_TITLE_TAG), 1):
+        title = xpath.get(doc)
+        if title:
+            return title.strip(), strategy
+    return None, None
+
+
+def extract_ma_tour(doc):
+    ma_tour = XP_MA_TOUR.get(doc)
+    return ma_tour.strip() if ma_tour else None
+
+
+def extract_thoi_gian(doc):
+    thoi_gian = XP_THOI_GIAN.get(doc)
+    return thoi_gian.strip() if thoi_gian else None
+
+
+def extract_khoi_hanh(doc):
+    texts = XP_KHOI_HANH(doc)
+    if not texts:
+        return None
+    khoi_hanh = _join_stripped(texts)
+    return khoi_hanh.strip() if khoi_hanh else None
+
+
+def extract_van_chuyen(doc):
+    texts = XP_VAN_CHUYEN(doc)
+    if not texts:
+        return None
+    van_chuyen = _join_stripped(texts)
+    return van_chuyen.strip() if van_chuyen else None
+
+
+def extract_xuat_phat(doc):
+    texts = XP_XUAT_PHAT(doc)
+    if not texts:
+        return None
+    # Clean từng đoạn text, bỏ chữ "Từ" đứng riêng
+    cleaned_texts = [t.strip() for t in texts if t.strip() and t.strip() != 'Từ']
+    xuat_phat = RE_WHITESPACE.sub(' ', ' '.join(cleaned_texts)).strip()
+    return xuat_phat if xuat_phat else None
+
+
+def extract_gia_tu(doc):
+    """Trả về (giá, strategy): 1 = span "Giá từ", 2 = text ngay sau "Giá từ", 3 = div#giactt"""
+    for strategy, xpath in enumerate((XP_GIA_TU, XP_GIA_TU_FOLLOWING, XP_GIA_TU_RED), 1):
+        gia_tu = xpath.get(doc)
+        if gia_tu:
+            return gia_tu.strip(), strategy
+    return None, None
+
+
+def _stage(profile, name):
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+def extract_trai_nghiem(doc, log=logger, profile=None):
+    """
+    Trả về (danh sách trải nghiệm, số thứ tự strategy đã tìm ra hoặc None).
+    profile (ExtractionProfiler) nếu có sẽ đo riêng thời gian từng strategy.
+    """
+    with _stage(profile, 'trai_nghiem/strategy_1'):
+        trai_nghiem = _trai_nghiem_attr_sections(doc, log)
+    if trai_nghiem:
+        return trai_nghiem, 1
+
+    log.info("Strategy 1 failed, trying Strategy 2...")
+    with _stage(profile, 'trai_nghiem/strategy_2'):
+        texts = _page_texts(doc)
+        trai_nghiem = _trai_nghiem_whole_document(doc, texts, log)
+    if trai_nghiem:
+        return trai_nghiem, 2
+
+    log.info("Strategy 2 failed, trying Strategy 3 (regex)...")
+    with _stage(profile, 'trai_nghiem/strategy_3'):
+        trai_nghiem = _trai_nghiem_regex(texts, log)
+    if trai_nghiem:
+        return trai_nghiem, 3
+
+    return trai_nghiem, None
+
+
+def _trai_nghiem_attr_sections(doc, log):
+    """Strategy 1: Tìm trong các div class="attr" hoặc boxPrice"""
+    trai_nghiem = []
+    for p_elem in XP_TRAI_NGHIEM_ATTR(doc):
+        # Lấy tất cả text nodes bên trong <p>
+        full_text = ''.join(XP_TEXT(p_elem))
+
+        # Tách theo <br/> hoặc newline
+        lines = RE_BR.split(to_string(p_elem))
+        if not lines or len(lines) == 1:
+            lines = full_text.split('\n')
+
+        for line in lines:
+            cleaned = (clean_text(line) or '').strip()
+
+            # Bỏ qua dòng chứa "Trải nghiệm:"
+            if not cleaned or 'trải nghiệm' in cleaned.lower() and len(cleaned) < 20:
+                continue
+
+            # Tìm các items có ✔️ hoặc ☑️
+            if '✔️' in cleaned or '☑️' in cleaned:
+                # Tách nếu có nhiều items trên cùng 1 dòng
+                for prefix in CHECKMARKS:
+                    if prefix in cleaned:
+                        parts = cleaned.split(prefix)
+                        for part in parts[1:]:  # Skip phần trước prefix đầu tiên
+                            experience = part.strip().strip('.,;:')
+                            if experience and len(experience) > 10:
+                                trai_nghiem.append(experience)
+                                log.info(f"  [TRẢI NGHIỆM] Strategy 1: {experience[:60]}...")
+    return trai_nghiem
+
+
+def _page_texts(doc):
+    """Mọi text node của trang theo thứ tự tài liệu, dùng chung cho Strategy 2 và 3"""
+    roots = _roots(doc)
+    if not roots:
+        return []
+    return XP_TEXT(roots[0].getroottree().getroot())
+
+
+def _trai_nghiem_whole_document(doc, texts, log):
+    """
+    Strategy 2: các phần tử có chữ "Trải nghiệm" (theo thứ tự tài liệu), mỗi checkmark
+    bên trong cho một item = text sau checkmark đến newline / checkmark kế tiếp / hết phần tử.
+
+    Tương đương với duyệt //*[contains(., "Trải nghiệm")] rồi nối lại toàn bộ text con
+    cho từng phần tử (bậc hai theo kích thước trang), nhưng chỉ ghép text của trang một
+    lần: text của mỗi phần tử là một đoạn liên tục [start, end) trong chuỗi đó.
+    """
+    roots = _roots(doc)
+    if not roots:
+        return []
+    root = roots[0].getroottree().getroot()
+
+    # Lọc nhanh trên text của trang: trang không có checkmark hoặc không có chữ
+    # "Trải nghiệm" (phần lớn trường hợp) thì không cần duyệt từng phần tử
+    text = ''.join(texts)
+    if not any(prefix in text for prefix in CHECKMARKS):
+        return []
+    if 'Trải nghiệm' not in text and 'trải nghiệm' not in text:
+        return []
+
+    text, spans = _document_text(root)
+    marks = {prefix: _find_all(text, prefix) for prefix in CHECKMARKS}
+    keywords = sorted(_find_all(text, 'Trải nghiệm') + _find_all(text, 'trải nghiệm'))
+    keyword_len = len('Trải nghiệm')
+    # Vị trí cắt item: newline hoặc đầu checkmark kế tiếp
+    breaks = sorted(_find_all(text, '\n') + [p for positions in marks.values() for p in positions])
+
+    trai_nghiem = []
+    seen = set()
+    for start, end in spans:
+        i = bisect_left(keywords, start)
+        if i == len(keywords) or keywords[i] + keyword_len > end:
+            continue
+
+        for prefix, positions in marks.items():
+            for k in range(bisect_left(positions, start), len(positions)):
+                pos = positions[k]
+                item_start = pos + len(prefix)
+                if item_start > end:
+                    break
+
+                item_end = end
+                j = bisect_left(breaks, item_start)
+                if j < len(breaks) and breaks[j] < end:
+                    cut = breaks[j]
+                    # Checkmark bị cắt đôi ở cuối phần tử thì không tính là điểm cắt
+                    if text[cut] == '\n' or cut + len(prefix) <= end:
+                        item_end = cut
+
+                experience = text[item_start:item_end].strip().strip('.,;:<br/>')
+                if experience and len(experience) > 10 and experience not in seen:
+                    seen.add(experience)
+                    trai_nghiem.append(experience)
+                    log.info(f"  [TRẢI NGHIỆM] Strategy 2: {experience[:60]}...")
+    return trai_nghiem
+
+
+def _document_text(root):
+    """
+    Nối mọi text node dưới root (giống ''.join(root.xpath('.//text()'))) trong một lần duyệt.
+    Trả về (text, spans): spans[i] = [start, end) là text của phần tử thứ i theo thứ tự tài liệu.
+    """
+    parts = []
+    spans = []
+    pos = 0
+    open_elems = []  # (phần tử, span) từ root xuống phần tử đang duyệt
+
+    # iter() đi theo thứ tự tài liệu, kể cả comment / processing instruction
+    for node in root.iter():
+        # Đóng các phần tử đã duyệt hết con: text phía sau (tail) của chúng nằm ngoài span
+        parent = node.getparent()
+        while open_elems and open_elems[-1][0] is not parent:
+            elem, span = open_elems.pop()
+            span[1] = pos
+            if elem.tail:
+                parts.append(elem.tail)
+                pos += len(elem.tail)
+
+        if isinstance(node.tag, str):
+            span = [pos, pos]
+            spans.append(span)
+            open_elems.append((node, span))
+            if node.text:
+                parts.append(node.text)
+                pos += len(node.text)
+        elif node.tail:
+            # Comment / processing instruction: bỏ nội dung, giữ phần text phía sau
+            parts.append(node.tail)
+            pos += len(node.tail)
+
+    while open_elems:
+        elem, span = open_elems.pop()
+        span[1] = pos
+        if open_elems and elem.tail:
+            parts.append(elem.tail)
+            pos += len(elem.tail)
+
+    return ''.join(parts), spans
+
+
+def _find_all(text, sub):
+    positions = []
+    pos = text.find(sub)
+    while pos != -1:
+        positions.append(pos)
+        pos = text.find(sub, pos + len(sub))
+    return positions
+
+
+def _trai_nghiem_regex(texts, log):
+    """
+    Strategy 3: Regex trên text của trang thay vì toàn bộ HTML. Các text node được nối
+    bằng '<' để regex ([^✔☑<\n]) vẫn dừng ở ranh giới thẻ như khi quét HTML.
+    """
+    trai_nghiem = []
+    text = '<'.join(texts)
+    # Cả hai regex đều bắt đầu bằng ✔ / ☑: không có ký tự nào thì khỏi quét trang
+    if '✔' not in text and '☑' not in text:
+        return trai_nghiem
+    for pattern in RE_CHECKMARK_ITEMS:
+        for match in pattern.findall(text):
+            experience = (clean_text(match) or '').strip()
+            if experience and len(experience) > 10:
+                if experience not in trai_nghiem:
+                    trai_nghiem.append(experience)
+                    log.info(f"  [TRẢI NGHIỆM] Strategy 3: {experience[:60]}...")
+    return trai_nghiem
+
+
+def extract_lich_trinh(doc, log=logger):
+    lich_trinh = []
+    flag2 = XP_FLAG2(doc)
+    if not flag2:
+        return lich_trinh
+
+    log.info("Found flag2 section, starting lich_trinh parsing")
+    day_sections = XP_DAY_SECTIONS(flag2)
+    log.info(f"Found {len(day_sections)} day sections")
+
+    for idx, day in enumerate(day_sections, 1):
+        # Extract day title
+        day_title_full = _join_stripped(XP_DAY_TITLE(day))
+
+        day_match = RE_DAY_NUMBER.search(day_title_full)
+        day_number = day_match.group(1) if day_match else str(idx)
+        location = RE_DAY_PREFIX.sub('', day_title_full).strip()
+
+        if not location:
+            location = day_title_full.strip()
+
+        day_title = f"NGÀY {day_number}: {location}" if location else f"NGÀY {day_number}"
+        log.info(f"Processing {day_title}")
+
+        # Extract content theo cấu trúc HTML
+        activities = []
+        for elem in XP_P_DIV_UL(XP_DAY_CONTENT(day)):
+            tag = elem.tag
+
+            # Xử lý <p> tags: convert <br/> thành \n
+            if tag == 'p':
+                full_text = ''
+                for part in RE_BR.split(to_string(elem)):
+                    # Clean HTML tags but keep text
+                    text = clean_text(RE_TAG.sub('', part))
+                    if text:
+                        full_text += text + '\n'
+
+                full_text = full_text.rstrip('\n')
+
+                # Kiểm tra xem có phải time marker không
+                if RE_TIME_SECTION.match(full_text):
+                    # Time marker - giữ nguyên không xuống dòng
+                    if full_text:
+                        activities.append(full_text)
+                        log.debug(f"    [TIME SECTION] {full_text[:60]}...")
+                elif full_text and len(full_text) > 20:
+                    activities.append(full_text)
+
+            # Xử lý <ul> tags
+            elif tag == 'ul':
+                ul_text = ''
+                for li in XP_LI(elem):
+                    li_text = _join_cleaned(XP_TEXT(li))
+                    if li_text:
+                        ul_text += f"• {li_text}\n"
+
+                if ul_text:
+                    activities.append(ul_text.rstrip('\n'))
+
+            # Xử lý <div> tags (thường chứa time markers)
+            elif tag == 'div':
+                div_text = _join_cleaned(XP_TEXT(elem))
+                if div_text and RE_TIME_MARKER.match(div_text):
+                    activities.append(div_text)
+                    log.debug(f"    [TIME MARKER] {div_text}")
+
+        if day_title and activities:
+            lich_trinh.append({
+                'ngay': day_title,
+                'hoat_dong': activities
+            })
+            log.info(f"  ✓ {day_title} - {len(activities)} sections")
+
+    return lich_trinh
+
+
+def _split_services(text):
+    return RE_SERVICE_SPLIT.split(text)
+
+
+def extract_dich_vu(doc, log=logger):
+    """Trả về (dịch vụ bao gồm, dịch vụ không bao gồm)"""
+    dich_vu_bao_gom = []
+    dich_vu_khong_bao_gom = []
+    flag3 = XP_FLAG3(doc)
+    if not flag3:
+        return dich_vu_bao_gom, dich_vu_khong_bao_gom
+
+    # Lấy toàn bộ text từ div the-content, clean và split lines
+    full_text = ' '.join(XP_FLAG3_TEXT(flag3))
+    full_text = RE_WHITESPACE.sub(' ', full_text).strip()
+
+    # Normalize headers (ignore case, remove accents for matching)
+    normalized_full = normalize(full_text)
+
+    # Tìm vị trí headers
+    bao_gom_start = None
+    khong_bao_gom_start = None
+
+    for pattern in BAO_GOM_PATTERNS:
+        match = normalized_full.find(pattern)
+        if match != -1:
+            bao_gom_start = match + len(pattern)
+            log.info(f">>> Found included header at {match}: {pattern}")
+            break
+
+    for pattern in KHONG_BAO_GOM_PATTERNS:
+        match = normalized_full.find(pattern)
+        if match != -1:
+            khong_bao_gom_start = match + len(pattern)
+            log.info(f">>> Found excluded header at {match}: {pattern}")
+            break
+
+    # Extract content between headers
+    if bao_gom_start is not None:
+        end = khong_bao_gom_start if khong_bao_gom_start else len(full_text)
+        bao_gom_text = full_text[bao_gom_start:end].strip()
+        # Split into items by bullets or sentences
+        for service_item in _split_services(bao_gom_text):
+            cleaned = (clean_text(service_item) or '').strip()
+            if cleaned and len(cleaned) > 10:
+                normalized = normalize(cleaned)
+                if not any(p in normalized for p in BAO_GOM_STOP_PATTERNS):
+                    dich_vu_bao_gom.append(cleaned)
+                    log.debug(f"  [BAO GỒM] + {cleaned[:50]}...")
+
+    if khong_bao_gom_start is not None:
+        khong_bao_gom_text = full_text[khong_bao_gom_start:].strip()
+        # Stop at unrelated sections
+        stop_pos = len(khong_bao_gom_text)
+        normalized_tail = normalized_full[khong_bao_gom_start:]
+        for pattern in KHONG_BAO_GOM_STOP_PATTERNS:
+            match = normalized_tail.find(pattern)
+            if match != -1 and match < stop_pos:
+                stop_pos = match
+        khong_bao_gom_text = khong_bao_gom_text[:stop_pos].strip()
+
+        for service_item in _split_services(khong_bao_gom_text):
+            cleaned = (clean_text(service_item) or '').strip()
+            if cleaned and len(cleaned) > 10:
+                dich_vu_khong_bao_gom.append(cleaned)
+                log.debug(f"  [KHÔNG BAO GỒM] + {cleaned[:50]}...")
+
+    # Fallback: if no patterns found, try extracting from <li>
+    if not dich_vu_bao_gom and not dich_vu_khong_bao_gom:
+        for li in XP_LI(flag3):
+            cleaned = clean_text(' '.join(XP_TEXT(li)))
+            if cleaned and len(cleaned) > 10:
+                dich_vu_bao_gom.append(cleaned)
+
+    return dich_vu_bao_gom, dich_vu_khong_bao_gom
+
+
+def extract_ghi_chu(doc, log=logger):
+    ghi_chu = []
+    flag4 = XP_FLAG4(doc)
+    if not flag4:
+        return ghi_chu
+
+    # Parse theo thứ tự các elements (p, ul) trong div.the-content
+    for elem in XP_P_UL(XP_CONTENT_DIV(flag4)):
+        if elem.tag == 'p':
+            # Đây có thể là tiêu đề (có <strong><u>) hoặc nội dung text thường
+            p_text = clean_text(_join_stripped(XP_TEXT(elem)))
+
+            if p_text:
+                # Kiểm tra xem có phải tiêu đề không (có <strong> và <u>)
+                if XP_STRONG_U(elem) or XP_U_STRONG(elem):
+                    ghi_chu.append(f"__{p_text}__")
+                    log.debug(f"  [GHI CHÚ - HEADER] {p_text[:60]}...")
+                elif len(p_text) > 20:
+                    ghi_chu.append(p_text)
+                    log.debug(f"  [GHI CHÚ - TEXT] {p_text[:60]}...")
+
+        elif elem.tag == 'ul':
+            # Parse các <li> items
+            for li in XP_LI(elem):
+                li_text = clean_text(_join_stripped(XP_TEXT(li)))
+
+                if li_text and len(li_text) > 10:
+                    ghi_chu.append(f"* {li_text}")
+                    log.debug(f"  [GHI CHÚ - ITEM] {li_text[:60]}...")
+
+    return ghi_chu
+
+
+# ============================================================
+# Tên tour (địa danh) từ URL
+# ============================================================
+
+MIEN_BAC = {
+    'mien-bac': 'Miền Bắc', 'ha-noi': 'Hà Nội', 'bac-kan': 'Bắc Kạn', 'bac-ninh': 'Bắc Ninh',
+    'bong-bang': 'Bông Bằng', 'dien-bien': 'Điện Biên', 'ha-giang': 'Hà Giang', 'ha-long': 'Hạ Long',
+    'hoa-binh': 'Hòa Bình', 'lai-chau': 'Lai Châu', 'lang-son': 'Lạng Sơn', 'lao-cai': 'Lào Cai',
+    'mai-chau': 'Mai Châu', 'moc-chau': 'Mộc Châu', 'ninh-binh': 'Ninh Bình', 'phu-tho': 'Phú Thọ',
+    'sapa': 'Sapa', 'tay-bac': 'Tây Bắc', 'tam-coc': 'Tam Cốc', 'trang-an': 'Tràng An',
+    'dong-bac': 'Đông Bắc', 'cao-bang': 'Cao Bằng', 'cat-ba': 'Cát Bà', 'thanh-hoa': 'Thanh Hóa',
+}
+
+MIEN_TRUNG = {
+    'mien-trung': 'Miền Trung', 'da-nang': 'Đà Nẵng', 'binh-thuan': 'Bình Thuận', 'buon-ma-thuot': 'Buôn Ma Thuột',
+    'binh-dinh': 'Bình Định', 'da-lat': 'Đà Lạt', 'dao-binh-ba': 'Đảo Bình Ba', 'dao-binh-hung': 'Đảo Bình Hưng',
+    'hoi-an': 'Hội An', 'hue': 'Huế', 'nha-trang': 'Nha Trang', 'ninh-chu': 'Ninh Chữ',
+    'ninh-thuan': 'Ninh Thuận', 'phan-thiet': 'Phan Thiết', 'phu-yen': 'Phú Yên', 'quy-nhon': 'Quy Nhơn',
+    'quang-binh': 'Quảng Bình', 'quang-nam': 'Quảng Nam', 'quang-ngai': 'Quảng Ngãi', 'binh-binh': 'Bình Bình',
+    'tay-nguyen': 'Tây Nguyên', 'phong-nha': 'Phong Nha', 'mui-ne': 'Mũi Né', 'kon-tum': 'Kon Tum',
+}
+
+MIEN_NAM = {
+    'mien-nam': 'Miền Nam', 'tay-ninh': 'Tây Ninh', 'phu-quoc': 'Phú Quốc', 'an-giang': 'An Giang',
+    'bac-lieu': 'Bạc Liêu', 'ben-tre': 'Bến Tre', 'ca-mau': 'Cà Mau', 'can-tho': 'Cần Thơ',
+    'con-dao': 'Côn Đảo', 'chau-doc': 'Châu Đốc', 'dao-ba-lua': 'Đảo Bà Lụa', 'ha-tien': 'Hà Tiên',
+    'kien-giang': 'Kiên Giang', 'long-an': 'Long An', 'nam-du': 'Nam Du', 'mien-tay': 'Miền Tây',
+    'soc-trang': 'Sóc Trăng', 'tien-giang': 'Tiền Giang', 'dong-thap': 'Đồng Tháp', 'vung-tau': 'Vũng Tàu',
+    'sai-gon': 'Sài Gòn', 'ho-chi-minh': 'Hồ Chí Minh', 'phu-quy': 'Phú Quý',
+}
+
+ALL_LOCATIONS = {**MIEN_BAC, **MIEN_TRUNG, **MIEN_NAM}
+
+
+# Automaton tìm slug địa danh: match đầu tiên của search() là slug xuất hiện sớm nhất
+RE_LOCATION = re.compile(trie_pattern(ALL_LOCATIONS))
+RE_NON_SLUG = re.compile(r'[^a-z0-9]+')
+
+
+def _find_location(text):
+    match = RE_LOCATION.search(text)
+    return ALL_LOCATIONS[match.group()] if match else None
+
+
+@lru_cache(maxsize=4096)
+def extract_tour_name(url, title=None):
+    """
+    Trích xuất tên tour ngắn gọn (địa danh xuất hiện sớm nhất) từ URL, nếu URL
+    không có địa danh nào thì từ title (bỏ dấu, đổi thành dạng slug).
+    Kết quả được nhớ theo (url, title).
+    """
+    name = _find_location(url.lower())
+    if name is None and title:
+        name = _find_location(RE_NON_SLUG.sub('-', normalize(title)))
+    return name or "Tour Việt Nam"
+
+
+# ============================================================
+# Toàn bộ trang chi tiết
+# ============================================================
+
+def extract_tour(doc, log=logger, profile=None):
+    """
+    Mọi trường trích xuất được từ trang chi tiết tour (Response) → dict.
+    Không đụng tới meta / spider nên chạy được cả trong process khác (xem parse_pool).
+    Trường list rỗng trả về None như item cũ.
+    """
+    fields = {}
+
+    # Dựng cây HTML (lazy trong Scrapy) tách riêng để không tính vào bước đầu tiên
+    with _stage(profile, 'html_parse'):
+        doc.selector
+
+    with _stage(profile, 'title'):
+        fields['title'], strategy = extract_title(doc)
+    if profile is not None:
+        profile.strategy('title', strategy)
+
+    with _stage(profile, 'tour_name'):
+        fields['tour_name'] = extract_tour_name(doc.url, fields['title'])
+    with _stage(profile, 'ma_tour'):
+        fields['ma_tour'] = extract_ma_tour(doc)
+    with _stage(profile, 'thoi_gian'):
+        fields['thoi_gian'] = extract_thoi_gian(doc)
+    with _stage(profile, 'khoi_hanh'):
+        fields['khoi_hanh'] = extract_khoi_hanh(doc)
+    with _stage(profile, 'van_chuyen'):
+        fields['van_chuyen'] = extract_van_chuyen(doc)
+    with _stage(profile, 'xuat_phat'):
+        fields['xuat_phat'] = extract_xuat_phat(doc)
+
+    with _stage(profile, 'gia_tu'):
+        fields['gia_tu'], strategy = extract_gia_tu(doc)
+    if profile is not None:
+        profile.strategy('gia_tu', strategy)
+
+    with _stage(profile, 'trai_nghiem'):
+        trai_nghiem, strategy = extract_trai_nghiem(doc, log, profile)
+    if profile is not None:
+        profile.strategy('trai_nghiem', strategy)
+    fields['trai_nghiem'] = trai_nghiem or None
+
+    with _stage(profile, 'lich_trinh'):
+        fields['lich_trinh'] = extract_lich_trinh(doc, log) or None
+
+    with _stage(profile, 'dich_vu'):
+        dich_vu_bao_gom, dich_vu_khong_bao_gom = extract_dich_vu(doc, log)
+    fields['dich_vu_bao_gom'] = dich_vu_bao_gom or None
+    fields['dich_vu_khong_bao_gom'] = dich_vu_khong_bao_gom or None
+
+    with _stage(profile, 'ghi_chu'):
+        fields['ghi_chu'] = extract_ghi_chu(doc, log) or None
+
+    return fields
@@ -0,0 +1,107 @@
+# Lưu validator HTTP (ETag / Last-Modified) và hash nội dung của từng trang tour đã crawl
+# vào một file SQLite cục bộ, để lần crawl sau gửi conditional request và bỏ qua trang không đổi.
+
+import hashlib
+import sqlite3
+from datetime import datetime
+
+
+# Signal gửi khi trang tour không đổi so với lần crawl trước (304 / cùng hash),
+# tham số url. Pipeline dùng để cập nhật last_seen_at dù không có item.
+page_unchanged = object()
+
+# Signal gửi khi pipeline đã commit các tour vào DB, tham số urls.
+# Fingerprint của trang chỉ được lưu sau signal này (xem TourScraperDownloaderMiddleware).
+tours_saved = object()
+
+
+def body_hash(body):
+    """Hash nội dung trang (bytes)"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Bảng page_fingerprints(url, etag, last_modified, body_hash, checked_at).
+    Toàn bộ bảng được đọc vào dict khi mở; thay đổi được ghi theo lô
+    (mỗi flush_every bản ghi và khi đóng).
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.conn = None
+        self.records = {}
+        self.dirty = {}
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_fingerprints ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body_hash TEXT,"
+            " checked_at TEXT)"
+        )
+        rows = self.conn.execute(
+            "SELECT url, etag, last_modified, body_hash, checked_at FROM page_fingerprints"
+        )
+        for url, etag, last_modified, hash_, checked_at in rows:
+            self.records[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "body_hash": hash_,
+                "checked_at": checked_at,
+            }
+        return self
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, url):
+        return self.records.get(url)
+
+    def put(self, url, etag=None, last_modified=None, body_hash=None):
+        record = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": body_hash,
+            "checked_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.records[url] = record
+        self.dirty[url] = record
+        if len(self.dirty) >= self.flush_every:
+            self.flush()
+
+    def retain(self, urls):
+        """Chỉ giữ fingerprint của các URL trong urls (VD tour còn trong DB), trả về số bản ghi đã xóa"""
+        stale = [url for url in self.records if url not in urls]
+        for url in stale:
+            del self.records[url]
+            self.dirty.pop(url, None)
+        if stale and self.conn is not None:
+            self.conn.executemany("DELETE FROM page_fingerprints WHERE url = ?", [(url,) for url in stale])
+            self.conn.commit()
+        return len(stale)
+
+    def flush(self):
+        if not self.dirty or self.conn is None:
+            return
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO page_fingerprints"
+            " (url, etag, last_modified, body_hash, checked_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (url, r["etag"], r["last_modified"], r["body_hash"], r["checked_at"])
+                for url, r in self.dirty.items()
+            ],
+        )
+        self.conn.commit()
+        self.dirty.clear()
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.close()
+        self.conn = None
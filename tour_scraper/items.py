@@ -3,6 +3,7 @@ import scrapy
 class TourItem(scrapy.Item):
     # Thông tin cơ bản
     url = scrapy.Field()  # URL tour
+    mien = scrapy.Field()  # Miền (Miền Bắc / Miền Trung / Miền Nam)
     hinh_anh_chinh = scrapy.Field() # Hình ảnh
     tour_name = scrapy.Field() 
     title = scrapy.Field() # Tên tour 
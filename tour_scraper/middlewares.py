@@ -3,11 +3,19 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+from scrapy import Request, signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http.headers import Headers
+from scrapy.responsetypes import responsetypes
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+from .archive import HttpArchive
+from .fingerprints import FingerprintStore, body_hash, page_unchanged, tours_saved
+from .regions import classify_region
+from .throttle import CONGESTION_STATUSES, AimdController, parse_retry_after
+
 
 class TourScraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -53,39 +61,138 @@ class TourScraperSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
+class RegionScopeMiddleware:
+    """
+    Bỏ trang danh sách / phân trang ngoài phạm vi các miền đang crawl
+    (spider.regions) ngay khi spider yield, trước khi vào scheduler: không tốn
+    chỗ trong hàng đợi, không tải trang.
+
+    Chỉ xét request về lại callback parse có meta['region']; link tour đã được
+    parse() lọc bằng classify_region. Request bị bỏ được đếm ở stats
+    region_scope/filtered.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
+    def _in_scope(self, request, spider):
+        regions = getattr(spider, "regions", None)
+        if not regions or "region" not in request.meta or request.callback != spider.parse:
+            return True
+        if classify_region(request.url, regions, fallback=request.meta["region"]) is not None:
+            return True
+        self.stats.inc_value("region_scope/filtered")
+        spider.logger.debug(f"Bỏ trang danh sách ngoài phạm vi {', '.join(regions)}: {request.url}")
+        return False
+
+    def process_spider_output(self, response, result, spider):
+        for item_or_request in result:
+            if isinstance(item_or_request, Request) and not self._in_scope(item_or_request, spider):
+                continue
+            yield item_or_request
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for item_or_request in result:
+            if isinstance(item_or_request, Request) and not self._in_scope(item_or_request, spider):
+                continue
+            yield item_or_request
+
+
 class TourScraperDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+    """
+    Conditional re-crawl cho trang chi tiết tour (request có meta['conditional']).
+
+    Với mỗi URL, FingerprintStore lưu ETag / Last-Modified và hash nội dung
+    của lần crawl trước. Lần sau request được gửi kèm If-None-Match /
+    If-Modified-Since; nếu server trả 304, hoặc trả 200 nhưng nội dung có
+    hash không đổi, request bị bỏ qua (IgnoreRequest) nên không phải parse
+    trang và không có item đi qua pipeline.
+
+    Fingerprint mới chỉ được lưu khi pipeline đã commit tour của trang vào DB
+    (signal tours_saved), để trang parse lỗi, bị DropItem hoặc ghi DB lỗi vẫn
+    được crawl lại lần sau. Khi mở spider, fingerprint của URL không còn trong
+    bảng tours (VD tours.db bị xóa) cũng bị bỏ.
+    CONDITIONAL_RECRAWL = False để tắt (crawl lại toàn bộ).
+    """
+
+    def __init__(self, stats, signals=None, store_path="fingerprints.db", enabled=True, settings=None):
+        self.stats = stats
+        self.signals = signals
+        self.settings = settings
+        self.store_path = store_path
+        self.enabled = enabled
+        self.store = None
+        # response.url -> fingerprint của trang đang chờ item được lưu
+        self.pending = {}
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        s = cls(
+            crawler.stats,
+            signals=crawler.signals,
+            store_path=crawler.settings.get("CONDITIONAL_STORE", "fingerprints.db"),
+            enabled=crawler.settings.getbool("CONDITIONAL_RECRAWL", True),
+            settings=crawler.settings,
+        )
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(s.tours_saved, signal=tours_saved)
+        crawler.signals.connect(s.item_discarded, signal=signals.item_dropped)
+        crawler.signals.connect(s.item_discarded, signal=signals.item_error)
         return s
 
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
+        if self.store is None or not request.meta.get("conditional"):
+            return None
 
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        known = self.store.get(request.url)
+        if known is None or not (known["etag"] or known["last_modified"]):
+            # Server không trả validator: vẫn tải lại, so sánh bằng hash nội dung
+            return None
+
+        if known["etag"]:
+            request.headers.setdefault("If-None-Match", known["etag"])
+        if known["last_modified"]:
+            request.headers.setdefault("If-Modified-Since", known["last_modified"])
+        self.stats.inc_value("conditional/requests")
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        if self.store is None or not request.meta.get("conditional"):
+            return response
+
+        known = self.store.get(request.url)
+        if response.status == 304 and known is not None:
+            self.stats.inc_value("conditional/not_modified")
+            self._send_unchanged(request.url)
+            raise IgnoreRequest(f"Not modified: {request.url}")
+        if response.status != 200:
+            return response
+
+        etag = _header(response, "ETag")
+        last_modified = _header(response, "Last-Modified")
+        hash_ = body_hash(response.body)
+
+        if known is not None and known["body_hash"] == hash_:
+            # Nội dung không đổi: chỉ cập nhật validator nếu server đổi chúng
+            if (etag, last_modified) != (known["etag"], known["last_modified"]):
+                self.store.put(request.url, etag, last_modified, hash_)
+            self.stats.inc_value("conditional/unchanged")
+            self._send_unchanged(request.url)
+            raise IgnoreRequest(f"Unchanged: {request.url}")
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        self.stats.inc_value("conditional/changed" if known is not None else "conditional/new")
+        self.pending[response.url] = (request.url, etag, last_modified, hash_)
         return response
 
+    def _send_unchanged(self, url):
+        if self.signals is not None:
+            self.signals.send_catch_log(signal=page_unchanged, url=url)
+
     def process_exception(self, request, exception, spider):
         # Called when a download handler or a process_request()
         # (from other downloader middleware) raises an exception.
@@ -96,5 +203,245 @@ class TourScraperDownloaderMiddleware:
         # - return a Request object: stops process_exception() chain
         pass
 
+    def tours_saved(self, urls):
+        """Pipeline đã commit các tour này → lưu fingerprint của trang"""
+        for url in urls:
+            fingerprint = self.pending.pop(url, None)
+            if fingerprint is not None and self.store is not None:
+                self.store.put(*fingerprint)
+
+    def item_discarded(self, item, response, spider):
+        # Item bị DropItem / lỗi trong pipeline: không có tour để lưu, trang sẽ được tải lại
+        self.pending.pop(response.url, None)
+
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+        if not self.enabled:
+            return
+        self.store = FingerprintStore(self.store_path).open()
+        urls = self._tour_urls(spider)
+        if urls is not None:
+            stale = self.store.retain(urls)
+            if stale:
+                spider.logger.info(f"Conditional re-crawl: bỏ {stale} fingerprint của tour không có trong DB")
+        spider.logger.info(f"Conditional re-crawl: {len(self.store)} URL đã có fingerprint ({self.store_path})")
+
+    def _tour_urls(self, spider):
+        """URL các tour đang có trong DB, None nếu không đọc được (pipeline sẽ báo lỗi schema)"""
+        if self.settings is None:
+            return None
+
+        # SQLAlchemy chỉ được import khi cần, như incremental crawl của spider
+        from sqlalchemy import inspect, select
+
+        from .models import Tour, engine_from_settings
+
+        try:
+            engine = engine_from_settings(self.settings)
+            if not inspect(engine).has_table(Tour.__tablename__):
+                return set()
+            with engine.connect() as conn:
+                return set(conn.scalars(select(Tour.url)))
+        except Exception as e:
+            spider.logger.warning(f"Conditional re-crawl: không đọc được URL trong DB: {e}")
+            return None
+
+    def spider_closed(self, spider):
+        if self.store is not None:
+            self.store.close()
+        self.pending.clear()
+
+
+class HttpArchiveMiddleware:
+    """
+    Ghi / phát lại response HTTP từ HttpArchive (file HTTP_ARCHIVE_PATH), theo HTTP_ARCHIVE_MODE:
+
+      "record"  lưu mọi response tải từ mạng (trừ 304 của conditional request)
+      "replay"  trả response từ archive, không request nào ra mạng; request không có
+                trong archive bị bỏ qua (IgnoreRequest, stats http_archive/miss)
+
+    Đặt sát downloader (priority 950) nên lưu response thô: chưa giải nén, chưa redirect.
+    Khi replay, response được trả ngay từ process_request, không qua download slot nên
+    không có delay / giới hạn concurrency: cả lần crawl chạy hết tốc độ CPU.
+    Key là request fingerprint của Scrapy (method + URL + body, không tính header).
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, crawler, mode, path="http_archive.db", codec=None):
+        if mode not in self.MODES:
+            raise NotConfigured(f"HTTP_ARCHIVE_MODE must be one of {self.MODES}, got {mode!r}")
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.mode = mode
+        self.path = path
+        self.codec = codec
+        self.archive = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mode = crawler.settings.get("HTTP_ARCHIVE_MODE")
+        if not mode:
+            raise NotConfigured
+        s = cls(
+            crawler,
+            mode,
+            path=crawler.settings.get("HTTP_ARCHIVE_PATH", "http_archive.db"),
+            codec=crawler.settings.get("HTTP_ARCHIVE_CODEC") or None,
+        )
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def _fingerprint(self, request):
+        return self.crawler.request_fingerprinter.fingerprint(request).hex()
+
+    def process_request(self, request, spider):
+        if self.mode != "replay" or self.archive is None:
+            return None
+
+        entry = self.archive.get(self._fingerprint(request))
+        if entry is None:
+            self.stats.inc_value("http_archive/miss")
+            raise IgnoreRequest(f"Not in HTTP archive: {request.url}")
+
+        self.stats.inc_value("http_archive/hit")
+        headers = Headers(entry["headers"])
+        response_cls = responsetypes.from_args(headers=headers, url=entry["url"], body=entry["body"])
+        return response_cls(
+            url=entry["url"],
+            status=entry["status"],
+            headers=headers,
+            body=entry["body"],
+            request=request,
+            flags=["archive"],
+        )
+
+    def process_response(self, request, response, spider):
+        if self.mode != "record" or self.archive is None:
+            return response
+        if response.status == 304 or "cached" in response.flags or "archive" in response.flags:
+            return response
+
+        self.archive.put(
+            self._fingerprint(request), request.method, response.url,
+            response.status, response.headers, response.body,
+        )
+        self.stats.inc_value("http_archive/recorded")
+        return response
+
+    def spider_opened(self, spider):
+        self.archive = HttpArchive(self.path, codec=self.codec).open()
+        spider.logger.info(
+            f"HTTP archive {self.mode}: {len(self.archive)} responses ({self.path}, codec={self.archive.codec})"
+        )
+
+    def spider_closed(self, spider):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+
+def _header(response, name):
+    value = response.headers.get(name)
+    return value.decode("latin-1") if value else None
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Thay DOWNLOAD_DELAY cố định: mỗi download slot (domain) có một AimdController
+    điều chỉnh slot.delay và slot.concurrency theo latency, tỉ lệ 429/503, lỗi mạng
+    và header Retry-After. Đặt sau RetryMiddleware (priority > 550) để thấy response
+    429/503 trước khi chúng bị chuyển thành request retry.
+
+    Trạng thái hiện tại được ghi ra stats:
+      throttle/<slot>/delay, throttle/<slot>/concurrency, throttle/<slot>/latency_ms
+      throttle/increase, throttle/decrease, throttle/retry_after, throttle/congestion
+    """
+
+    def __init__(self, crawler, controller_kwargs=None):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.controller_kwargs = controller_kwargs or {}
+        self.controllers = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_THROTTLE_ENABLED", False):
+            raise NotConfigured
+        s = cls(crawler, {
+            "start_delay": settings.getfloat("ADAPTIVE_THROTTLE_START_DELAY", 1.0),
+            "min_delay": settings.getfloat("ADAPTIVE_THROTTLE_MIN_DELAY", 0.0),
+            "max_delay": settings.getfloat("ADAPTIVE_THROTTLE_MAX_DELAY", 60.0),
+            "start_concurrency": settings.getint("ADAPTIVE_THROTTLE_START_CONCURRENCY", 2),
+            "max_concurrency": settings.getint("ADAPTIVE_THROTTLE_MAX_CONCURRENCY",
+                                               settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN", 8)),
+            "target_latency": settings.getfloat("ADAPTIVE_THROTTLE_TARGET_LATENCY", 1.0),
+            "backoff": settings.getfloat("ADAPTIVE_THROTTLE_BACKOFF", 0.5),
+        })
+        crawler.signals.connect(s.request_reached_downloader, signal=signals.request_reached_downloader)
+        return s
+
+    def request_reached_downloader(self, request, spider):
+        # Slot mới tạo (hoặc tạo lại sau khi Scrapy dọn slot rảnh) mang DOWNLOAD_DELAY /
+        # CONCURRENT_REQUESTS_PER_DOMAIN mặc định → áp trạng thái controller trước khi gửi request
+        key, slot = self._slot(request)
+        if slot is None:
+            return
+        controller = self._controller(key, slot)
+        if (slot.delay, slot.concurrency) != (controller.delay, controller.concurrency):
+            self._apply(key, slot, controller, (controller.increases, controller.decreases))
+
+    def process_response(self, request, response, spider):
+        key, slot = self._slot(request)
+        if slot is None:
+            return response
+
+        controller = self._controller(key, slot)
+        retry_after = None
+        if response.status in CONGESTION_STATUSES:
+            self.stats.inc_value("throttle/congestion")
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                self.stats.inc_value("throttle/retry_after")
+
+        before = (controller.increases, controller.decreases)
+        controller.on_response(response.status, request.meta.get("download_latency"), retry_after)
+        self._apply(key, slot, controller, before)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        key, slot = self._slot(request)
+        if slot is not None:
+            controller = self._controller(key, slot)
+            before = (controller.increases, controller.decreases)
+            controller.on_error()
+            self._apply(key, slot, controller, before)
+        return None
+
+    def _slot(self, request):
+        downloader = self.crawler.engine.downloader
+        key = downloader.get_slot_key(request)
+        return key, downloader.slots.get(key)
+
+    def _controller(self, key, slot):
+        controller = self.controllers.get(key)
+        if controller is None:
+            controller = self.controllers[key] = AimdController(**self.controller_kwargs)
+        return controller
+
+    def _apply(self, key, slot, controller, before):
+        increases, decreases = before
+        if controller.increases > increases:
+            self.stats.inc_value("throttle/increase", controller.increases - increases)
+        if controller.decreases > decreases:
+            self.stats.inc_value("throttle/decrease", controller.decreases - decreases)
+
+        slot.delay = controller.delay
+        slot.concurrency = controller.concurrency
+
+        self.stats.set_value(f"throttle/{key}/delay", round(controller.delay, 3))
+        self.stats.set_value(f"throttle/{key}/concurrency", controller.concurrency)
+        if controller.latency is not None:
+            self.stats.set_value(f"throttle/{key}/latency_ms", round(controller.latency * 1000, 1))
@@ -0,0 +1,381 @@
+# Migration có đánh số version cho database của tour_scraper.
+#
+#   python -m tour_scraper.migrations                      # DB mặc định (models.DATABASE_URL)
+#   python -m tour_scraper.migrations --db sqlite:///tours.db
+#   python -m tour_scraper.migrations --check              # chỉ kiểm tra, không sửa
+#
+# Version hiện tại lưu trong bảng schema_version (mỗi migration đã chạy một dòng).
+# DB mới (chưa có bảng tours, hoặc bảng tours rỗng và đúng schema) được tạo theo
+# models rồi đánh dấu version mới nhất, không chạy lại từng migration.
+#
+#   1  rebuild_tours           bảng tours cũ (region, tour_name/title NOT NULL, ma_tour UNIQUE,
+#                              chưa có mien) → tạo lại theo models.Tour, giữ id và dữ liệu
+#   2  add_missing_columns     thêm các cột / index mới của models vào bảng đã có
+#   3  normalize_json_columns  giải mã các cột JSON bị encode hai lần (pipeline cũ
+#                              json.dumps trước khi ghi vào cột JSON) và điền các bảng con
+#                              tour_days, tour_activities, tour_services từ cột JSON
+#   4  add_search_columns      thêm cột tìm kiếm đã chuẩn hóa tour_days.ngay_search,
+#                              tour_activities.text_search (+ index) và điền lại bảng con
+#
+# Pipeline gọi ensure_schema khi mở spider: schema lệch với models thì dừng ngay
+# (SchemaError) thay vì để mọi lệnh INSERT bị rollback lúc commit.
+
+import argparse
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Integer, MetaData, String, Table, UniqueConstraint,
+    func, insert, inspect, select, update,
+)
+from sqlalchemy.orm import Session
+
+from .models import CHILD_TABLES, DATABASE_URL, Base, Tour, decode_json, get_engine, replace_children
+
+# Bảng version riêng, không nằm trong Base.metadata (create_all của models không tạo)
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime),
+)
+
+# Cột của bảng tours cũ được đổi tên: cột mới → cột cũ
+RENAMED_COLUMNS = {"mien": "region"}
+
+
+class SchemaError(RuntimeError):
+    """Schema của database không khớp với models"""
+
+
+# ============================================================
+# Kiểm tra schema
+# ============================================================
+
+def _unique_column_sets(table):
+    """Các tập cột có ràng buộc UNIQUE trong models"""
+    sets = {frozenset([column.name]) for column in table.c if column.unique or column.primary_key}
+    sets |= {frozenset(index.columns.keys()) for index in table.indexes if index.unique}
+    sets |= {
+        frozenset(constraint.columns.keys()) for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    }
+    return sets
+
+
+def schema_problems(engine, tables=None):
+    """
+    So sánh các bảng của models với database, trả về list mô tả các chỗ lệch
+    làm lệnh ghi của pipeline bị lỗi:
+      - thiếu bảng / thiếu cột
+      - cột NOT NULL (không có default) mà models không ghi hoặc cho phép NULL
+      - UNIQUE trên cột mà models không yêu cầu unique
+    """
+    inspector = inspect(engine)
+    problems = []
+
+    for table in tables or Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            problems.append(f"thiếu bảng {table.name}")
+            continue
+
+        db_columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+        for column in table.c:
+            if column.name not in db_columns:
+                problems.append(f"{table.name}.{column.name}: thiếu cột")
+
+        for name, column in db_columns.items():
+            if column["nullable"] or column.get("default") is not None or column.get("primary_key"):
+                continue
+            if name not in table.c:
+                problems.append(f"{table.name}.{name}: NOT NULL nhưng models không có cột này")
+            elif table.c[name].nullable:
+                problems.append(f"{table.name}.{name}: NOT NULL nhưng models cho phép NULL")
+
+        unique_sets = _unique_column_sets(table)
+        db_uniques = [
+            (index["name"], index["column_names"])
+            for index in inspector.get_indexes(table.name) if index["unique"]
+        ] + [
+            (constraint["name"], constraint["column_names"])
+            for constraint in inspector.get_unique_constraints(table.name)
+        ]
+        for name, columns in db_uniques:
+            if frozenset(columns) not in unique_sets:
+                problems.append(f"{table.name}: UNIQUE {name or ''}({', '.join(columns)}) không có trong models")
+
+    return problems
+
+
+def current_version(engine):
+    """Version đã áp dụng cao nhất, 0 nếu chưa có bảng schema_version"""
+    if not inspect(engine).has_table(schema_version.name):
+        return 0
+    with engine.connect() as conn:
+        return conn.scalar(select(func.max(schema_version.c.version))) or 0
+
+
+def _is_new_database(engine):
+    """Chưa có bảng tours, hoặc bảng tours rỗng và đã đúng schema (VD vừa được create_all)"""
+    if not inspect(engine).has_table(Tour.__tablename__):
+        return True
+    with engine.connect() as conn:
+        empty = conn.scalar(select(func.count()).select_from(Tour.__table__)) == 0
+    return empty and not schema_problems(engine)
+
+
+def _stamp(engine, migrations):
+    now = datetime.now()
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        for version, description, _ in migrations:
+            conn.execute(insert(schema_version).values(version=version, description=description, applied_at=now))
+
+
+def ensure_schema(engine, auto_migrate=False, log=print):
+    """
+    Gọi khi mở pipeline. DB mới → tạo bảng và đánh dấu version mới nhất.
+    auto_migrate=True → chạy các migration còn thiếu.
+    Còn migration chưa chạy hoặc schema vẫn lệch → SchemaError.
+    """
+    if auto_migrate:
+        upgrade(engine, log=log)
+    elif current_version(engine) == 0 and _is_new_database(engine):
+        Base.metadata.create_all(engine)
+        _stamp(engine, MIGRATIONS)
+
+    version = current_version(engine)
+    problems = schema_problems(engine)
+    if version < HEAD:
+        problems.insert(0, f"schema version {version} < {HEAD}: còn migration chưa chạy")
+    if problems:
+        raise schema_error(engine, problems, hint=" (hoặc đặt DB_AUTO_MIGRATE = True)")
+    return version
+
+
+def check_tables(engine, tables):
+    """Chỉ đọc (VD export_db): các bảng tables phải khớp models, nếu không → SchemaError"""
+    problems = schema_problems(engine, tables)
+    if problems:
+        raise schema_error(engine, problems)
+
+
+def schema_error(engine, problems, hint=""):
+    return SchemaError(
+        f"Database schema không khớp với models ({engine.url!r}):\n  - "
+        + "\n  - ".join(problems)
+        + f"\nChạy `python -m tour_scraper.migrations`{hint}"
+    )
+
+
+# ============================================================
+# Các migration
+# ============================================================
+
+def _bare_copy(table, name):
+    """Bản sao bảng (cột, PK, NOT NULL, UNIQUE) với tên khác, không kèm index"""
+    return Table(name, MetaData(), *[
+        Column(
+            column.name, column.type,
+            primary_key=column.primary_key,
+            nullable=column.nullable,
+            unique=column.unique,
+            autoincrement=column.autoincrement,
+        )
+        for column in table.c
+    ])
+
+
+def rebuild_tours(engine, log=print):
+    """
+    SQLite không bỏ được NOT NULL / đổi tên cột bằng ALTER TABLE → tạo bảng mới theo
+    models.Tour, chép dữ liệu (giữ id để bảng con vẫn trỏ đúng), xóa bảng cũ, đổi tên.
+    Bảng tours đã khớp (chỉ thiếu cột có thể ALTER ADD) thì bỏ qua.
+    """
+    table = Tour.__table__
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return
+
+    problems = [
+        problem for problem in schema_problems(engine, tables=[table])
+        if not problem.endswith(": thiếu cột")
+    ]
+    db_columns = {column["name"] for column in inspector.get_columns(table.name)}
+    renamed = {
+        name: old for name, old in RENAMED_COLUMNS.items()
+        if name not in db_columns and old in db_columns
+    }
+    if not problems and not renamed:
+        return
+
+    temp_name = f"_{table.name}_new"
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # DROP TABLE với foreign_keys=ON sẽ xóa cascade các dòng bảng con
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.commit()
+
+        with conn.begin():
+            legacy = Table(table.name, MetaData(), autoload_with=conn)
+            new = _bare_copy(table, temp_name)
+            new.drop(conn, checkfirst=True)
+            new.create(conn)
+
+            sources = {name: name for name in table.c.keys() if name in legacy.c}
+            sources.update(renamed)
+            dropped = sorted(set(legacy.c.keys()) - set(sources.values()))
+
+            conn.execute(
+                insert(new).from_select(
+                    list(sources),
+                    select(*[legacy.c[old] for old in sources.values()]),
+                )
+            )
+            count = conn.scalar(select(func.count()).select_from(new))
+
+            legacy.drop(conn)
+            conn.exec_driver_sql(f'ALTER TABLE "{temp_name}" RENAME TO "{table.name}"')
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+    for name, old in renamed.items():
+        log(f"  tours.{old} → tours.{name}")
+    if dropped:
+        log(f"  bỏ cột không có trong models: {', '.join(dropped)}")
+    log(f"  đã tạo lại bảng tours ({count} dòng)")
+
+
+def add_missing_columns(engine, log=print):
+    """ALTER TABLE ADD COLUMN cho các cột (cho phép NULL) còn thiếu, tạo các index còn thiếu"""
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                table.create(conn)
+                log(f"  tạo bảng {table.name}")
+                continue
+
+            db_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.c:
+                if column.name in db_columns:
+                    continue
+                if not column.nullable:
+                    raise SchemaError(f"Không thêm được cột NOT NULL {table.name}.{column.name} vào bảng đã có")
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                    f"{preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+                )
+                log(f"  thêm cột {table.name}.{column.name}")
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def normalize_json_columns(engine, batch_size=500, log=print):
+    """Trả về (số tour đã xử lý, số tour có cột JSON bị encode hai lần)"""
+    Base.metadata.create_all(engine, tables=[table.__table__ for table in CHILD_TABLES])
+
+    json_columns = [column for column in Tour.__table__.c if isinstance(column.type, JSON)]
+    total = fixed = 0
+    last_id = 0
+
+    with Session(engine) as session:
+        while True:
+            # Phân trang theo id (không giữ cursor mở trong khi ghi)
+            rows = session.execute(
+                select(Tour.id, *json_columns)
+                .where(Tour.id > last_id)
+                .order_by(Tour.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            decoded_rows = []
+            updates = []
+            for row in rows:
+                decoded = {column.name: decode_json(row[column.name]) for column in json_columns}
+                changed = {name: value for name, value in decoded.items() if value is not row[name]}
+                if changed:
+                    updates.append({"id": row["id"], **changed})
+                decoded_rows.append({"id": row["id"], **decoded})
+
+            if updates:
+                session.execute(update(Tour), updates)
+            replace_children(session, decoded_rows)
+            session.commit()
+
+            total += len(rows)
+            fixed += len(updates)
+            log(f"  {total} tours ({fixed} double-encoded)")
+
+    return total, fixed
+
+
+def add_search_columns(engine, log=print):
+    """Thêm cột *_search của bảng con rồi ghi lại bảng con (child_rows điền giá trị chuẩn hóa)"""
+    add_missing_columns(engine, log=log)
+    return normalize_json_columns(engine, log=log)
+
+
+# (version, mô tả, hàm(engine, log)), theo thứ tự; chỉ thêm vào cuối, không sửa version đã phát hành
+MIGRATIONS = [
+    (1, "Tạo lại bảng tours cũ theo models.Tour (region → mien)", rebuild_tours),
+    (2, "Thêm cột / index mới của models", add_missing_columns),
+    (3, "Giải mã cột JSON encode hai lần, điền bảng con", normalize_json_columns),
+    (4, "Cột tìm kiếm chuẩn hóa cho tour_days / tour_activities", add_search_columns),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+
+def upgrade(engine, log=print):
+    """Chạy các migration có version > version hiện tại, trả về list version đã chạy"""
+    version = current_version(engine)
+    if version == 0 and _is_new_database(engine):
+        Base.metadata.create_all(engine)
+        _stamp(engine, MIGRATIONS)
+        log(f"Database mới: tạo bảng theo models, schema version {HEAD}")
+        return []
+
+    applied = []
+    for migration in MIGRATIONS:
+        number, description, run = migration
+        if number <= version:
+            continue
+        log(f"Migration {number}: {description}")
+        run(engine, log=log)
+        _stamp(engine, [migration])
+        applied.append(number)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chuyển database tours sang schema hiện tại')
+    parser.add_argument('--db', dest='database_url', help='database URL, mặc định models.DATABASE_URL')
+    parser.add_argument('--check', action='store_true', help='chỉ kiểm tra schema, không sửa')
+    args = parser.parse_args()
+
+    engine = get_engine(args.database_url or DATABASE_URL)
+
+    if args.check:
+        version = current_version(engine)
+        problems = schema_problems(engine)
+        print(f"Schema version {version} / {HEAD}")
+        for problem in problems:
+            print(f"  - {problem}")
+        if version < HEAD or problems:
+            raise SystemExit(1)
+        print("✓ Schema khớp với models")
+        return
+
+    applied = upgrade(engine)
+    print(f"✓ Schema version {current_version(engine)} (đã chạy {len(applied)} migration)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,108 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import (
+    create_engine, Column, ForeignKey, Index, Integer, String, Text, DateTime, JSON,
+    cast, delete, event, func, insert, or_, select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
+from functools import lru_cache
+import json
 
-DATABASE_URL = "sqlite:///tours.db"  # Có thể đổi sang MySQL/PostgreSQL sau
+from .text import normalize
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
+DATABASE_URL = "sqlite:///tours.db"  # Mặc định, đổi bằng setting DATABASE_URL (MySQL/PostgreSQL, ...)
 
 Base = declarative_base()
 
+
+# ============================================================
+# Engine / session: tạo khi cần (open_spider, CLI), không tạo lúc import
+# ============================================================
+
+# PRAGMA chạy trên mỗi kết nối SQLite mới (setting SQLITE_PRAGMAS, {} → mặc định của SQLite):
+#   journal_mode=WAL      đọc (export) không bị chặn khi crawl đang ghi và ngược lại
+#   synchronous=NORMAL    với WAL: không fsync mỗi commit, DB không hỏng khi mất điện
+#                         (chỉ có thể mất vài commit cuối)
+#   mmap_size             đọc file DB qua memory map (byte)
+#   cache_size            số âm = KiB page cache mỗi kết nối
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Chạy các PRAGMA trên một kết nối DB-API (sqlite3) vừa mở"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def get_engine(database_url=DATABASE_URL, pool_size=0, echo=False, sqlite_pragmas=None):
+    """
+    Engine dùng chung cho mỗi (database_url, pool_size, echo, sqlite_pragmas).
+    pool_size = 0 → mặc định của SQLAlchemy.
+    echo=True log từng câu SQL, rất chậm khi crawl nhiều tour → chỉ bật khi debug.
+    sqlite_pragmas: dict PRAGMA cho SQLite, None → SQLITE_PRAGMAS; giá trị None bỏ PRAGMA đó.
+    """
+    if sqlite_pragmas is None:
+        sqlite_pragmas = SQLITE_PRAGMAS
+    pragmas = tuple((name, value) for name, value in sqlite_pragmas.items() if value is not None)
+    for name, value in pragmas:
+        if not name.isidentifier() or not str(value).replace("-", "").isalnum():
+            raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+    return _create_engine(database_url, pool_size, echo, pragmas)
+
+
+def _json_dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _search_text(text):
+    return normalize(text) if isinstance(text, str) else None
+
+
+@lru_cache(maxsize=None)
+def _create_engine(database_url, pool_size, echo, pragmas):
+    options = {"echo": echo}
+    if pool_size > 0:
+        options["pool_size"] = pool_size
+    # Cột JSON giữ nguyên chữ tiếng Việt thay vì \uXXXX
+    engine = create_engine(database_url, json_serializer=_json_dumps, **options)
+
+    if engine.dialect.name == "sqlite" and pragmas:
+        event.listen(engine, "connect", lambda dbapi_connection, record: apply_sqlite_pragmas(dbapi_connection, pragmas))
+    return engine
+
+
+def engine_from_settings(settings):
+    """Engine theo Scrapy settings DATABASE_URL, DB_POOL_SIZE, DB_ECHO, SQLITE_PRAGMAS"""
+    return get_engine(
+        settings.get("DATABASE_URL") or DATABASE_URL,
+        pool_size=settings.getint("DB_POOL_SIZE", 0),
+        echo=settings.getbool("DB_ECHO", False),
+        sqlite_pragmas=settings.getdict("SQLITE_PRAGMAS", SQLITE_PRAGMAS),
+    )
+
+
+def session_factory(engine=None):
+    return sessionmaker(bind=engine if engine is not None else get_engine())
+
+
+def __getattr__(name):
+    # Tương thích ngược: models.engine / models.SessionLocal chỉ tạo engine khi được dùng tới
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 class Tour(Base):
     __tablename__ = "tours"
     
@@ -17,6 +111,9 @@ class Tour(Base):
     
     # Thông tin cơ bản
     url = Column(String(1000), unique=True)
+    hinh_anh_chinh = Column(Text)
+    tour_name = Column(String(200), index=True)  # Tuyến, VD "Đông Bắc"
+    title = Column(Text)
     ma_tour = Column(String(100))
     thoi_gian = Column(String(100))
     khoi_hanh = Column(String(300))
@@ -38,6 +135,233 @@ class Tour(Base):
     
     # Metadata
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime)  # Lần cuối nội dung thay đổi khi re-crawl
+    last_seen_at = Column(DateTime)  # Lần cuối trang chi tiết được tải (kể cả khi không đổi)
+
+
+# ============================================================
+# Bảng con: các cột JSON của tours được tách thành dòng để query / đánh index.
+# Cột JSON vẫn giữ làm bản gốc cho export; bảng con được ghi lại mỗi khi tour được ghi.
+# ============================================================
+
+class TourDay(Base):
+    """Một ngày trong lich_trinh"""
+    __tablename__ = "tour_days"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tour_id = Column(Integer, ForeignKey("tours.id", ondelete="CASCADE"), nullable=False)
+    day_index = Column(Integer, nullable=False)  # 1, 2, ... theo thứ tự trong lich_trinh
+    ngay = Column(Text)  # Tiêu đề ngày, VD "NGÀY 2 | HÀ NỘI – HẠ LONG"
+    ngay_search = Column(Text)  # ngay đã chuẩn hóa (chữ thường, bỏ dấu), xem select_tours_by_day
+
+    __table_args__ = (
+        Index("ix_tour_days_tour_day", "tour_id", "day_index", unique=True),
+        Index("ix_tour_days_day_index", "day_index"),
+        Index("ix_tour_days_ngay_search", "ngay_search"),
+    )
+
+
+class TourActivity(Base):
+    """Một hoạt động (hoat_dong) của một ngày"""
+    __tablename__ = "tour_activities"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tour_id = Column(Integer, ForeignKey("tours.id", ondelete="CASCADE"), nullable=False)
+    day_index = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    text = Column(Text)
+    text_search = Column(Text)  # text đã chuẩn hóa (chữ thường, bỏ dấu)
+
+    __table_args__ = (
+        Index("ix_tour_activities_tour_day", "tour_id", "day_index", "position"),
+        Index("ix_tour_activities_day_index", "day_index"),
+        Index("ix_tour_activities_text_search", "text_search"),
+    )
+
+
+class TourService(Base):
+    """Một dòng của các trường list: trai_nghiem, dich_vu_bao_gom, ghi_chu, ..."""
+    __tablename__ = "tour_services"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tour_id = Column(Integer, ForeignKey("tours.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(30), nullable=False)  # Tên trường, xem SERVICE_FIELDS
+    position = Column(Integer, nullable=False)
+    text = Column(Text)
+
+    __table_args__ = (
+        Index("ix_tour_services_tour_kind", "tour_id", "kind", "position"),
+        Index("ix_tour_services_kind", "kind"),
+    )
+
+
+# Trường list<string> của tour được tách vào tour_services (kind = tên trường)
+SERVICE_FIELDS = (
+    "trai_nghiem", "diem_nhan_hanh_trinh",
+    "dich_vu_bao_gom", "dich_vu_khong_bao_gom", "ghi_chu",
+)
+
+CHILD_TABLES = (TourDay, TourActivity, TourService)
+
+
+# Cột NOT NULL không có giá trị mặc định: item thiếu cột này sẽ làm hỏng cả lô khi ghi
+REQUIRED_COLUMNS = [
+    column.name for column in Tour.__table__.c
+    if not column.nullable and not column.primary_key and column.default is None
+]
+
+
+# Các dialect hỗ trợ INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Cột không bao giờ bị ghi đè khi re-crawl
+UPSERT_IMMUTABLE_COLUMNS = {"id", "url", "created_at", "updated_at", "last_seen_at"}
+
+
+# Số tham số tối đa của một câu lệnh (SQLite >= 3.32: 32766, PostgreSQL: 65535)
+MAX_BIND_PARAMS = {
+    "sqlite": 32766,
+    "postgresql": 65535,
+}
+
+
+def supports_upsert(dialect_name):
+    return dialect_name in UPSERT_DIALECTS
+
+
+def upsert_chunk_size(dialect_name, columns):
+    """Số dòng tối đa của một câu build_upsert khi mỗi dòng có columns cột"""
+    # Trừ 1 tham số cho updated_at trong SET
+    return max(1, (MAX_BIND_PARAMS.get(dialect_name, 32766) - 1) // max(1, columns))
+
+
+def build_upsert(dialect_name, rows):
+    """
+    Tạo một câu INSERT ... ON CONFLICT (url) DO UPDATE cho cả lô rows
+    (mỗi dòng một bộ tham số, xem upsert_chunk_size để chia lô lớn).
+    Chỉ update (và đổi updated_at) những dòng có ít nhất một cột thay đổi;
+    dòng đã đổi thì mọi cột ngoài UPSERT_IMMUTABLE_COLUMNS được ghi lại.
+    """
+    stmt = UPSERT_DIALECTS[dialect_name](Tour).values(rows)
+    excluded = stmt.excluded
+    columns = Tour.__table__.c
+
+    update_cols = [name for name in rows[0] if name not in UPSERT_IMMUTABLE_COLUMNS]
+
+    def comparable(column):
+        # PostgreSQL không so sánh được kiểu JSON → so sánh dạng text
+        if isinstance(column.type, JSON):
+            return cast(column, Text)
+        return column
+
+    changed = or_(*[
+        comparable(columns[name]).is_distinct_from(comparable(excluded[name]))
+        for name in update_cols
+    ])
+
+    set_ = {name: excluded[name] for name in update_cols}
+    set_["updated_at"] = datetime.now()
+
+    return stmt.on_conflict_do_update(
+        index_elements=[columns.url],
+        set_=set_,
+        where=changed,
+    )
+
+def load_tour_index(session):
+    """url -> thời điểm trang chi tiết được crawl lần cuối (last_seen_at, hoặc created_at với dòng cũ)"""
+    rows = session.execute(select(Tour.url, func.coalesce(Tour.last_seen_at, Tour.created_at)))
+    return {url: seen for url, seen in rows if url}
+
+def decode_json(value):
+    """
+    Giá trị cột JSON → list / dict. Dòng do pipeline cũ ghi bị encode hai lần
+    (json.dumps rồi cột JSON encode thêm lần nữa) nên đọc ra là chuỗi → giải mã thêm.
+    """
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def child_rows(tour_id, row):
+    """Dòng tours (dict cột) → (days, activities, services) cho các bảng con"""
+    days, activities, services = [], [], []
+
+    for day_index, day in enumerate(decode_json(row.get("lich_trinh")) or [], 1):
+        if not isinstance(day, dict):
+            continue
+        days.append({
+            "tour_id": tour_id, "day_index": day_index,
+            "ngay": day.get("ngay"), "ngay_search": _search_text(day.get("ngay")),
+        })
+        for position, text in enumerate(day.get("hoat_dong") or [], 1):
+            activities.append({
+                "tour_id": tour_id, "day_index": day_index, "position": position,
+                "text": text, "text_search": _search_text(text),
+            })
+
+    for kind in SERVICE_FIELDS:
+        values = decode_json(row.get(kind)) or []
+        if isinstance(values, str):
+            values = [values]
+        for position, text in enumerate(values, 1):
+            services.append({"tour_id": tour_id, "kind": kind, "position": position, "text": text})
+
+    return days, activities, services
+
+
+def replace_children(session, rows, chunk_size=500):
+    """
+    Ghi lại bảng con cho các tour trong rows (dict cột, có "url" hoặc "id"):
+    xóa dòng con cũ rồi insert nhiều dòng một lần. Không commit.
+    Trả về số tour đã ghi bảng con.
+    """
+    ids = {}
+    urls = [row["url"] for row in rows if row.get("id") is None and row.get("url") is not None]
+    for start in range(0, len(urls), chunk_size):
+        chunk = urls[start:start + chunk_size]
+        ids.update(session.execute(select(Tour.url, Tour.id).where(Tour.url.in_(chunk))).all())
+
+    days, activities, services = [], [], []
+    tour_ids = []
+    for row in rows:
+        tour_id = row.get("id") or ids.get(row.get("url"))
+        if tour_id is None:
+            continue
+        tour_ids.append(tour_id)
+        row_days, row_activities, row_services = child_rows(tour_id, row)
+        days += row_days
+        activities += row_activities
+        services += row_services
+
+    for start in range(0, len(tour_ids), chunk_size):
+        chunk = tour_ids[start:start + chunk_size]
+        for table in CHILD_TABLES:
+            session.execute(delete(table).where(table.tour_id.in_(chunk)))
+
+    for table, values in ((TourDay, days), (TourActivity, activities), (TourService, services)):
+        if values:
+            session.execute(insert(table), values)
+    return len(tour_ids)
+
 
-# Tạo bảng
-Base.metadata.create_all(engine)
\ No newline at end of file
+def select_tours_by_day(keyword, day_index=None):
+    """
+    SELECT các tour có ngày (tiêu đề ngày hoặc hoạt động) chứa keyword,
+    VD select_tours_by_day("Hạ Long", day_index=2): tour có ngày 2 ở Hạ Long.
+    So khớp trên cột *_search (chữ thường, bỏ dấu) nên không phân biệt hoa / thường,
+    có dấu / không dấu ("HẠ LONG", "Hạ Long", "ha long").
+    """
+    pattern = f"%{normalize(keyword)}%"
+    day_match = select(TourDay.tour_id).where(TourDay.ngay_search.like(pattern))
+    activity_match = select(TourActivity.tour_id).where(TourActivity.text_search.like(pattern))
+    if day_index is not None:
+        day_match = day_match.where(TourDay.day_index == day_index)
+        activity_match = activity_match.where(TourActivity.day_index == day_index)
+    return select(Tour).where(Tour.id.in_(day_match.union(activity_match)))
@@ -0,0 +1,88 @@
+# Chạy bước trích xuất thuần của parse_tour_detail (HTML bytes → dict) trên
+# ProcessPoolExecutor, để phần parse nặng CPU dùng được nhiều core trong khi
+# reactor tiếp tục tải trang. Kết quả trả về reactor dưới dạng Deferred.
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.http import HtmlResponse
+
+from . import extraction
+from .profiling import ExtractionProfiler
+
+logger = logging.getLogger(__name__)
+
+
+def extract_tour_html(url, body, encoding, profiling=False):
+    """
+    Chạy trong worker process: dựng lại HtmlResponse từ bytes rồi trích xuất.
+    Trả về (dict các trường, snapshot profiler hoặc None).
+    """
+    response = HtmlResponse(url=url, body=body, encoding=encoding)
+    profile = ExtractionProfiler(enabled=profiling)
+    fields = extraction.extract_tour(response, extraction.logger, profile)
+    return fields, (profile.snapshot() if profiling else None)
+
+
+class ParsePool:
+    """
+    Pool process dùng chung cho một spider.
+    workers = 0 → số CPU. Dùng start method 'spawn' (chạy được cả trên Windows,
+    và không fork process đang chạy reactor + các thread của nó).
+    """
+
+    def __init__(self, workers=0, profiling=False, stats=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.profiling = profiling
+        self.stats = stats
+        self.executor = None
+
+    def start(self):
+        import multiprocessing
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            logger.info(f"Parse pool started ({self.workers} processes)")
+        return self
+
+    def submit(self, response):
+        """Gửi trang vào pool, trả về Deferred bắn (fields, snapshot) trên reactor thread"""
+        from twisted.internet import reactor
+        from twisted.internet.defer import Deferred
+        from twisted.python.failure import Failure
+
+        self.start()
+        if self.stats is not None:
+            self.stats.inc_value('parse_pool/submitted')
+
+        d = Deferred()
+
+        def fire(future):
+            if future.cancelled():
+                # close() hủy các trang còn trong hàng đợi khi spider đóng: không còn ai chờ kết quả
+                if self.stats is not None:
+                    self.stats.inc_value('parse_pool/cancelled')
+                return
+            error = future.exception()
+            if error is not None:
+                if self.stats is not None:
+                    self.stats.inc_value('parse_pool/failed')
+                d.errback(Failure(error))
+            else:
+                d.callback(future.result())
+
+        future = self.executor.submit(
+            extract_tour_html, response.url, response.body, response.encoding, self.profiling
+        )
+        # Callback của future chạy trên thread quản lý của executor → chuyển về reactor
+        future.add_done_callback(lambda f: reactor.callFromThread(fire, f))
+        return d
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -1,51 +1,430 @@
-from .models import SessionLocal, Tour
+from .fingerprints import page_unchanged, tours_saved
+from .migrations import ensure_schema
+from .models import (
+    DATABASE_URL, REQUIRED_COLUMNS, SQLITE_PRAGMAS, Tour, build_upsert, get_engine, replace_children,
+    session_factory, supports_upsert, upsert_chunk_size,
+)
+from scrapy.exceptions import DropItem
+from scrapy.utils.defer import maybe_deferred_to_future
+from sqlalchemy import insert, select, update
 from sqlalchemy.exc import IntegrityError
-import json
+from twisted.internet import defer, task, threads
+from collections import deque
+from datetime import datetime
+import queue
+import threading
+import time
+
+# Đánh dấu kết thúc hàng đợi của writer thread
+_STOP = object()
+
+
+def item_to_row(item):
+    """
+    Chuyển TourItem thành dict cột của bảng tours.
+    Cột JSON nhận thẳng list / dict: kiểu JSON của SQLAlchemy tự encode,
+    json.dumps trước sẽ làm giá trị bị encode hai lần.
+    """
+    return {
+        "url": item.get("url"),
+        "mien": item.get("mien"),
+        "hinh_anh_chinh": item.get("hinh_anh_chinh"),
+        "tour_name": item.get("tour_name"),
+        "title": item.get("title"),
+        "ma_tour": item.get("ma_tour"),
+        "thoi_gian": item.get("thoi_gian"),
+        "khoi_hanh": item.get("khoi_hanh"),
+        "van_chuyen": item.get("van_chuyen"),
+        "xuat_phat": item.get("xuat_phat"),
+        "gia_tu": item.get("gia_tu"),
+        "trai_nghiem": item.get("trai_nghiem"),
+        "diem_nhan_hanh_trinh": item.get("diem_nhan_hanh_trinh"),
+        "lich_trinh": item.get("lich_trinh"),
+        "dich_vu_bao_gom": item.get("dich_vu_bao_gom"),
+        "dich_vu_khong_bao_gom": item.get("dich_vu_khong_bao_gom"),
+        "ghi_chu": item.get("ghi_chu"),
+    }
+
 
 class TourScraperPipeline:
+    """
+    Ghi tour vào DB theo lô (batch): gom item vào buffer và flush bằng
+    một lệnh INSERT nhiều dòng + một commit khi đủ DB_BATCH_SIZE item,
+    khi quá DB_FLUSH_INTERVAL giây, hoặc khi đóng spider.
+    DB_BATCH_SIZE = 1 tương đương chế độ commit từng item như cũ.
+
+    Với SQLite/PostgreSQL và DB_UPSERT = True, tour đã có (trùng URL) được
+    cập nhật bằng INSERT ... ON CONFLICT DO UPDATE thay vì bị bỏ qua.
+
+    Với DB_WRITER_THREAD = True, mọi thao tác SQLAlchemy chạy trên một
+    writer thread riêng: process_item chỉ đẩy row vào hàng đợi giới hạn
+    DB_WRITER_QUEUE_SIZE nên reactor không bị block khi DB chậm. Khi hàng
+    đợi đầy, process_item trả về Deferred để Scrapy tạm dừng xử lý item
+    (backpressure) cho đến khi writer giải phóng chỗ. Lô ghi lỗi được log và
+    writer chạy tiếp; nếu writer thread dừng hẳn, item đang chờ nhận lỗi.
+
+    Sau mỗi lần commit, URL các tour đã ghi được gửi qua signal tours_saved
+    (để lưu fingerprint conditional re-crawl).
+
+    Mỗi lần flush, last_seen_at được cập nhật cho các tour vừa ghi và các
+    tour mà conditional re-crawl báo không đổi (signal page_unchanged).
+
+    Với DB_CHILD_TABLES = True, lich_trinh và các trường list được ghi thêm
+    vào bảng con tour_days / tour_activities / tour_services (insert nhiều
+    dòng một lần) trong cùng transaction với bảng tours.
+
+    Khi mở spider, schema của DB được so với models (migrations.ensure_schema):
+    lệch thì dừng crawl ngay, hoặc chạy migration nếu DB_AUTO_MIGRATE = True.
+    Item thiếu cột bắt buộc (REQUIRED_COLUMNS) bị bỏ thay vì làm hỏng cả lô.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=5.0, upsert=True,
+                 writer_thread=False, queue_size=1000, child_tables=True, auto_migrate=False,
+                 database_url=DATABASE_URL, pool_size=0, echo=False, sqlite_pragmas=None):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.upsert = upsert
+        self.writer_thread = writer_thread
+        self.queue_size = max(1, queue_size)
+        self.child_tables = child_tables
+        self.auto_migrate = auto_migrate
+        self.database_url = database_url
+        self.pool_size = pool_size
+        self.echo = echo
+        self.sqlite_pragmas = sqlite_pragmas
+        self.buffer = []
+        # URL trang không đổi chờ cập nhật last_seen_at
+        # (deque: reactor thread append, writer thread popleft)
+        self.touched = deque()
+        self.spider = None
+        self.signals = None
+        self.flush_loop = None
+        self.writer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            batch_size=crawler.settings.getint("DB_BATCH_SIZE", 100),
+            flush_interval=crawler.settings.getfloat("DB_FLUSH_INTERVAL", 5.0),
+            upsert=crawler.settings.getbool("DB_UPSERT", True),
+            writer_thread=crawler.settings.getbool("DB_WRITER_THREAD", False),
+            queue_size=crawler.settings.getint("DB_WRITER_QUEUE_SIZE", 1000),
+            child_tables=crawler.settings.getbool("DB_CHILD_TABLES", True),
+            auto_migrate=crawler.settings.getbool("DB_AUTO_MIGRATE", False),
+            database_url=crawler.settings.get("DATABASE_URL") or DATABASE_URL,
+            pool_size=crawler.settings.getint("DB_POOL_SIZE", 0),
+            echo=crawler.settings.getbool("DB_ECHO", False),
+            sqlite_pragmas=crawler.settings.getdict("SQLITE_PRAGMAS", SQLITE_PRAGMAS),
+        )
+        pipeline.signals = crawler.signals
+        crawler.signals.connect(pipeline.page_unchanged, signal=page_unchanged)
+        return pipeline
+
     def open_spider(self, spider):
-        self.session = SessionLocal()
-        spider.logger.info("Database session opened")
+        # Engine / bảng chỉ được tạo ở đây, khi spider thật sự ghi DB
+        engine = get_engine(self.database_url, pool_size=self.pool_size, echo=self.echo,
+                            sqlite_pragmas=self.sqlite_pragmas)
+        # Dừng ngay nếu schema lệch, không để đến lúc commit mới phát hiện
+        version = ensure_schema(engine, auto_migrate=self.auto_migrate, log=spider.logger.info)
+        self.session = session_factory(engine)()
+        self.spider = spider
+        self.last_flush = time.monotonic()
+
+        self.dialect_name = self.session.get_bind().dialect.name
+        if self.upsert and not supports_upsert(self.dialect_name):
+            spider.logger.warning(f"Upsert not supported on {self.dialect_name}, duplicates will be skipped")
+            self.upsert = False
+
+        if self.writer_thread:
+            # Writer thread sở hữu session và buffer, reactor chỉ chạm vào queue/pending
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.pending = deque()
+            self.writer = threading.Thread(target=self._writer_loop, name="tour-db-writer", daemon=True)
+            self.writer.start()
+        elif self.flush_interval > 0 and self.batch_size > 1:
+            # Flush định kỳ để item không nằm lâu trong buffer khi crawl chậm
+            self.flush_loop = task.LoopingCall(self._flush_if_stale)
+            self.flush_loop.start(self.flush_interval, now=False)
+
+        spider.logger.info(
+            f"Database session opened ({engine.url!r}, batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval}s, upsert={self.upsert}, "
+            f"writer_thread={self.writer_thread}, schema_version={version})"
+        )
+
+    async def close_spider(self, spider):
+        if self.writer is not None:
+            # Chờ writer ghi hết hàng đợi (trong thread pool để không block reactor)
+            try:
+                await maybe_deferred_to_future(threads.deferToThread(self._stop_writer))
+            finally:
+                self._close_session(spider)
+            return
 
-    def close_spider(self, spider):
-        self.session.commit()
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        self.flush(spider)
+        self._close_session(spider)
+
+    def _close_session(self, spider):
         self.session.close()
         spider.logger.info("Database session closed")
 
     def process_item(self, item, spider):
+        row = item_to_row(item)
+        missing = [name for name in REQUIRED_COLUMNS if row.get(name) is None]
+        if missing:
+            raise DropItem(f"Missing required fields {', '.join(missing)}: {row['url']}")
+
+        if self.writer is not None:
+            return self._enqueue(row, item)
+
+        self.buffer.append(row)
+
+        if len(self.buffer) >= self.batch_size:
+            self.flush(spider)
+        elif self.flush_interval > 0 and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush(spider)
+
+        return item
+
+    def page_unchanged(self, url):
+        """Trang tour không đổi (304 / cùng hash): chỉ cần cập nhật last_seen_at"""
+        if self.spider is None:
+            return
+        self.touched.append(url)
+        if self.writer is None and len(self.touched) >= self.batch_size:
+            self.flush(self.spider)
+
+    def _enqueue(self, row, item):
+        if not self.writer.is_alive():
+            raise RuntimeError(f"DB writer thread stopped, tour not saved: {row['url']}")
+
+        # Giữ đúng thứ tự: khi đã có item chờ thì item mới cũng phải xếp hàng
+        if not self.pending:
+            try:
+                self.queue.put_nowait(row)
+                return item
+            except queue.Full:
+                pass
+
+        d = defer.Deferred()
+        self.pending.append((row, item, d))
+        return d
+
+    def _feed_pending(self):
+        """Chạy trên reactor thread: chuyển item đang chờ vào queue khi có chỗ"""
+        while self.pending:
+            row, item, d = self.pending[0]
+            try:
+                self.queue.put_nowait(row)
+            except queue.Full:
+                return
+            self.pending.popleft()
+            d.callback(item)
+
+    def _writer_loop(self):
+        from twisted.internet import reactor
+
+        try:
+            self._write_queue(reactor)
+        except Exception as e:
+            # Không để item đang chờ chỗ trong queue treo mãi
+            self.spider.logger.exception(f"DB writer thread stopped: {e}")
+            reactor.callFromThread(self._fail_pending, e)
+
+    def _fail_pending(self, error):
+        """Chạy trên reactor thread khi writer thread đã dừng: báo lỗi cho item đang chờ"""
+        while self.pending:
+            _, _, d = self.pending.popleft()
+            d.errback(error)
+
+    def _write_queue(self, reactor):
+        # Poll định kỳ để flush theo thời gian và đánh thức item đang chờ
+        poll = min(self.flush_interval, 1.0) if self.flush_interval > 0 else 1.0
+        while True:
+            try:
+                row = self.queue.get(timeout=poll)
+            except queue.Empty:
+                row = None
+
+            if self.pending:
+                reactor.callFromThread(self._feed_pending)
+
+            if row is _STOP:
+                self._flush_batch()
+                return
+
+            if row is not None:
+                self.buffer.append(row)
+
+            if len(self.buffer) >= self.batch_size or len(self.touched) >= self.batch_size:
+                self._flush_batch()
+            elif self.flush_interval > 0 and time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush_batch()
+
+    def _flush_batch(self):
+        """flush trên writer thread: lô lỗi (VD database is locked) được log, thread chạy tiếp"""
+        try:
+            self.flush(self.spider)
+        except Exception as e:
+            self.session.rollback()
+            self.spider.logger.exception(f"Error writing batch to DB: {e}")
+
+    def _stop_writer(self):
+        # Writer đã dừng vì lỗi thì không còn ai lấy bớt queue → không chờ chỗ trống mãi
+        while self.writer.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=1.0)
+                break
+            except queue.Full:
+                continue
+        self.writer.join()
+
+    def _flush_if_stale(self):
+        if (self.buffer or self.touched) and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush(self.spider)
+
+    def flush(self, spider):
+        """Ghi toàn bộ buffer xuống DB trong một transaction"""
+        self.last_flush = time.monotonic()
+        if not self.buffer and not self.touched:
+            return
+
+        rows, self.buffer = self.buffer, []
+        touched = [self.touched.popleft() for _ in range(len(self.touched))]
+
+        written = []
+        if rows:
+            written = self._upsert(rows, spider) if self.upsert else self._insert_new(rows, spider)
+        self._send_saved([row["url"] for row in written])
+        self._mark_seen([row["url"] for row in written] + touched, spider)
+
+    def _send_saved(self, urls):
+        """Báo các tour đã commit (signal tours_saved), luôn gửi trên reactor thread"""
+        urls = [url for url in urls if url is not None]
+        if self.signals is None or not urls:
+            return
+        if self.writer is not None and threading.current_thread() is self.writer:
+            from twisted.internet import reactor
+
+            reactor.callFromThread(self.signals.send_catch_log, signal=tours_saved, urls=urls)
+        else:
+            self.signals.send_catch_log(signal=tours_saved, urls=urls)
+
+    def _mark_seen(self, urls, spider):
+        """Cập nhật last_seen_at cho các tour vừa được tải (ghi mới hoặc không đổi)"""
+        urls = [url for url in urls if url is not None]
+        if not urls:
+            return
+
+        now = datetime.now()
+        try:
+            # Chia nhỏ để không vượt giới hạn số tham số của SQLite
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                self.session.execute(update(Tour).where(Tour.url.in_(chunk)).values(last_seen_at=now))
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            spider.logger.error(f"Error updating last_seen_at for {len(urls)} tours: {e}")
+
+    def _upsert(self, rows, spider):
+        """Insert tour mới và cập nhật tour đã có trong một câu lệnh, trả về các dòng đã ghi"""
+        # ON CONFLICT không cho phép một câu lệnh đụng cùng một dòng hai lần
+        # → trong lô chỉ giữ bản crawl sau cùng của mỗi URL
+        latest = {}
+        for row in rows:
+            key = row["url"] if row["url"] is not None else id(row)
+            latest.pop(key, None)
+            latest[key] = row
+        rows = list(latest.values())
+
+        # Một câu lệnh nhiều VALUES: chia lô để không vượt giới hạn số tham số của DB
+        chunk_size = upsert_chunk_size(self.dialect_name, len(rows[0]))
         try:
-            # Helper function để chuyển list/dict sang JSON
-            def to_json(data):
-                if data is None:
-                    return None
-                return json.dumps(data, ensure_ascii=False)
-            
-            # Tạo tour object
-            tour = Tour(
-                url=item.get("url"),
-                ma_tour=item.get("ma_tour"),
-                thoi_gian=item.get("thoi_gian"),
-                khoi_hanh=item.get("khoi_hanh"),
-                van_chuyen=item.get("van_chuyen"),
-                xuat_phat=item.get("xuat_phat"),
-                gia_tu=item.get("gia_tu"),
-                trai_nghiem=to_json(item.get("trai_nghiem")),
-                diem_nhan_hanh_trinh=to_json(item.get("diem_nhan_hanh_trinh")),
-                lich_trinh=to_json(item.get("lich_trinh")),
-                dich_vu_bao_gom=to_json(item.get("dich_vu_bao_gom")),
-                dich_vu_khong_bao_gom=to_json(item.get("dich_vu_khong_bao_gom")),
-                ghi_chu=to_json(item.get("ghi_chu"))
-            )
-            
-            self.session.add(tour)
+            for start in range(0, len(rows), chunk_size):
+                self.session.execute(build_upsert(self.dialect_name, rows[start:start + chunk_size]))
+            self._write_children(rows)
             self.session.commit()
-            spider.logger.info(f"Saved tour: {item.get('ma_tour')}")
-            
+            spider.logger.info(f"Upserted {len(rows)} tours")
+            return rows
+        except Exception as e:
+            self.session.rollback()
+            spider.logger.error(f"Error upserting {len(rows)} tours: {e}")
+            return []
+
+    def _insert_new(self, rows, spider):
+        """Chỉ insert tour mới, bỏ qua và báo từng URL trùng; trả về các dòng đã ghi"""
+        rows = self._drop_duplicates(rows, spider)
+        if not rows:
+            return []
+
+        try:
+            self.session.execute(insert(Tour), rows)
+            self._write_children(rows)
+            self.session.commit()
+            spider.logger.info(f"Saved {len(rows)} tours")
+            return rows
         except IntegrityError:
+            # Có dòng trùng lọt qua bước lọc (VD: ghi đồng thời) → ghi lại từng dòng để báo đúng dòng lỗi
             self.session.rollback()
-            spider.logger.warning(f"Duplicate tour URL: {item.get('url')}")
+            return self._insert_row_by_row(rows, spider)
         except Exception as e:
             self.session.rollback()
-            spider.logger.error(f"Error saving tour: {e}")
-        
-        return item
\ No newline at end of file
+            spider.logger.error(f"Error saving {len(rows)} tours: {e}")
+            return []
+
+    def _write_children(self, rows):
+        """Ghi lại bảng con của các tour vừa ghi (cùng transaction, chưa commit)"""
+        if self.child_tables:
+            replace_children(self.session, rows)
+
+    def _drop_duplicates(self, rows, spider):
+        """Bỏ các dòng trùng URL trong lô hoặc đã có trong DB, báo từng URL trùng"""
+        seen = set()
+        unique_rows = []
+        for row in rows:
+            url = row["url"]
+            if url is not None and url in seen:
+                spider.logger.warning(f"Duplicate tour URL: {url}")
+                continue
+            seen.add(url)
+            unique_rows.append(row)
+
+        seen.discard(None)
+        if not seen:
+            return unique_rows
+
+        urls = list(seen)
+        existing = set()
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            existing.update(self.session.scalars(select(Tour.url).where(Tour.url.in_(chunk))))
+        if not existing:
+            return unique_rows
+
+        new_rows = []
+        for row in unique_rows:
+            if row["url"] in existing:
+                spider.logger.warning(f"Duplicate tour URL: {row['url']}")
+            else:
+                new_rows.append(row)
+        return new_rows
+
+    def _insert_row_by_row(self, rows, spider):
+        saved = []
+        for row in rows:
+            try:
+                self.session.execute(insert(Tour), [row])
+                self._write_children([row])
+                self.session.commit()
+                saved.append(row)
+            except IntegrityError:
+                self.session.rollback()
+                spider.logger.warning(f"Duplicate tour URL: {row['url']}")
+            except Exception as e:
+                self.session.rollback()
+                spider.logger.error(f"Error saving tour {row['url']}: {e}")
+        spider.logger.info(f"Saved {len(saved)} tours")
+        return saved
@@ -0,0 +1,116 @@
+# Đo thời gian từng bước trích xuất trong parse_tour_detail và strategy fallback đã dùng.
+# Kết quả được cộng dồn vào Scrapy stats (extraction/...) và in bảng tổng kết khi đóng spider.
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class ExtractionProfiler:
+    """
+    Stats ghi ra:
+      extraction/time_ms/<bước>          tổng thời gian (ms)
+      extraction/count/<bước>            số trang đã chạy bước này
+      extraction/strategy/<trường>/<n>   số lần strategy n cho ra kết quả (none = không tìm thấy)
+    Mỗi loại một prefix riêng để tên bước và tên trường không đụng nhau.
+    """
+
+    def __init__(self, stats=None, enabled=True):
+        self.stats = stats
+        self.enabled = enabled
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.strategies = defaultdict(lambda: defaultdict(int))
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.times[name] += elapsed_ms
+            self.counts[name] += 1
+            if self.stats is not None:
+                self.stats.inc_value(f'extraction/time_ms/{name}', elapsed_ms)
+                self.stats.inc_value(f'extraction/count/{name}')
+
+    def strategy(self, field, strategy):
+        """Ghi lại strategy fallback đã cho ra kết quả cho trường field"""
+        if not self.enabled:
+            return
+        key = 'none' if strategy is None else strategy
+        self.strategies[field][key] += 1
+        if self.stats is not None:
+            self.stats.inc_value(f'extraction/strategy/{field}/{key}')
+
+    def snapshot(self):
+        """Số liệu đã đo dưới dạng dict thường (picklable), để gửi từ process khác về"""
+        return {
+            'times': dict(self.times),
+            'counts': dict(self.counts),
+            'strategies': {field: dict(counts) for field, counts in self.strategies.items()},
+        }
+
+    def merge(self, snapshot):
+        """Cộng số liệu đo ở process khác (snapshot()) vào profiler và stats"""
+        if not self.enabled or not snapshot:
+            return
+        for name, elapsed_ms in snapshot['times'].items():
+            count = snapshot['counts'].get(name, 0)
+            self.times[name] += elapsed_ms
+            self.counts[name] += count
+            if self.stats is not None:
+                self.stats.inc_value(f'extraction/time_ms/{name}', elapsed_ms)
+                self.stats.inc_value(f'extraction/count/{name}', count)
+        for field, counts in snapshot['strategies'].items():
+            for key, count in counts.items():
+                self.strategies[field][key] += count
+                if self.stats is not None:
+                    self.stats.inc_value(f'extraction/strategy/{field}/{key}', count)
+
+    def summary(self):
+        """
+        Bảng tổng kết: bước tốn thời gian nhất lên đầu. Bước con (cha/con, đã nằm trong thời
+        gian của bước cha) in ngay dưới bước cha, share tính theo bước cha; share của bước
+        cấp cao nhất tính theo tổng các bước cấp cao nhất.
+        """
+        if not self.times:
+            return "Extraction profile: không có trang nào được parse"
+
+        children = defaultdict(list)
+        for name in self.times:
+            parent = name.rpartition('/')[0]
+            # Bước con không có bước cha được đo thì coi như bước cấp cao nhất
+            children[parent if parent in self.times else ''].append(name)
+
+        def by_time(names):
+            return sorted(names, key=lambda name: -self.times[name])
+
+        lines = [
+            "Extraction profile:",
+            f"  {'stage':<24} {'pages':>6} {'total ms':>10} {'avg ms':>8} {'share':>7}",
+        ]
+
+        def add_rows(parent, depth):
+            names = children.get(parent, [])
+            total = self.times[parent] if parent else sum(self.times[name] for name in names)
+            for name in by_time(names):
+                elapsed, count = self.times[name], self.counts[name]
+                label = '  ' * depth + (name.rpartition('/')[2] if depth else name)
+                share = elapsed / total if total else 0.0
+                lines.append(
+                    f"  {label:<24} {count:>6} {elapsed:>10.1f} {elapsed / count:>8.3f} {share:>7.1%}"
+                )
+                add_rows(name, depth + 1)
+
+        add_rows('', 0)
+
+        for field, counts in self.strategies.items():
+            parts = ', '.join(f"{key}: {count}" for key, count in sorted(counts.items(), key=lambda kv: str(kv[0])))
+            lines.append(f"  strategy {field}: {parts}")
+        return '\n'.join(lines)
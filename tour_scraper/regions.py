@@ -0,0 +1,198 @@
+# Phạm vi các miền trên dulichviet.com.vn: trang danh sách, URL cấm và từ khóa nhận diện
+
+import re
+from functools import lru_cache
+
+from .trie import trie_pattern
+
+REGIONS = {
+    "mienbac": {
+        "mien": "Miền Bắc",
+        "start_url": "https://dulichviet.com.vn/du-lich-mien-bac",
+        # Cấm nhảy sang miền khác
+        "forbidden": [
+            '/du-lich-mien-trung', '/du-lich-mien-nam',
+            # Miền Trung
+            '/du-lich-da-nang', '/du-lich-hoi-an', '/du-lich-hue',
+            '/du-lich-nha-trang', '/du-lich-da-lat', '/du-lich-quy-nhon',
+            '/du-lich-phan-thiet', '/du-lich-mui-ne', '/du-lich-quang-binh',
+            '/du-lich-phong-nha',
+            # Miền Nam
+            '/du-lich-phu-quoc', '/du-lich-can-tho', '/du-lich-con-dao',
+            '/du-lich-vung-tau', '/du-lich-tay-ninh', '/du-lich-ben-tre',
+            '/du-lich-sai-gon', '/du-lich-ho-chi-minh', '/du-lich-mien-tay',
+        ],
+        # Các từ khóa chắc chắn là Miền Bắc
+        "good_keywords": [
+            # Vùng Đồng bằng sông Hồng
+            'ha-noi', 'bac-ninh', 'hung-yen', 'hai-duong', 'hai-phong',
+            'nam-dinh', 'thai-binh', 'ninh-binh', 'ha-nam', 'vinh-phuc',
+
+            # Vùng Đông Bắc
+            'ha-long', 'quang-ninh', 'cat-ba', 'bai-chay', 'tuan-chau',
+            'dong-bac', 'lang-son', 'cao-bang', 'ban-gioc', 'bac-kan',
+            'thai-nguyen', 'tuyen-quang', 'ha-giang', 'bac-giang',
+
+            # Vùng Tây Bắc
+            'sapa', 'lao-cai', 'tay-bac', 'lai-chau', 'dien-bien',
+            'son-la', 'hoa-binh', 'yen-bai', 'phu-tho',
+            'mai-chau', 'moc-chau', 'mu-cang-chai', 'ta-xua',
+
+            # Các điểm du lịch nổi tiếng Miền Bắc
+            'tam-coc', 'trang-an', 'bai-dinh', 'phat-diem', 'cuc-phuong',
+            'thung-nham', 'van-long', 'yen-tu', 'ba-be', 'thac-ban-gioc',
+            'dong-van', 'lung-cu', 'quan-ba', 'ma-pi-leng', 'du-gia',
+            'fansipan', 'y-ty', 'hoang-su-phi', 'pu-luong', 'thanh-hoa',
+
+            # Từ khóa tổng quát
+            'mien-bac', 'du-lich-mien-bac',
+        ],
+    },
+    "mientrung": {
+        "mien": "Miền Trung",
+        "start_url": "https://dulichviet.com.vn/du-lich-mien-trung",
+        "forbidden": [
+            '/du-lich-mien-bac', '/du-lich-mien-nam',
+            '/du-lich-ha-noi', '/du-lich-ha-long', '/du-lich-sapa',
+            '/du-lich-ninh-binh', '/du-lich-ha-giang', '/du-lich-mai-chau',
+            '/du-lich-phu-quoc', '/du-lich-can-tho', '/du-lich-con-dao',
+            '/du-lich-tay-ninh', '/du-lich-vung-tau', '/du-lich-ben-tre',
+            '/du-lich-sai-gon', '/du-lich-ho-chi-minh',
+        ],
+        "good_keywords": [
+            # Miền Trung Bắc (Bắc Trung Bộ)
+            'hue', 'quang-binh', 'quang-tri', 'quang-nam', 'quang-ngai',
+            'phong-nha', 'ke-bang', 'dong-hoi', 'lang-co', 'bach-ma',
+
+            # Miền Trung Duyên hải (Nam Trung Bộ)
+            'da-nang', 'hoi-an', 'binh-dinh', 'phu-yen', 'quy-nhon',
+            'khanh-hoa', 'nha-trang', 'ninh-thuan', 'binh-thuan',
+            'cam-ranh', 'vinh-hy', 'ninh-chu', 'dao-binh-ba', 'dao-binh-hung',
+
+            # Tây Nguyên
+            'tay-nguyen', 'da-lat', 'lam-dong', 'gia-lai', 'kon-tum',
+            'dak-lak', 'dak-nong', 'buon-ma-thuot', 'pleiku',
+
+            # Các địa danh nổi tiếng Miền Trung
+            'ba-na', 'son-tra', 'cham', 'my-son', 'cua-dai',
+            'an-bang', 'tra-que', 'thanh-ha', 'cu-lao-cham',
+            'eo-gio', 'ghenh-rang', 'ki-co', 'bai-xep',
+            'vung-ro', 'ganh-da-dia', 'mui-dien', 'hang-son-doong',
+
+            # Biển Miền Trung
+            'phan-thiet', 'mui-ne', 'hon-rom', 'phan-rang',
+
+            # Từ khóa tổng quát
+            'mien-trung', 'du-lich-mien-trung',
+        ],
+    },
+    "miennam": {
+        "mien": "Miền Nam",
+        "start_url": "https://dulichviet.com.vn/du-lich-mien-nam",
+        "forbidden": [
+            '/du-lich-mien-bac', '/du-lich-mien-trung',
+            '/du-lich-ha-noi', '/du-lich-ha-long', '/du-lich-sapa',
+            '/du-lich-da-nang', '/du-lich-hoi-an', '/du-lich-hue',
+            '/du-lich-ninh-binh', '/du-lich-ha-giang', '/du-lich-nha-trang',
+            '/du-lich-da-lat', '/du-lich-quy-nhon', '/du-lich-phan-thiet',
+            '/du-lich-quang-binh', '/du-lich-phong-nha',
+        ],
+        "good_keywords": [
+            # Thành phố lớn
+            'sai-gon', 'ho-chi-minh', 'vung-tau',
+
+            # Đảo & biển Miền Nam
+            'phu-quoc', 'con-dao', 'nam-du', 'dao-ba-lua', 'phu-quy',
+
+            # Đồng bằng sông Cửu Long
+            'can-tho', 'mien-tay', 'ben-tre', 'tien-giang', 'vinh-long',
+            'tra-vinh', 'soc-trang', 'bac-lieu', 'ca-mau', 'an-giang',
+            'dong-thap', 'kien-giang', 'hau-giang', 'long-an',
+
+            # Các điểm du lịch nổi tiếng Miền Nam
+            'chau-doc', 'ha-tien', 'rach-gia', 'cu-chi', 'tay-ninh',
+            'nam-cat-tien', 'binh-duong', 'dong-nai',
+
+            # Tổng quát
+            'mien-nam', 'du-lich-mien-nam',
+        ],
+    },
+}
+
+
+# URL trong cây trang danh sách của một miền (hoặc trang con) được coi là trong phạm vi
+LISTING_MARKER = '/du-lich-'
+
+
+def _scope_patterns():
+    """pattern → [(miền, loại)], loại: forbidden / keyword / listing"""
+    patterns = {}
+    for region, scope in REGIONS.items():
+        for bad in scope["forbidden"]:
+            patterns.setdefault(bad, []).append((region, "forbidden"))
+        for kw in scope["good_keywords"]:
+            patterns.setdefault(kw, []).append((region, "keyword"))
+        for marker in (scope["start_url"][len("https://"):], LISTING_MARKER):
+            patterns.setdefault(marker, []).append((region, "listing"))
+    return patterns
+
+
+SCOPE_PATTERNS = _scope_patterns()
+
+# Ở mỗi vị trí regex chỉ trả về pattern dài nhất; các pattern ngắn hơn match cùng
+# vị trí đều là tiền tố của nó → gộp sẵn (miền, loại) của mọi tiền tố
+SCOPE_HITS = {
+    pattern: [hit for prefix in SCOPE_PATTERNS if pattern.startswith(prefix) for hit in SCOPE_PATTERNS[prefix]]
+    for pattern in SCOPE_PATTERNS
+}
+
+# Lookahead rỗng: finditer thử mọi vị trí nên thấy cả các pattern chồng lên nhau
+RE_SCOPE = re.compile(f"(?=({trie_pattern(SCOPE_PATTERNS)}))")
+
+
+@lru_cache(maxsize=8192)
+def _scope(url_lower):
+    """
+    Quét URL một lượt: {miền nhận URL: vị trí từ khóa đầu tiên của miền, hoặc None}.
+    Miền nhận URL nếu không gặp URL cấm nào và có từ khóa hoặc URL dạng trang danh sách.
+    """
+    forbidden = set()
+    listing = set()
+    first_keyword = {}
+    for match in RE_SCOPE.finditer(url_lower):
+        for region, kind in SCOPE_HITS[match.group(1)]:
+            if kind == "forbidden":
+                forbidden.add(region)
+            elif kind == "keyword":
+                first_keyword.setdefault(region, match.start())
+            else:
+                listing.add(region)
+
+    return {
+        region: first_keyword.get(region)
+        for region in REGIONS
+        if region not in forbidden and (region in first_keyword or region in listing)
+    }
+
+
+def is_in_scope(region, url):
+    """Chỉ cho phép các URL thuộc phạm vi của miền region"""
+    return region in _scope(url.lower())
+
+
+def classify_region(url, regions, fallback=None):
+    """
+    Chọn một miền trong regions cho URL tour.
+    Ưu tiên miền có từ khóa xuất hiện sớm nhất trong URL, nếu không có
+    từ khóa nào thì dùng fallback (miền của trang danh sách chứa link).
+    Trả về None nếu không miền nào nhận URL.
+    """
+    scope = _scope(url.lower())
+    accepted = [region for region in regions if region in scope]
+
+    with_keyword = [region for region in accepted if scope[region] is not None]
+    if with_keyword:
+        return min(with_keyword, key=scope.__getitem__)
+    if fallback in accepted:
+        return fallback
+    return accepted[0] if accepted else None
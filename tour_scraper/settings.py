@@ -9,18 +9,109 @@ USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 
 # Configure maximum concurrent requests
 CONCURRENT_REQUESTS = 16
-DOWNLOAD_DELAY = 2
+CONCURRENT_REQUESTS_PER_DOMAIN = 16
+
+# Tốc độ crawl do AdaptiveThrottleMiddleware điều chỉnh theo phản hồi của server
+# (thay cho DOWNLOAD_DELAY cố định): bắt đầu chậm, tăng dần khi server trả lời nhanh,
+# giảm một nửa khi gặp 429/503, lỗi mạng hoặc latency trung bình vượt TARGET_LATENCY (giây)
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_START_DELAY = 1.0
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.0
+ADAPTIVE_THROTTLE_MAX_DELAY = 60.0
+ADAPTIVE_THROTTLE_START_CONCURRENCY = 2
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 16
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 1.0
+ADAPTIVE_THROTTLE_BACKOFF = 0.5
 
 # Enable pipelines
 ITEM_PIPELINES = {
     "tour_scraper.pipelines.TourScraperPipeline": 300,
 }
 
+# Bỏ trang danh sách / phân trang ngoài phạm vi các miền đang crawl trước khi vào scheduler
+SPIDER_MIDDLEWARES = {
+    "tour_scraper.middlewares.RegionScopeMiddleware": 600,
+}
+
+DOWNLOADER_MIDDLEWARES = {
+    "tour_scraper.middlewares.TourScraperDownloaderMiddleware": 543,
+    # Sau RetryMiddleware (550) để thấy 429/503 trước khi chúng được retry
+    "tour_scraper.middlewares.AdaptiveThrottleMiddleware": 560,
+    # Sát downloader: lưu / phát lại response thô (xem HTTP_ARCHIVE_MODE)
+    "tour_scraper.middlewares.HttpArchiveMiddleware": 950,
+}
+
+# Conditional re-crawl trang tour: gửi If-None-Match / If-Modified-Since theo lần crawl trước,
+# bỏ qua parse + pipeline khi server trả 304 hoặc nội dung không đổi.
+# CONDITIONAL_RECRAWL = False để crawl lại toàn bộ.
+CONDITIONAL_RECRAWL = True
+CONDITIONAL_STORE = "fingerprints.db"
+
+# Ghi / phát lại response HTTP để chạy lại spider offline (profiling, kiểm tra hồi quy):
+#   scrapy crawl dulichviet -s HTTP_ARCHIVE_MODE=record     # crawl thật, lưu mọi response
+#   scrapy crawl dulichviet -s HTTP_ARCHIVE_MODE=replay     # không ra mạng, hết tốc độ CPU
+# Khi record nên đặt CONDITIONAL_RECRAWL=False để archive có đủ trang (không bị 304).
+# HTTP_ARCHIVE_CODEC: zstd (nếu có) / zlib / raw, mặc định zstd nếu có thư viện
+HTTP_ARCHIVE_MODE = None
+HTTP_ARCHIVE_PATH = "http_archive.db"
+HTTP_ARCHIVE_CODEC = None
+
+# Phân trang danh sách: đọc số trang từ trang đầu và request mọi trang cùng lúc thay vì
+# đi lần lượt theo rel="next"; quá PAGINATION_MAX_PAGES trang thì vẫn đi lần lượt
+PAGINATION_FANOUT = True
+PAGINATION_MAX_PAGES = 500
+
+# Incremental crawl: vẫn tải trang danh sách, nhưng chỉ tải trang chi tiết của tour
+# chưa có trong DB hoặc có last_seen_at cũ hơn INCREMENTAL_TTL giây (0 = chỉ tour mới)
+INCREMENTAL_CRAWL = False
+INCREMENTAL_TTL = 7 * 24 * 3600
+
+# Database: engine / bảng chỉ được tạo khi pipeline mở (open_spider), không phải lúc import.
+# DB_POOL_SIZE = 0 → mặc định của SQLAlchemy; DB_ECHO = True log từng câu SQL (chỉ để debug)
+DATABASE_URL = "sqlite:///tours.db"
+DB_POOL_SIZE = 0
+DB_ECHO = False
+# PRAGMA cho mỗi kết nối SQLite (xem models.SQLITE_PRAGMAS): WAL để export đọc song song
+# khi crawl đang ghi. {} → cấu hình mặc định của SQLite (rollback journal, synchronous=FULL)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+
+# Ghi DB theo lô: flush khi đủ DB_BATCH_SIZE item hoặc sau DB_FLUSH_INTERVAL giây
+# (DB_BATCH_SIZE = 1 để commit từng item như trước). Lô upsert lớn được chia thành
+# nhiều câu lệnh trong cùng transaction: mỗi tour 17 tham số, SQLite cho tối đa
+# 32766 tham số / câu (~1900 tour), PostgreSQL 65535 (xem models.MAX_BIND_PARAMS)
+DB_BATCH_SIZE = 100
+DB_FLUSH_INTERVAL = 5
+# Re-crawl cập nhật tour đã có (INSERT ... ON CONFLICT DO UPDATE) thay vì bỏ qua
+DB_UPSERT = True
+# Ghi DB trên thread riêng để reactor không bị block bởi SQLAlchemy;
+# hàng đợi đầy thì Scrapy tạm dừng xử lý item (backpressure)
+DB_WRITER_THREAD = True
+DB_WRITER_QUEUE_SIZE = 1000
+# Ghi thêm lich_trinh / các trường list vào bảng con tour_days, tour_activities,
+# tour_services (có index) để query theo ngày / dịch vụ không phải decode JSON
+DB_CHILD_TABLES = True
+# Schema DB lệch với models (VD tours.db cũ) thì pipeline dừng crawl khi mở spider;
+# True → tự chạy migration (python -m tour_scraper.migrations) thay vì dừng
+DB_AUTO_MIGRATE = False
+
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
 
+# Đo thời gian từng bước trích xuất trong parse_tour_detail (stats extraction/...)
+EXTRACTION_PROFILING = True
+
+# Trích xuất trang chi tiết tour trên nhiều process (ProcessPoolExecutor) thay vì
+# trên reactor thread; PARSE_POOL_WORKERS = 0 → số CPU
+PARSE_POOL_ENABLED = False
+PARSE_POOL_WORKERS = 0
+
 # Log settings
 LOG_LEVEL = 'INFO'
 
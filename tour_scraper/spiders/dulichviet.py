@@ -0,0 +1,344 @@
+import re
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import scrapy
+from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+
+from .. import extraction
+from ..items import TourItem
+from ..parse_pool import ParsePool
+from ..profiling import ExtractionProfiler
+from ..regions import REGIONS, classify_region
+
+# Số trang trong URL phân trang: ?page=3, &p=3, ?trang=3, /page/3, /trang-3
+RE_PAGE_NUMBER = re.compile(r'(?:[?&](?:page|p|trang)=|/(?:page|trang)[/-])(\d+)')
+
+
+class DuLichVietSpider(scrapy.Spider):
+    """
+    Crawl tour của một hoặc nhiều miền trong cùng một lần chạy.
+    Các trang danh sách dùng chung chỉ tải một lần, mỗi tour chỉ request
+    một lần và được gán vào đúng một miền.
+
+    VD: scrapy crawl dulichviet -a regions=mienbac,mientrung
+
+    Với INCREMENTAL_CRAWL = True, trang danh sách vẫn được tải nhưng trang
+    chi tiết chỉ được request khi URL chưa có trong DB, hoặc bản ghi đã cũ
+    hơn INCREMENTAL_TTL giây (tính theo last_seen_at).
+    VD: scrapy crawl dulichviet -s INCREMENTAL_CRAWL=1
+
+    Với PARSE_POOL_ENABLED = True, phần trích xuất của trang chi tiết chạy
+    trên PARSE_POOL_WORKERS process (ParsePool) thay vì trên reactor thread.
+
+    Với PAGINATION_FANOUT = True, trang đầu của mỗi danh sách đọc số trang từ các
+    link số trang (ul.pagination) rồi request luôn mọi trang còn lại, thay vì đi
+    lần lượt theo rel="next" (mỗi trang chờ một round trip). Nếu không xác định
+    được số trang thì vẫn đi lần lượt.
+
+    base_url thay scheme + host của các trang danh sách đầu tiên, để crawl một
+    site giả lập chạy cục bộ (benchmarks.fake_site) thay vì dulichviet.com.vn.
+    VD: scrapy crawl dulichviet -a base_url=http://127.0.0.1:8000
+    """
+    name = "dulichviet"
+    allowed_domains = ["dulichviet.com.vn"]
+
+    # Mặc định crawl cả 3 miền
+    regions = list(REGIONS)
+
+    # Delay / concurrency do AdaptiveThrottleMiddleware điều chỉnh (xem settings.py)
+    custom_settings = {
+        'DEPTH_LIMIT': 10,  # Đủ sâu để crawl hết các trang con + phân trang
+        'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'ROBOTSTXT_OBEY': False,
+    }
+
+    def __init__(self, regions=None, base_url=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base_url = base_url.rstrip('/') if base_url else None
+        if self.base_url:
+            self.allowed_domains = [urlsplit(self.base_url).hostname]
+        if regions:
+            if isinstance(regions, str):
+                regions = [r.strip() for r in regions.split(',') if r.strip()]
+            unknown = [r for r in regions if r not in REGIONS]
+            if unknown:
+                raise ValueError(f"Unknown regions: {', '.join(unknown)} (expected: {', '.join(REGIONS)})")
+            self.regions = list(regions)
+
+        # URL tour đã lên lịch, dùng chung cho mọi miền
+        self.seen_tours = set()
+
+        # Chỉ bật khi chạy qua crawler (xem from_crawler)
+        self.profiler = ExtractionProfiler(enabled=False)
+
+        # Incremental crawl: url -> last_seen_at của tour đã có trong DB (nạp ở spider_opened)
+        self.incremental = False
+        self.incremental_ttl = 0
+        self.tour_index = {}
+        self.refresh_before = None
+
+        # Pool process cho parse_tour_detail (tạo ở from_crawler nếu PARSE_POOL_ENABLED)
+        self.parse_pool = None
+
+        # Phân trang: request mọi trang danh sách từ trang đầu (xem page_urls)
+        self.pagination_fanout = True
+        self.pagination_max_pages = 500
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # crawler.stats chỉ có từ khi crawl bắt đầu → gắn vào profiler / pool ở spider_opened
+        spider.profiler = ExtractionProfiler(
+            enabled=crawler.settings.getbool('EXTRACTION_PROFILING', True),
+        )
+        spider.incremental = crawler.settings.getbool('INCREMENTAL_CRAWL', False)
+        spider.incremental_ttl = crawler.settings.getfloat('INCREMENTAL_TTL', 0)
+        spider.pagination_fanout = crawler.settings.getbool('PAGINATION_FANOUT', True)
+        spider.pagination_max_pages = crawler.settings.getint('PAGINATION_MAX_PAGES', 500)
+        if crawler.settings.getbool('PARSE_POOL_ENABLED', False):
+            spider.parse_pool = ParsePool(
+                workers=crawler.settings.getint('PARSE_POOL_WORKERS', 0),
+                profiling=spider.profiler.enabled,
+            )
+        crawler.signals.connect(spider.spider_opened, signal=signals.spider_opened)
+        return spider
+
+    def spider_opened(self, spider):
+        self.profiler.stats = self.crawler.stats
+        if self.parse_pool is not None:
+            self.parse_pool.stats = self.crawler.stats
+            # Khởi động worker ngay, không để trang tour đầu tiên chờ spawn process
+            self.parse_pool.start()
+
+        if not self.incremental:
+            return
+
+        # SQLAlchemy chỉ được import khi cần (scrapy list / crawl không incremental không tốn thời gian import)
+        from ..models import engine_from_settings, load_tour_index, session_factory
+
+        # Nạp toàn bộ URL một lần, parse() chỉ tra dict thay vì query DB cho từng link
+        session = session_factory(engine_from_settings(self.crawler.settings))()
+        try:
+            self.tour_index = load_tour_index(session)
+        finally:
+            session.close()
+
+        if self.incremental_ttl > 0:
+            self.refresh_before = datetime.now() - timedelta(seconds=self.incremental_ttl)
+        self.logger.info(
+            f"Incremental crawl: {len(self.tour_index)} tour đã có trong DB, "
+            f"TTL={self.incremental_ttl or 'không giới hạn'}s"
+        )
+
+    def needs_detail(self, tour_url):
+        """Incremental crawl: chỉ tải trang chi tiết của tour mới hoặc đã quá TTL"""
+        if not self.incremental:
+            return True
+
+        if tour_url not in self.tour_index:
+            self.crawler.stats.inc_value('incremental/new')
+            return True
+        last_seen = self.tour_index[tour_url]
+        if self.refresh_before is not None and (last_seen is None or last_seen < self.refresh_before):
+            self.crawler.stats.inc_value('incremental/expired')
+            return True
+        self.crawler.stats.inc_value('incremental/skipped')
+        return False
+
+    def closed(self, reason):
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.profiler.enabled:
+            self.logger.info(self.profiler.summary())
+
+    async def start(self):
+        # Scrapy >= 2.13 chỉ gọi start(); start_requests giữ cho Scrapy cũ hơn
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        for region in self.regions:
+            yield scrapy.Request(self.start_url(region), callback=self.parse, meta={'region': region})
+
+    def start_url(self, region):
+        url = REGIONS[region]['start_url']
+        if self.base_url:
+            url = self.base_url + urlsplit(url).path
+        return url
+
+    def parse(self, response):
+        self.logger.info(f"Đang crawl: {response.url}")
+        listing_region = response.meta.get('region')
+
+        # Lấy tất cả các tour boxes
+        tour_boxes = response.xpath('//div[contains(@class, "mda-box-item")]')
+
+        self.logger.info(f"Tìm thấy {len(tour_boxes)} tour boxes trên trang này")
+
+        for box in tour_boxes:
+            # Lấy link tour
+            tour_link = box.xpath('.//a/@href').get()
+
+            if not tour_link:
+                continue
+
+            tour_url = response.urljoin(tour_link)
+
+            # Tour đã gặp ở trang danh sách khác (cùng miền hoặc miền khác)
+            if tour_url in self.seen_tours:
+                continue
+
+            # Xếp tour vào một miền, bỏ qua nếu không thuộc miền nào đang crawl
+            region = classify_region(tour_url, self.regions, fallback=listing_region)
+            if region is None:
+                continue
+            self.seen_tours.add(tour_url)
+
+            if not self.needs_detail(tour_url):
+                continue
+
+            # Lấy hình ảnh từ tour box
+            # Ưu tiên data-src trước, nếu không có thì lấy src
+            hinh_anh = box.xpath('.//img/@data-src').get()
+            if not hinh_anh:
+                hinh_anh = box.xpath('.//img/@src').get()
+
+            # Xử lý URL hình ảnh
+            if hinh_anh:
+                # Bỏ qua hình placeholder
+                if 'data:image' in hinh_anh or 'nophoto.jpg' in hinh_anh:
+                    hinh_anh = None
+                else:
+                    # Nếu URL bắt đầu bằng //, thêm https:
+                    if hinh_anh.startswith('//'):
+                        hinh_anh = 'https:' + hinh_anh
+                    # Nếu URL relative, convert thành absolute
+                    elif not hinh_anh.startswith('http'):
+                        hinh_anh = response.urljoin(hinh_anh)
+
+            self.logger.info(f"Tour ({REGIONS[region]['mien']}): {tour_url}")
+            self.logger.info(f"Hình ảnh: {hinh_anh}")
+
+            # Gửi request với metadata chứa hình ảnh và miền
+            yield scrapy.Request(
+                tour_url,
+                callback=self.parse_tour_detail_pooled if self.parse_pool else self.parse_tour_detail,
+                meta={'hinh_anh_chinh': hinh_anh, 'region': region, 'conditional': True}
+            )
+
+        # Phân trang: trang đã được request từ trang đầu thì không đi tiếp
+        if response.meta.get('pagination') == 'fanout':
+            return
+
+        page_urls = self.page_urls(response) if self.pagination_fanout else None
+        if page_urls is not None:
+            self.logger.info(f"Phân trang: request {len(page_urls)} trang còn lại của {response.url}")
+            for url in page_urls:
+                # priority cao hơn trang tour → mọi trang danh sách được tải ngay
+                yield scrapy.Request(
+                    url, callback=self.parse, priority=1,
+                    meta={'region': listing_region, 'pagination': 'fanout'},
+                )
+            return
+
+        next_page = response.xpath('//a[@rel="next"]/@href | //a[contains(text(),"Sau")]/@href').get()
+        if next_page:
+            yield scrapy.Request(response.urljoin(next_page), callback=self.parse, meta={'region': listing_region})
+
+    def page_urls(self, response):
+        """
+        URL các trang 2..N của danh sách, N là số trang lớn nhất trong các link phân trang.
+        Trang không có link riêng (VD 1 2 3 … 20) được dựng theo mẫu URL của link số trang.
+        Trả về None nếu không xác định được (→ đi lần lượt theo rel="next").
+        """
+        pages = {}
+        template = None
+        for link in response.xpath('//ul[contains(@class, "pagination")]//a[@href]'):
+            url = response.urljoin(link.xpath('@href').get())
+            match = RE_PAGE_NUMBER.search(url)
+            text = link.xpath('normalize-space()').get()
+            if text.isdigit():
+                number = int(text)
+            elif match:
+                # Link "Sau" / "Cuối": số trang lấy từ URL
+                number = int(match.group(1))
+            else:
+                continue
+            pages.setdefault(number, url)
+            if match and int(match.group(1)) == number:
+                template = (url[:match.start(1)], url[match.end(1):])
+
+        total = max(pages, default=1)
+        if total <= 1 or total > self.pagination_max_pages:
+            return None
+
+        urls = []
+        for number in range(2, total + 1):
+            if number in pages:
+                urls.append(pages[number])
+            elif template is not None:
+                urls.append(f"{template[0]}{number}{template[1]}")
+            else:
+                return None
+        return urls
+
+    def parse_tour_detail(self, response):
+        mien = self._tour_mien(response)
+        if mien is None:
+            return
+
+        fields = extraction.extract_tour(response, self.logger, self.profiler)
+        yield self._build_item(response, mien, fields)
+
+    async def parse_tour_detail_pooled(self, response):
+        """Như parse_tour_detail nhưng phần trích xuất chạy trong ParsePool (PARSE_POOL_ENABLED)"""
+        mien = self._tour_mien(response)
+        if mien is None:
+            return
+
+        fields, snapshot = await maybe_deferred_to_future(self.parse_pool.submit(response))
+        self.profiler.merge(snapshot)
+        yield self._build_item(response, mien, fields)
+
+    def _tour_mien(self, response):
+        # Bảo vệ cuối cùng: nếu URL (sau redirect) không còn thuộc miền nào đang crawl → bỏ qua
+        region = classify_region(response.url, self.regions, fallback=response.meta.get('region'))
+        if region is None:
+            self.logger.warning(f"Bỏ qua tour ngoài phạm vi {', '.join(self.regions)}: {response.url}")
+            return None
+        mien = REGIONS[region]['mien']
+        self.logger.info(f"Đang parse tour {mien.upper()}: {response.url}")
+        return mien
+
+    def _build_item(self, response, mien, fields):
+        item = TourItem()
+        item['url'] = response.url
+        item['mien'] = mien
+
+        # Lấy hình ảnh từ metadata (đã lấy từ trang danh sách)
+        item['hinh_anh_chinh'] = response.meta.get('hinh_anh_chinh')
+        self.logger.info(f"Hình ảnh chính: {item['hinh_anh_chinh']}")
+
+        for name, value in fields.items():
+            item[name] = value
+
+        self.logger.info(f"Tên tour: {item['title']}")
+        self.logger.info(f"Tour name: {item['tour_name']}")
+        self.logger.info(f"Mã tour: {item['ma_tour']}")
+        self.logger.info(f"Thời gian: {item['thoi_gian']}")
+        self.logger.info(f"Khởi hành: {item['khoi_hanh']}")
+        self.logger.info(f"Vận chuyển: {item['van_chuyen']}")
+        self.logger.info(f"Xuất phát: {item['xuat_phat']}")
+        self.logger.info(f"Giá từ: {item['gia_tu']}")
+        self.logger.info(f"Trải nghiệm: {len(item['trai_nghiem'] or [])} items found")
+        self.logger.info(f"========== LỊCH TRÌNH: {len(item['lich_trinh'] or [])} days ==========")
+        self.logger.info(f"Dịch vụ bao gồm: {len(item['dich_vu_bao_gom'] or [])} items")
+        self.logger.info(f"Dịch vụ không bao gồm: {len(item['dich_vu_khong_bao_gom'] or [])} items")
+        self.logger.info(f"Ghi chú: {len(item['ghi_chu'] or [])} items")
+        return item
+
+    def clean_text(self, text):
+        """Clean text - remove HTML entities, extra spaces"""
+        return extraction.clean_text(text)
@@ -1,54 +1,10 @@
 import scrapy
 import re
 from ..items import TourItem
+from ..extraction import extract_tour_name
+from ..regions import REGIONS, classify_region
 from urllib.parse import urljoin
 
-def extract_tour_name(url, title=None):
-    """Trích xuất tên tour ngắn gọn từ URL hoặc title"""
-    
-    MIEN_BAC = {
-        'mien-bac':'Miền Bắc', 'ha-noi': 'Hà Nội', 'ha-long': 'Hạ Long', 'sapa': 'Sapa',
-        'ninh-binh': 'Ninh Bình', 'ha-giang': 'Hà Giang', 'mai-chau': 'Mai Châu',
-        'moc-chau': 'Mộc Châu', 'cao-bang': 'Cao Bằng', 'cat-ba': 'Cát Bà',
-        'tam-coc': 'Tam Cốc', 'trang-an': 'Tràng An', 'dong-bac': 'Đông Bắc',
-        'tay-bac': 'Tây Bắc', 'lai-chau': 'Lai Châu', 'dien-bien': 'Điện Biên',
-    }
-    
-    MIEN_TRUNG = {
-        'mien-trung': 'Miền Trung', 'da-nang': 'Đà Nẵng', 'hoi-an': 'Hội An', 'hue': 'Huế',
-        'quang-binh': 'Quảng Bình', 'phong-nha': 'Phong Nha', 'nha-trang': 'Nha Trang',
-        'da-lat': 'Đà Lạt', 'phan-thiet': 'Phan Thiết', 'mui-ne': 'Mũi Né',
-        'quy-nhon': 'Quy Nhơn', 'phu-yen': 'Phú Yên', 'kon-tum': 'Kon Tum',
-    }
-    
-    MIEN_NAM = {
-        'mien-nam': 'Miền Nam', 'sai-gon': 'Sài Gòn', 'ho-chi-minh': 'Hồ Chí Minh', 'phu-quoc': 'Phú Quốc',
-        'can-tho': 'Cần Thơ', 'con-dao': 'Côn Đảo', 'vung-tau': 'Vũng Tàu',
-        'ben-tre': 'Bến Tre', 'chau-doc': 'Châu Đốc', 'phu-quy': 'Phú Quý',
-        'mien-tay': 'Miền Tây', 'ca-mau': 'Cà Mau', 'an-giang': 'An Giang',
-    }
-    
-    ALL_LOCATIONS = {**MIEN_BAC, **MIEN_TRUNG, **MIEN_NAM}
-    url_lower = url.lower()
-    
-    # Tìm trong URL
-    found = []
-    for key, name in ALL_LOCATIONS.items():
-        if key in url_lower:
-            found.append((name, url_lower.index(key)))
-    
-    if found:
-        found.sort(key=lambda x: x[1])
-        return found[0][0]
-    
-    # Fallback: extract từ URL pattern
-    match = re.search(r'/(?:tour|du-lich)-([a-z-]+)', url_lower)
-    if match:
-        slug = match.group(1)
-        if slug in ALL_LOCATIONS:
-            return ALL_LOCATIONS[slug]
-    
-    return "Tour Việt Nam"
 
 class DuLichVietSpider(scrapy.Spider):
     """
@@ -65,9 +21,8 @@ class DuLichVietSpider(scrapy.Spider):
         "https://dulichviet.com.vn/du-lich-trong-nuoc/tour-mien-tay-tet-nguyen-dan-2n1d-cai-be-dong-thap-cho-que-tan-thuan-dong"
     ]
 
+    # Delay / concurrency do AdaptiveThrottleMiddleware điều chỉnh (xem settings.py)
     custom_settings = {
-        'DOWNLOAD_DELAY': 2,
-        'CONCURRENT_REQUESTS': 8,
         'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
     }
 
@@ -83,6 +38,10 @@ class DuLichVietSpider(scrapy.Spider):
         
         item = TourItem()
         item['url'] = response.url
+
+        # Miền (cột bắt buộc của bảng tours), xếp theo URL như spider dulichviet
+        region = classify_region(response.url, list(REGIONS))
+        item['mien'] = REGIONS[region]['mien'] if region else None
         
         # Lấy hình ảnh từ metadata (đã lấy từ trang danh sách)
         item['hinh_anh_chinh'] = response.meta.get('hinh_anh_chinh')
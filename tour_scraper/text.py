@@ -0,0 +1,19 @@
+# Chuẩn hóa văn bản tiếng Việt để so khớp: chữ thường, bỏ dấu. Dùng chung cho
+# extraction (tìm tiêu đề mục, tên tour) và cột tìm kiếm của bảng con (models).
+
+# Bỏ dấu tiếng Việt (chữ thường) bằng một lần str.translate thay vì 7 lần re.sub
+_ACCENT_GROUPS = {
+    'a': 'áàảãạăắằẳẵặâấầẩẫậ',
+    'e': 'éèẻẽẹêếềểễệ',
+    'i': 'íìỉĩị',
+    'o': 'óòỏõọôốồổỗộơớờởỡợ',
+    'u': 'úùủũụưứừửữự',
+    'y': 'ýỳỷỹỵ',
+    'd': 'đ',
+}
+ACCENT_TABLE = str.maketrans({ch: base for base, chars in _ACCENT_GROUPS.items() for ch in chars})
+
+
+def normalize(text):
+    """Chữ thường, bỏ dấu để so khớp tiêu đề"""
+    return text.lower().translate(ACCENT_TABLE)
@@ -0,0 +1,109 @@
+# Bộ điều khiển tốc độ crawl kiểu AIMD (additive increase / multiplicative decrease)
+# cho từng download slot (domain): tăng dần khi server trả lời nhanh, giảm mạnh
+# khi server quá tải (429/503, timeout, latency vượt ngưỡng hoặc có Retry-After).
+
+import time
+from email.utils import parsedate_to_datetime
+
+# Mã trạng thái báo server đang quá tải
+CONGESTION_STATUSES = {429, 503}
+
+
+def parse_retry_after(value, now=None):
+    """Giá trị header Retry-After (số giây hoặc HTTP-date) → số giây chờ, None nếu không đọc được"""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class AimdController:
+    """
+    Trạng thái điều khiển của một slot: delay giữa hai request và số request đồng thời.
+
+    - Response tốt (latency trung bình <= target_latency): tốc độ (1 / delay) tăng
+      rate_step request/giây, sau mỗi "vòng" (concurrency response tốt liên tiếp)
+      concurrency tăng 1.
+    - Quá tải (429/503, lỗi mạng, latency trung bình > target_latency): concurrency
+      nhân backoff, delay nhân đôi (ít nhất backoff_delay). Mỗi vòng chỉ giảm một lần,
+      để một loạt response chậm của cùng đợt request không làm tốc độ rơi về đáy.
+    - Retry-After: delay ít nhất bằng giá trị server yêu cầu (luôn áp dụng).
+    """
+
+    def __init__(self, start_delay=1.0, min_delay=0.0, max_delay=60.0,
+                 start_concurrency=2, min_concurrency=1, max_concurrency=16,
+                 target_latency=1.0, rate_step=0.1, backoff=0.5, backoff_delay=0.25,
+                 smoothing=0.3):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.target_latency = target_latency
+        self.rate_step = rate_step
+        self.backoff = backoff
+        self.backoff_delay = backoff_delay
+        self.smoothing = smoothing
+
+        self.delay = min(max(start_delay, min_delay), max_delay)
+        self.concurrency = min(max(start_concurrency, self.min_concurrency), self.max_concurrency)
+        self.latency = None  # latency trung bình (EWMA, giây)
+        self.good_streak = 0
+        self.cooldown = 0  # số response còn phải chờ trước khi được giảm tiếp
+
+        self.increases = 0
+        self.decreases = 0
+
+    def on_response(self, status, latency=None, retry_after=None):
+        if latency is not None:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.smoothing * (latency - self.latency)
+
+        if retry_after is not None:
+            self.delay = min(self.max_delay, max(self.delay, retry_after))
+
+        slow = self.latency is not None and self.latency > self.target_latency
+        if status in CONGESTION_STATUSES or slow:
+            self._decrease()
+        else:
+            self._increase()
+
+    def on_error(self):
+        """Lỗi mạng / timeout: coi như quá tải"""
+        self._decrease()
+
+    def _increase(self):
+        if self.cooldown:
+            self.cooldown -= 1
+        if self.delay > self.min_delay:
+            delay = 1.0 / (1.0 / self.delay + self.rate_step)
+            # Delay rất nhỏ (> 100 request/giây) thì coi như không còn giới hạn delay
+            self.delay = self.min_delay if delay < 0.01 else max(self.min_delay, delay)
+        self.good_streak += 1
+        if self.good_streak >= self.concurrency and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self.good_streak = 0
+            self.increases += 1
+
+    def _decrease(self):
+        self.good_streak = 0
+        if self.cooldown:
+            self.cooldown -= 1
+            return
+        self.concurrency = max(self.min_concurrency, int(self.concurrency * self.backoff))
+        self.delay = min(self.max_delay, max(self.delay * 2, self.backoff_delay))
+        self.cooldown = self.concurrency
+        self.decreases += 1
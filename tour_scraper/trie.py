@@ -0,0 +1,30 @@
+# Regex dạng trie cho tập chuỗi cố định (slug địa danh, từ khóa miền), dùng chung cho
+# extraction.extract_tour_name và regions.classify_region.
+
+import re
+
+
+def trie_pattern(words):
+    """
+    Regex dạng trie cho một tập chuỗi: các chuỗi chung tiền tố dùng chung nhánh,
+    VD ['ha-noi', 'ha-long'] → ha-(?:noi|long). Engine regex chỉ quét văn bản
+    một lượt từ trái sang phải, mỗi vị trí đi theo trie thay vì thử từng chuỗi.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # Từ kết thúc ở đây nhưng còn từ dài hơn cùng tiền tố → ưu tiên từ dài hơn
+            return f'(?:{body})?'
+        return body
+
+    return build(trie)